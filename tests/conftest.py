@@ -0,0 +1,16 @@
+import pytest
+
+from two_phase import Properties
+
+
+@pytest.fixture(autouse=True)
+def properties():
+    # The Properties are shared by the whole library, each test starts from
+    # the default values and its changes are undone
+    state = {k: v for k, v in vars(Properties).items() if not k.startswith("__")}
+    yield Properties
+    for k in [k for k in vars(Properties) if not k.startswith("__")]:
+        if k not in state:
+            delattr(Properties, k)
+    for k, v in state.items():
+        setattr(Properties, k, v)
@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+
+from two_phase import EBVelocity, TwoPhase
+from two_phase import kernels
+from two_phase.cache import ResultCache
+
+
+@pytest.fixture
+def tp(tmp_path):
+    tp = TwoPhase(d=0.0525, l=8.1, theta=90)
+    tp.T, tp.P = np.array([20.0, 25.0, 30.0]), np.array([1e5, 2e5, 3e5])
+    tp.v_sl, tp.v_sg = np.array([0.5, 0.2, 1.0]), np.array([0.5, 1.0, 2.0])
+    tp.set_cache(path=str(tmp_path))
+    return tp
+
+
+def counts(tp):
+    return tp.prop.cache.hits, tp.prop.cache.misses
+
+
+def test_ebmodels_hits(tp):
+    v_tb = tp.eb_vel.ebmodels()
+    assert counts(tp) == (0, 1)
+    np.testing.assert_array_equal(tp.eb_vel.ebmodels(), v_tb)
+    assert counts(tp) == (1, 1)
+    # New inputs are a new entry
+    tp.v_sg = np.array([0.6, 1.0, 2.0])
+    tp.eb_vel.ebmodels()
+    assert counts(tp) == (1, 2)
+    # Explicit inputs are part of the key
+    tp.eb_vel.ebmodels(rho_l=np.full(3, 900.0))
+    assert counts(tp) == (1, 3)
+
+
+def test_ebmodels_dtype(tp):
+    v_tb = tp.eb_vel.ebmodels()
+    tp.dtype = np.float32
+    v_tb32 = tp.eb_vel.ebmodels()
+    assert counts(tp) == (0, 2)
+    assert v_tb32.dtype == np.float32
+    np.testing.assert_allclose(v_tb32, v_tb, rtol=1e-5)
+    tp.dtype = np.float64
+    assert tp.eb_vel.ebmodels().dtype == np.float64
+    assert counts(tp) == (1, 2)
+
+
+def test_ebmodels_fluids_and_geometry(tp):
+    tp.eb_vel.ebmodels()
+    for attr, value in (("gas", "nitrogen"), ("liq", "R134a"), ("l", 4.0)):
+        setattr(tp.prop, attr, value)
+        tp.eb_vel.ebmodels()
+    assert counts(tp) == (0, 4)
+
+
+def test_ebmodels_coefficients(tp, monkeypatch):
+    v_tb, names = tp.eb_vel.ebmodels(models=True)
+    monkeypatch.setattr(EBVelocity, "nicklin1962_c", (1.0, 0.3))
+    v_tb_c = tp.eb_vel.ebmodels()
+    assert counts(tp) == (0, 2)
+    i = names.index("nicklin1962")
+    ref = EBVelocity.nicklin1962(tp.v_sg, tp.v_sl, tp.d, tp.prop.g, c=(1.0, 0.3))
+    np.testing.assert_allclose(v_tb_c[i], ref, rtol=1e-14)
+    monkeypatch.undo()
+    np.testing.assert_array_equal(tp.eb_vel.ebmodels(), v_tb)
+    assert counts(tp) == (1, 2)
+
+
+def test_backend(tp):
+    pytest.importorskip("numba")
+    tp.eb_vel.ebmodels()
+    try:
+        kernels.set_backend("numba")
+        tp.eb_vel.ebmodels()
+    finally:
+        kernels.set_backend("numpy")
+    assert counts(tp) == (0, 2)
+
+
+def test_taitel1980(tp):
+    ptt = tp.ptt.taitel1980()
+    np.testing.assert_array_equal(tp.ptt.taitel1980(), ptt)
+    assert counts(tp) == (1, 1)
+    tp.dtype = np.float32
+    tp.ptt.taitel1980()
+    tp.prop.gas = "nitrogen"
+    tp.ptt.taitel1980()
+    assert counts(tp) == (1, 3)
+    # Custom property functions are not cached
+    tp.set_rho_l_func(lambda T, P: 998.0 + 0 * T)
+    tp.ptt.taitel1980()
+    assert counts(tp) == (1, 3)
+
+
+def test_code_hash():
+    def foo(x):
+        return x
+
+    ResultCache.register("test", foo)
+    code = ResultCache.code_hash("test")
+
+    def foo(x):
+        return 2 * x
+
+    ResultCache.register("test", foo)
+    assert ResultCache.code_hash("test") != code
+    ResultCache.models.pop("test")
+    ResultCache._codes.pop("test")
+
+
+def test_eviction(tmp_path):
+    cache = ResultCache(path=str(tmp_path))
+    for i in range(4):
+        cache.get_or_compute("test", {"i": i}, lambda: np.zeros(1000))
+    size = cache.size()
+    cache.evict(size // 2)
+    assert cache.size() <= size // 2
+    assert len(cache.entries()) == 2
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from two_phase import EBVelocity
+from two_phase import solvers
+from two_phase.calibration import calibrate
+
+G = 9.81
+
+
+def points(n=400, seed=0):
+    # Operating points of two groups, the Froude numbers cross 3.5
+    rng = np.random.default_rng(seed)
+    v_sg = rng.uniform(0.1, 5.0, n)
+    v_sl = rng.uniform(0.05, 3.0, n)
+    d = rng.choice([0.025, 0.05], n)
+    theta = rng.uniform(0, 90, n)
+    groups = np.repeat(["a", "b"], n // 2)
+    return v_sg, v_sl, d, theta, groups
+
+
+def measured(model, c, Fr_crit, v_sg, v_sl, d, theta, groups):
+    # v_tb of each group with its own coefficients
+    v_tb = np.empty(v_sg.size)
+    for j, lab in enumerate(np.unique(groups)):
+        i = groups == lab
+        arg = (v_sg[i], v_sl[i], d[i], G)
+        if model == "nicklin1962":
+            v_tb[i] = EBVelocity.nicklin1962(*arg, c=c[j])
+        else:
+            foo = getattr(EBVelocity, model)
+            arg = arg[:3] + (theta[i], G)
+            v_tb[i] = foo(*arg, c=c[j], Fr_crit=Fr_crit[j])
+    return v_tb
+
+
+def test_nicklin1962():
+    v_sg, v_sl, d, theta, groups = points()
+    c = np.array([[1.2, 0.351], [1.1, 0.3]])
+    v_tb = measured("nicklin1962", c, None, v_sg, v_sl, d, theta, groups)
+    # Points without measurement are left out
+    v_tb[::7] = np.nan
+    res = calibrate("nicklin1962", v_sg, v_sl, d, theta, v_tb, groups, g=G)
+    assert list(res["groups"]) == ["a", "b"]
+    np.testing.assert_allclose(res["c"], c, rtol=1e-8)
+    assert (res["rmse"] < 1e-8).all()
+    assert res["n"].sum() == np.isfinite(v_tb).sum()
+    # Coefficients kept constant
+    res = calibrate(
+        "nicklin1962", v_sg, v_sl, d, theta, v_tb, groups, g=G, fit=[0], c0=(1, 0.3)
+    )
+    np.testing.assert_allclose(res["c"][:, 1], 0.3)
+
+
+def test_bendiksen1984():
+    v_sg, v_sl, d, theta, groups = points()
+    c = np.array([[1.05, 0.15, 0.54, 0.35, 1.2, 0.35], [1.0, 0.2, 0.5, 0.3, 1.1, 0.4]])
+    Fr_crit = np.array([3.5, 2.9])
+    v_tb = measured("bendiksen1984", c, Fr_crit, v_sg, v_sl, d, theta, groups)
+    res = calibrate("bendiksen1984", v_sg, v_sl, d, theta, v_tb, groups, g=G)
+    np.testing.assert_allclose(res["c"], c, rtol=1e-6)
+    assert (res["rmse"] < 1e-8).all()
+    # Fr_crit is only defined between the Froude numbers of the points
+    Fr = v_sl / np.sqrt(G * d)
+    for j, lab in enumerate(["a", "b"]):
+        lo = Fr[(groups == lab) & (Fr < Fr_crit[j])].max()
+        hi = Fr[(groups == lab) & (Fr >= Fr_crit[j])].min()
+        assert lo < res["Fr_crit"][j] <= hi
+
+
+def test_theron1989():
+    v_sg, v_sl, d, theta, groups = points()
+    c = np.array([[1.3, 0.23, 0.13, 0.5, 0.8, 0.35], [1.25, 0.2, 0.15, 0.45, 0.7, 0.3]])
+    Fr_crit = np.array([3.5, 2.5])
+    v_tb = measured("theron1989", c, Fr_crit, v_sg, v_sl, d, theta, groups)
+    res = calibrate(
+        "theron1989", v_sg, v_sl, d, theta, v_tb, groups, g=G, c0=c[0] * 1.05
+    )
+    np.testing.assert_allclose(res["c"], c, rtol=1e-5)
+    np.testing.assert_allclose(res["Fr_crit"], Fr_crit, rtol=1e-5)
+
+
+def test_least_squares_groups():
+    # Linear problems of very different sizes against lstsq
+    rng = np.random.default_rng(1)
+    groups = np.repeat([0, 1, 2], [5000, 3, 40])
+    rng.shuffle(groups)
+    X = np.column_stack((np.ones(groups.size), rng.uniform(0, 1, groups.size)))
+    y = rng.normal(0, 1, groups.size)
+
+    def fun(c):
+        return (X * c).sum(axis=1) - y
+
+    def jac(c):
+        return X
+
+    c, cost = solvers.least_squares(fun, jac, np.zeros((3, 2)), groups)
+    for j in range(3):
+        i = groups == j
+        ref, res = np.linalg.lstsq(X[i], y[i], rcond=None)[:2]
+        np.testing.assert_allclose(c[j], ref, rtol=1e-6)
+        np.testing.assert_allclose(cost[j], res[0], rtol=1e-8)
+
+
+def test_unknown_model():
+    with pytest.raises(ValueError):
+        calibrate("dukler1985", 1.0, 1.0, 0.05, 90, 2.0)
@@ -0,0 +1,104 @@
+import CoolProp.CoolProp as cp
+import numpy as np
+import pytest
+
+from two_phase import Properties as p
+from two_phase.conversion import BatchConvert, DensityTable
+from two_phase.flow_utils import Convert
+
+rng = np.random.default_rng(0)
+T = rng.uniform(10, 40, 200)
+P = rng.uniform(1e5, 5e5, 200)
+A = np.pi * 0.05 ** 2 / 4
+
+
+def test_density_table_interpolation():
+    for fluid in ("gas", "liq"):
+        table = DensityTable(fluid=fluid)
+        rho = table(T, P)
+        np.testing.assert_allclose(rho, p.rho(T=T, P=P, fluid=fluid), rtol=1e-4)
+
+
+def test_density_table_single_phase():
+    # The default range crosses the saturation line of water, the table is
+    # clipped to the liquid and the other samples are evaluated directly
+    table = DensityTable(fluid="liq")
+    T_sat = cp.PropsSI("T", "P", table.P[0], "Q", 0, p.liq) - p.K
+    assert table.T[-1] < T_sat
+    assert np.isfinite(table.rho).all() and (table.rho > 950).all()
+    T_out, P_out = np.array([90.0, 150.0]), np.array([2e5, 10e5])
+    np.testing.assert_allclose(table(T_out, P_out), p.rho(T=T_out, P=P_out))
+    # Gas tables are clipped above the saturation temperature
+    p.gas = "water"
+    table = DensityTable(fluid="gas", T_lim=(100, 300), P_lim=(0.5e5, 3e5))
+    T_sat = cp.PropsSI("T", "P", table.P[-1], "Q", 1, "water") - p.K
+    assert table.T[0] > T_sat
+    assert (table.rho < 2).all()
+    with pytest.raises(ValueError):
+        DensityTable(fluid="gas")
+
+
+def test_density_table_other_fluids():
+    # CoolProp names that are not the configured fluids
+    for fluid in ("Nitrogen", "CO2"):
+        table = DensityTable(fluid=fluid)
+        assert table.T[0] == 0 and table.T[-1] == 100
+        rho = cp.PropsSI("D", "T", T + p.K, "P", P, fluid)
+        np.testing.assert_allclose(table(T, P), rho, rtol=1e-3)
+    v_sg = BatchConvert(d=0.05).superficial(100.0, "L/min", T, P, fluid="Nitrogen")
+    assert np.isfinite(v_sg).all()
+    # Explicit side of the saturation line
+    table = DensityTable(fluid="water", T_lim=(0, 300), P_lim=(1e5, 2e5), phase="gas")
+    assert table.T[0] > 120 and (table.rho < 2).all()
+    with pytest.raises(ValueError):
+        DensityTable(fluid="Nitrogen", phase="solid")
+
+
+def test_superficial_round_trip():
+    bc = BatchConvert(d=0.05)
+    # Mass flow
+    m = rng.uniform(1, 100, T.size)  # [kg/min]
+    v_sl = bc.superficial(m, "kg/min", T, P, fluid="liq")
+    rho_l = p.rho(T=T, P=P, fluid="liq")
+    np.testing.assert_allclose(v_sl * rho_l * A * 60, m, rtol=1e-4)
+    ref = Convert.m3s2vs(Convert.kgmin2m3s(m, T, P, fluid="liq"), d=0.05)
+    np.testing.assert_allclose(v_sl, ref, rtol=1e-4)
+    # Volumetric flow at the standard conditions
+    q = rng.uniform(10, 500, T.size)  # [L/min]
+    v_sg = bc.superficial(q, "L/min", T, P)
+    rho_std = p.rho(T=bc.T_std, P=bc.P_std, fluid="gas")
+    rho_g = p.rho(T=T, P=P, fluid="gas")
+    np.testing.assert_allclose(v_sg * rho_g / rho_std * A * 60e3, q, rtol=1e-4)
+    # Meter conditions and the direct properties
+    exact = BatchConvert(d=0.05, table=False)
+    v_sg = exact.superficial(q, "L/min", T, P, T_ref=T, P_ref=P)
+    np.testing.assert_allclose(v_sg * A * 60e3, q)
+
+
+def test_superficial_broadcast():
+    bc = BatchConvert(d=0.05, table=False)
+    # A constant flow with arrays of T and P
+    v_s = bc.superficial(10.0, "kg/min", T, P, fluid="liq")
+    assert v_s.shape == T.shape
+    np.testing.assert_allclose(
+        v_s, bc.superficial(np.full(T.size, 10.0), "kg/min", T, P, fluid="liq")
+    )
+    assert bc.superficial([10.0], "kg/min", T, P, fluid="liq").shape == T.shape
+    assert np.ndim(bc.superficial(10.0, "kg/min", 20.0, 1e5, fluid="liq")) == 0
+    # Flows of a DAQ channel at several (T, P) states
+    m = np.full(T.size, 10.0)
+    v_s = bc.superficial(m, "kg/min", T[:3, None], P[:3, None], fluid="liq")
+    assert v_s.shape == (3, T.size)
+    v_sg, v_sl = bc.superficial2(100.0, "L/min", 10.0, "kg/min", T, P)
+    assert v_sg.shape == v_sl.shape == T.shape
+
+
+def test_qx2qy_round_trip():
+    Q = rng.uniform(1e-4, 1e-2, T.size)
+    Q_y = Convert.Qx2Qy(Q, T, P, T_y=20.0, P_y=101325.0)
+    np.testing.assert_allclose(Convert.Qx2Qy(Q_y, 20.0, 101325.0, T_y=T, P_y=P), Q)
+    # Legacy pairs of conditions
+    np.testing.assert_allclose(Convert.Qx2Qy(Q, (T, 20.0), (P, 101325.0)), Q_y)
+    # Lists of two samples are not pairs
+    Q_y = Convert.Qx2Qy(Q[:2], list(T[:2]), list(P[:2]), T_y=20.0, P_y=101325.0)
+    np.testing.assert_allclose(Q_y, Convert.Qx2Qy(Q[:2], T[:2], P[:2], 20.0, 101325.0))
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from two_phase import EBVelocity, Homogeneous, Pattern, TwoPhase
+from two_phase import Properties as p
+
+
+def test_cast_scalars():
+    # Scalars are never turned into 0-d arrays
+    a, b, c, d = p.cast(1.5, 2, np.float64(3.0), np.float32(4.0))
+    assert (type(a), type(b), type(c), type(d)) == (float, int, np.float64, np.float64)
+    assert p.cast(None) is None
+    x = np.float64(3.0)
+    assert p.cast(x) is x
+    p.set_dtype(np.float32)
+    a, b, c = p.cast(1.5, np.float64(3.0), np.float32(4.0))
+    assert all(type(i) is np.float32 for i in (a, b, c))
+    p.dtype = np.complex128
+    assert type(p.cast(1.5)) is np.complex128
+
+
+def test_cast_arrays():
+    x = np.arange(3.0)
+    assert p.cast(x) is x
+    p.set_dtype(np.float32)
+    assert p.cast(x).dtype == np.float32
+    assert p.cast([1, 2]).dtype == np.float32
+    with pytest.raises(ValueError):
+        p.set_dtype(np.int32)
+
+
+def test_float32_outputs():
+    p.set_dtype(np.float32)
+    v_sg, v_sl = np.array([0.5, 1.0, 2.0]), np.array([0.5, 0.2, 1.0])
+    out = [
+        EBVelocity.bendiksen1984(v_sg, v_sl, 0.05, 90, 9.81),
+        EBVelocity.petalasaziz2000(v_sg, v_sl, 998.0, 1e-3, 0.05, 45.0, 9.81),
+        Homogeneous.gvf(v_sg, v_sl),
+        Homogeneous.Rem(1.2, 998.0, 1.8e-5, 1e-3, 0.05, v_sg, v_sl),
+    ]
+    assert all(i.dtype == np.float32 for i in out)
+    # Scalars keep the dtype as well
+    assert type(EBVelocity.nicklin1962(0.5, 0.5, 0.05, 9.81)) is np.float32
+
+
+def test_float32_models():
+    tp = TwoPhase(d=0.05, l=8.1, theta=90)
+    tp.T, tp.P = np.full(3, 20.0), np.full(3, 1e5)
+    tp.v_sl, tp.v_sg = np.array([0.5, 0.2, 1.0]), np.array([0.05, 1.0, 20.0])
+    ref = tp.eb_vel.ebmodels(), tp.ptt.taitel1980(), tp.ptt.barnea1987()
+    tp.dtype = np.float32
+    out = tp.eb_vel.ebmodels(), tp.ptt.taitel1980(), tp.ptt.barnea1987()
+    assert out[0].dtype == np.float32
+    np.testing.assert_allclose(out[0], ref[0], rtol=1e-5)
+    np.testing.assert_array_equal(out[1], ref[1])
+    np.testing.assert_array_equal(out[2], ref[2])
+    # The taitel1980 single point has the same result
+    var = (0.05, 0.5, 1.2, 998.0, 1e-3, 0.072, 9.81, 8.1, 0.05)
+    assert Pattern.taitel1980(*var) == Pattern.taitel1980(*map(np.float64, var))
+
+
+def test_local_dtype():
+    # The override is undone on exit, the policy is not changed
+    with p.local_dtype(np.complex128):
+        assert type(p.cast(1.5)) is np.complex128
+        with p.local_dtype(np.float32):
+            assert p.get_dtype() is np.float32
+        assert p.get_dtype() is np.complex128
+        assert p.dtype is np.float64
+    assert p.get_dtype() is np.float64
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from two_phase import EBVelocity, Friction, Homogeneous, Pattern
+from two_phase import Properties as p
+from two_phase import kernels
+
+pytest.importorskip("numba")
+
+N = 2000
+G = 9.81
+
+
+@pytest.fixture(params=[np.float32, np.float64], ids=["float32", "float64"])
+def dtype(request):
+    p.set_dtype(request.param)
+    return request.param
+
+
+@pytest.fixture
+def x(dtype):
+    # Random operating points with the dtype policy
+    rng = np.random.default_rng(1)
+    lim = {
+        "v_sg": (0.01, 20),
+        "v_sl": (0.01, 5),
+        "d": (0.01, 0.2),
+        "theta": (-90, 90),
+        "rho_g": (1, 50),
+        "rho_l": (600, 1200),
+        "mu_g": (1e-5, 3e-5),
+        "mu_l": (1e-4, 1e-1),
+        "sigma": (0.01, 0.08),
+        "l": (1, 50),
+        "Re": (100, 1e6),
+    }
+    return {k: rng.uniform(*v, N).astype(dtype) for k, v in lim.items()}
+
+
+def rtol(dtype):
+    return 1e-12 if dtype == np.float64 else 1e-5
+
+
+EB = {
+    "nicklin1962": ("v_sg", "v_sl", "d", "g"),
+    "bendiksen1984": ("v_sg", "v_sl", "d", "theta", "g"),
+    "theron1989": ("v_sg", "v_sl", "d", "theta", "g"),
+    "petalasaziz2000": ("v_sg", "v_sl", "rho_l", "mu_l", "d", "theta", "g"),
+    "dukler1985": ("v_sg", "v_sl"),
+}
+
+
+@pytest.mark.parametrize("name", list(EB))
+def test_ebvelocity(name, x, dtype):
+    arg = [G if k == "g" else x[k] for k in EB[name]]
+    out = getattr(kernels, name)(*arg)
+    ref = getattr(EBVelocity, name)(*arg)
+    assert out.dtype == ref.dtype == dtype
+    np.testing.assert_allclose(out, ref, rtol=rtol(dtype))
+
+
+@pytest.mark.parametrize("name", ["nicklin1962", "bendiksen1984", "theron1989"])
+def test_coefficients(name, x, monkeypatch):
+    # The kernels read the default coefficients of EBVelocity when called
+    c = np.array(getattr(EBVelocity, name + "_c")) * 0.8
+    monkeypatch.setattr(EBVelocity, name + "_c", tuple(c))
+    arg = [G if k == "g" else x[k] for k in EB[name]]
+    out = getattr(kernels, name)(*arg)
+    ref = getattr(EBVelocity, name)(*arg)
+    np.testing.assert_allclose(out, ref, rtol=rtol(x["v_sg"].dtype))
+    np.testing.assert_allclose(getattr(kernels, name)(*arg, c=c), ref, rtol=1e-5)
+    # Coefficients per point fall back to the reference implementation
+    c_n = [np.full(N, i) for i in c]
+    out = getattr(kernels, name)(*arg, c=c_n)
+    np.testing.assert_allclose(out, ref, rtol=rtol(x["v_sg"].dtype))
+
+
+def test_rem(x, dtype):
+    arg = [x[k] for k in ("rho_g", "rho_l", "mu_g", "mu_l", "d")]
+    out = kernels.Rem(*arg, v_sg=x["v_sg"], v_sl=x["v_sl"])
+    ref = Homogeneous.Rem(*arg, v_sg=x["v_sg"], v_sl=x["v_sl"])
+    assert out.dtype == dtype
+    np.testing.assert_allclose(out, ref, rtol=10 * rtol(dtype))
+
+
+@pytest.mark.parametrize("name", ["blasius_fanning", "blasius_moody"])
+def test_blasius(name, x, dtype):
+    out = getattr(kernels, name)(x["Re"])
+    ref = getattr(Friction, name)(x["Re"])
+    assert out.dtype == dtype
+    np.testing.assert_allclose(out, ref, rtol=rtol(dtype))
+
+
+def test_taitel1980(x, dtype):
+    var = ("v_sg", "v_sl", "rho_g", "rho_l", "mu_l", "sigma")
+    out = kernels.taitel1980(*[x[k] for k in var], G, x["l"], x["d"])
+    ref = [
+        Pattern.taitel1980(*i, G, l, d)
+        for i, l, d in zip(zip(*[x[k] for k in var]), x["l"], x["d"])
+    ]
+    np.testing.assert_array_equal(out, ref)
+
+
+def test_dispatch():
+    try:
+        kernels.set_backend("numba")
+        assert kernels.dispatch(EBVelocity.nicklin1962) is kernels.nicklin1962
+        # Models without a kernel use the reference implementation
+        assert kernels.dispatch(Homogeneous.gvf) is Homogeneous.gvf
+        assert max(kernels.check(n=1000).values()) < 1e-12
+    finally:
+        kernels.set_backend("numpy")
+    assert kernels.dispatch(EBVelocity.nicklin1962) is EBVelocity.nicklin1962
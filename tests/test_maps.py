@@ -0,0 +1,81 @@
+import numpy as np
+
+from two_phase import Pattern
+from two_phase.maps import PatternMap
+
+PROPS = dict(rho_g=1.19, rho_l=998.2, mu_g=1.8e-5, mu_l=1.0e-3, sigma=0.0728)
+
+
+def test_barnea1987_map_against_grid():
+    mp = PatternMap.barnea1987(
+        [1e-2, 1e2], [1e-3, 1e1], d=0.05, theta=0, n0=8, max_level=4, **PROPS
+    )
+    N = mp.N
+    # Brute force evaluation of the finest lattice
+    i, j = np.meshgrid(np.arange(N + 1), np.arange(N + 1), indexing="ij")
+    v_sg, v_sl = mp.coords(i.ravel(), j.ravel())
+    var = [PROPS[k] for k in ("rho_g", "rho_l", "mu_g", "mu_l", "sigma")]
+    ref = Pattern.barnea1987(v_sg, v_sl, *var, 9.81, 0.05, 0).reshape(N + 1, N + 1)
+    assert mp.n_eval < ref.size / 4
+    # Every evaluated corner matches the grid
+    np.testing.assert_array_equal(mp._vals, ref.ravel()[mp._keys])
+
+    # Flow pattern of each cell of the finest lattice from the map cells
+    c = mp.cells
+    idx = [
+        np.rint((np.log10(c[k]) - np.log10(lim[0])) / np.ptp(np.log10(lim)) * N)
+        for k, lim in (
+            ("x0", mp.x_lim),
+            ("x1", mp.x_lim),
+            ("y0", mp.y_lim),
+            ("y1", mp.y_lim),
+        )
+    ]
+    lab = np.full((N, N), -1)
+    for x0, x1, y0, y1, ptt in zip(*[k.astype(int) for k in idx], c["ptt"]):
+        lab[x0:x1, y0:y1] = ptt
+    assert (lab >= 0).all()
+    # The cells with uniform corners on the grid have the same flow pattern
+    cor = np.stack((ref[:-1, :-1], ref[1:, :-1], ref[:-1, 1:], ref[1:, 1:]))
+    uniform = (cor == cor[0]).all(axis=0)
+    np.testing.assert_array_equal(lab[uniform], cor[0][uniform])
+    # All the patterns of the grid are on the map
+    assert set(np.unique(ref)) == set(np.unique(c["ptt"]))
+
+
+def test_map_lines():
+    var = [PROPS[k] for k in ("rho_g", "rho_l", "mu_l", "sigma")]
+    mp = PatternMap.taitel1980([1e-2, 1e2], [1e-3, 1e1], *var, 8.1, 0.05, n0=8)
+    assert mp.lines
+    for pair, lines in mp.lines.items():
+        assert pair[0] < pair[1]
+        for line in lines:
+            assert line.shape[1] == 2 and line.shape[0] >= 2
+            lo, hi = np.array([1e-2, 1e-3]), np.array([1e2, 1e1])
+            assert (line >= lo * (1 - 1e-9)).all() and (line <= hi * (1 + 1e-9)).all()
+
+
+def test_taitel1980_array():
+    rng = np.random.default_rng(0)
+    v_sg = np.concatenate(([0.0], 10 ** rng.uniform(-2, 2, 500)))
+    v_sl = np.concatenate(([0.1], 10 ** rng.uniform(-3, 1, 500)))
+    var = [PROPS[k] for k in ("rho_g", "rho_l", "mu_l", "sigma")]
+    for l, d in ((8.1, 0.05), (2.0, 0.1), (8.1, 0.02)):
+        ptt = Pattern.taitel1980_array(v_sg, v_sl, *var, 9.81, l, d)
+        ref = [Pattern.taitel1980(i, j, *var, 9.81, l, d) for i, j in zip(v_sg, v_sl)]
+        np.testing.assert_array_equal(ptt, ref)
+    txt = Pattern.taitel1980_array(v_sg[:2], v_sl[:2], *var, 9.81, l, d, text=True)
+    assert txt[0] == "Single-phase"
+
+
+def test_map_saddle():
+    # Two patterns with a saddle point away from the lattice, the lines
+    # only end at the borders of the map
+    def func(x, y):
+        return ((x - 0.37) * (y - 0.61) > 0).astype(int)
+
+    mp = PatternMap(func, [0, 1], [0, 1], log=False, n0=4, max_level=3).build()
+    ends = np.concatenate([line[[0, -1]] for line in mp.lines[(0, 1)]])
+    border = np.isclose(ends, 0) | np.isclose(ends, 1)
+    assert border.any(axis=1).all()
+    assert len(mp.lines[(0, 1)]) == 2
@@ -0,0 +1,54 @@
+import numpy as np
+
+from two_phase import Pattern, TwoPhase
+
+# Air-water at 20 °C and 1 bar
+PROPS = dict(rho_g=1.19, rho_l=998.2, mu_g=1.8e-5, mu_l=1.0e-3, sigma=0.0728)
+
+
+def barnea(v_sg, v_sl, d, theta, text=False):
+    return Pattern.barnea1987(v_sg, v_sl, g=9.81, d=d, theta=theta, text=text, **PROPS)
+
+
+def test_barnea1987_horizontal():
+    v_sg = [0.0, 0.1, 5.0, 30.0, 1.0, 0.1]
+    v_sl = [0.1, 0.01, 0.01, 0.01, 1.0, 5.0]
+    ptt = barnea(v_sg, v_sl, 0.05, 0)
+    np.testing.assert_array_equal(ptt, [0, 6, 7, 5, 3, 1])
+    names = barnea(v_sg, v_sl, 0.05, 0, text=True)
+    assert list(names) == [Pattern.barnea1987_ptt[i] for i in ptt]
+
+
+def test_barnea1987_vertical():
+    # Bubble flow only exists in large enough pipes
+    ptt = barnea([0.05, 1.0, 0.5], [0.5, 0.5, 5.0], 0.1, 90)
+    np.testing.assert_array_equal(ptt, [2, 3, 1])
+    assert barnea(0.05, 0.5, 0.05, 90) == 3
+
+
+def test_barnea1987_single_point():
+    # Same output type of taitel1980
+    assert isinstance(barnea(1.0, 1.0, 0.05, 0), int)
+    assert barnea(1.0, 1.0, 0.05, 0, text=True) == "Slug"
+
+
+def test_taitel1980():
+    v_sg = [0.0, 0.05, 1.0, 5.0, 30.0, 0.5]
+    v_sl = [0.5, 0.5, 0.5, 0.1, 0.1, 5.0]
+    var = [PROPS[k] for k in ("rho_g", "rho_l", "mu_l", "sigma")]
+    ptt = [Pattern.taitel1980(i, j, *var, 9.81, 8.1, 0.1) for i, j in zip(v_sg, v_sl)]
+    assert ptt == [0, 2, 3, 4, 5, 1]
+
+
+def test_twophase_inclination():
+    # The PatternUtil uses the inclination of the TwoPhase
+    v_sg, v_sl = np.array([0.1, 0.5]), np.array([0.01, 0.02])
+    out = {}
+    for theta in (0, 90):
+        tp = TwoPhase(d=0.05, l=8.1, theta=theta)
+        tp.T, tp.P = np.full(2, 20.0), np.full(2, 1e5)
+        tp.v_sl, tp.v_sg = v_sl, v_sg
+        assert tp.prop.theta == theta
+        out[theta] = tp.ptt.barnea1987()
+    assert np.isin(out[0], (6, 7)).all()
+    assert not np.isin(out[90], (6, 7)).any()
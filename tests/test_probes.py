@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from two_phase.probes import TwinProbe
+
+FS = 2000.0  # [Hz]
+DIST = 0.1  # [m]
+LAG = 0.0613  # [s], 122.6 samples
+
+
+def signals(duration=40.0, up=10, seed=0):
+    # Train of elongated bubbles (void fraction ~1) and liquid slugs with
+    # random lengths, smoothed and sampled at FS. The second probe sees the
+    # same signal delayed by LAG, obtained on a finer grid.
+    rng = np.random.default_rng(seed)
+    n = int(duration * FS * up)
+    x = np.zeros(n)
+    i, fronts = 0, []
+    while True:
+        i += int(rng.uniform(0.05, 0.2) * FS * up)  # Slug
+        j = i + int(rng.uniform(0.1, 0.4) * FS * up)  # Bubble
+        if j >= n:
+            break
+        x[i:j] = 1.0
+        fronts.append(i)
+        i = j
+    ker = np.exp(-0.5 * (np.arange(-40, 41) / 10) ** 2)
+    x = np.convolve(x, ker / ker.sum(), mode="same")
+    d = int(round(LAG * FS * up))
+    x1 = x[d::up]
+    x2 = x[: n - d : up][: x1.size]
+    return x1[: x2.size], x2, np.array(fronts) - d
+
+
+def test_lag():
+    x1, x2, fronts = signals()
+    probe = TwinProbe(fs=FS, dist=DIST, window=4.0, overlap=0.5, max_lag=0.5)
+    res = probe.process(x1, x2)
+    assert res["t"].size == (x1.size - probe.n_win) // probe.n_hop + 1
+    np.testing.assert_allclose(res["lag"], LAG, atol=0.2 / FS)
+    np.testing.assert_allclose(res["v_tb"], DIST / LAG, rtol=3e-3)
+    assert (res["corr"] > 0.9).all()
+    # Fronts counted by the first probe in each window
+    t = fronts / (FS * 10)
+    half = probe.n_win / (2 * FS)
+    cnt = [np.count_nonzero((t > i - half) & (t <= i + half)) for i in res["t"]]
+    assert np.abs(res["freq"] * probe.n_win / FS - cnt).max() <= 1
+
+
+def test_uncorrelated():
+    rng = np.random.default_rng(1)
+    x1, x2 = rng.random(40000), rng.random(40000)
+    res = TwinProbe(fs=FS, dist=DIST, window=4.0).process(x1, x2)
+    assert np.isnan(res["v_tb"]).all()
+
+
+def test_stream_chunks(tmp_path):
+    x1, x2, fronts = signals(duration=20.0)
+    probe = TwinProbe(fs=FS, dist=DIST, window=2.0, overlap=0.75, batch=3)
+    ref = probe.process(x1, x2)
+    # Chunks of any length give the same windows
+    for out in (
+        probe.process(x1, x2, chunk=777),
+        probe.process(zip(np.array_split(x1, 13), np.array_split(x2, 13))),
+    ):
+        for k in ref:
+            np.testing.assert_allclose(out[k], ref[k], rtol=1e-12)
+    # Recording on disk
+    path = str(tmp_path / "probes.npy")
+    np.save(path, np.stack((x1, x2), axis=1))
+    out = probe.process(TwinProbe.read(path, dtype="float64", chunk=5000))
+    np.testing.assert_allclose(out["v_tb"], ref["v_tb"], rtol=1e-12)
+
+
+def test_resample():
+    probe = TwinProbe(fs=FS, dist=DIST, window=1.0)
+    t = np.arange(0, 10, 0.01)
+    x = 2 * t
+    t_win = np.array([1.0, 5.0, 20.0])
+    out = probe.resample(t, x, t_win)
+    np.testing.assert_allclose(out[:2], 2 * t_win[:2], rtol=1e-3)
+    assert np.isnan(out[2])
+
+
+def test_overlap():
+    with pytest.raises(ValueError):
+        TwinProbe(fs=FS, dist=DIST, overlap=1.0)
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from two_phase import EBVelocity, Homogeneous, TwoPhase
+from two_phase import registry
+from two_phase.registry import Registry
+
+G = 9.81
+
+
+@pytest.fixture(params=[True, False], ids=["numexpr", "numpy"])
+def fuse(request, monkeypatch):
+    if request.param and not registry.HAS_NUMEXPR:
+        pytest.skip("numexpr is not installed")
+    monkeypatch.setattr(Registry, "fuse", request.param)
+    return request.param
+
+
+@pytest.fixture
+def models():
+    # Test models, removed afterwards
+    names = []
+
+    def register(kind, name, *args, **kwargs):
+        names.append((kind, name))
+        return Registry.register(kind, name, *args, **kwargs)
+
+    yield register
+    for kind, name in names:
+        Registry.unregister(kind, name)
+
+
+@pytest.fixture
+def x():
+    rng = np.random.default_rng(0)
+    return {
+        "v_sg": rng.uniform(0.1, 5.0, 100),
+        "v_sl": rng.uniform(0.1, 3.0, 100),
+        "d": 0.05,
+        "theta": rng.uniform(0, 90, 100),
+        "g": G,
+    }
+
+
+def test_expression(models, fuse, x):
+    models("eb", "expr", expr="1.2 * v_m + 0.351 * sqrt(g * d)")
+    model = models(
+        "eb",
+        "expr_theta",
+        expr="where(theta > 45, 1.2, 1.0) * v_m + 0.35 * sin(theta * pi / 180)",
+    )
+    assert model.inputs == ("theta", "v_m")
+    out = Registry.evaluate("eb", ["nicklin1962", "expr", "expr_theta"], **x)
+    assert out.shape == (3, 100)
+    np.testing.assert_allclose(out[1], out[0], rtol=1e-14)
+    v_m = x["v_sg"] + x["v_sl"]
+    ref = np.where(x["theta"] > 45, 1.2, 1.0) * v_m
+    ref += 0.35 * np.sin(np.deg2rad(x["theta"]))
+    np.testing.assert_allclose(out[2], ref, rtol=1e-14)
+
+
+def test_function(models, x):
+    @models("eb", "func", author="Func (2024)")
+    def func(v_sg, v_sl, d, g, c=(1.2, 0.351)):
+        return EBVelocity.nicklin1962(v_sg, v_sl, d, g, c=c)
+
+    assert Registry.select("eb", ["func"])[0].inputs == ("v_sg", "v_sl", "d", "g")
+    assert "Func (2024)" in Registry.authors("eb")
+    out = Registry.evaluate("eb", ["nicklin1962", "func"], **x)
+    np.testing.assert_array_equal(out[0], out[1])
+
+
+def test_broadcast(models, fuse, x):
+    # An expression with fewer inputs than the output shape
+    models("eb", "const", expr="0.35 * sqrt(g * d)")
+    out = Registry.evaluate("eb", ["nicklin1962", "const"], **x)
+    np.testing.assert_allclose(out[1], 0.35 * np.sqrt(G * 0.05))
+
+
+def test_resolve():
+    tp = TwoPhase(d=0.05, l=8.1, theta=90)
+    tp.T, tp.P = np.array([20.0, 30.0]), np.array([1e5, 2e5])
+    tp.v_sg, tp.v_sl = np.array([1.0, 2.0]), np.array([0.5, 0.5])
+    env = Registry.resolve(["Re_m"], {"rho_l": np.array([900.0, 900.0])})
+    # The given inputs are kept and the derived ones computed from them
+    np.testing.assert_array_equal(env["rho_l"], 900.0)
+    gvf = Homogeneous.gvf(tp.v_sg, tp.v_sl)
+    np.testing.assert_allclose(env["gvf"], gvf)
+    np.testing.assert_allclose(
+        env["Re_m"], env["rho_m"] * env["v_m"] * 0.05 / env["mu_m"]
+    )
+    with pytest.raises(ValueError):
+        Registry.resolve(["unknown"])
+
+
+def test_patterns():
+    tp = TwoPhase(d=0.05, l=8.1, theta=90)
+    tp.T, tp.P = np.full(3, 20.0), np.full(3, 1e5)
+    tp.v_sg, tp.v_sl = np.array([0.05, 1.0, 20.0]), np.array([0.5, 0.2, 1.0])
+    out = Registry.evaluate("pattern")
+    assert out.shape == (2, 3) and out.dtype.kind == "i"
+    np.testing.assert_array_equal(out[0], tp.ptt.taitel1980())
+
+
+def test_errors(models):
+    with pytest.raises(ValueError):
+        Registry.select("eb", ["unknown"])
+    with pytest.raises(ValueError):
+        Registry.register("void", "model", expr="v_m")
+    with pytest.raises(ValueError):
+        models("eb", "both", foo=lambda v_m: v_m, expr="v_m")
@@ -0,0 +1,101 @@
+import CoolProp.CoolProp as cp
+import numpy as np
+import pytest
+
+from two_phase import TwoPhase
+from two_phase import Properties as p
+from two_phase.saturation import Saturation
+
+T = np.array([20.0, 100.0, 180.0, 250.0])  # [°C]
+
+
+def coolprop(T=None, P=None, fluid="water"):
+    # Saturation properties of CoolProp at T [°C] or P [Pa]
+    var = ("T", np.asarray(T) + p.K) if P is None else ("P", np.asarray(P))
+    return {
+        "P": cp.PropsSI("P", *var, "Q", 0, fluid),
+        "rho_l": cp.PropsSI("D", *var, "Q", 0, fluid),
+        "rho_g": cp.PropsSI("D", *var, "Q", 1, fluid),
+        "mu_l": cp.PropsSI("V", *var, "Q", 0, fluid),
+        "mu_g": cp.PropsSI("V", *var, "Q", 1, fluid),
+        "sigma": cp.PropsSI("I", *var, "Q", 0, fluid),
+    }
+
+
+@pytest.fixture
+def tp():
+    tp = TwoPhase(d=0.05, l=8.1, theta=90)
+    tp.T, tp.P = T.copy(), np.full(T.size, 1e5)
+    tp.v_sg, tp.v_sl = np.full(T.size, 1.0), np.full(T.size, 0.5)
+    tp.set_saturation("water")
+    return tp
+
+
+def test_curve():
+    state = Saturation("water").state(T=T)
+    for k, v in coolprop(T=T).items():
+        np.testing.assert_allclose(state[k], v, rtol=1e-3, err_msg=k)
+    # Outside the curve
+    assert np.isnan(Saturation("water").state(T=400.0)["rho_l"])
+
+
+def test_by_pressure():
+    P = np.array([5e3, 1e5, 1e6, 5e6])
+    sat = Saturation("water", by="P")
+    assert sat.key == ("water", "P", 2000)
+    ref = coolprop(P=P)
+    state = sat.state(T=0.0, P=P)
+    for k in ("rho_l", "rho_g", "sigma"):
+        np.testing.assert_allclose(state[k], ref[k], rtol=1e-3, err_msg=k)
+
+
+def test_properties(tp):
+    ref = coolprop(T=T)
+    np.testing.assert_allclose(tp.rho_l[:], ref["rho_l"], rtol=1e-3)
+    np.testing.assert_allclose(tp.mu_g[:], ref["mu_g"], rtol=1e-3)
+    np.testing.assert_allclose(tp.sigma[:], ref["sigma"], rtol=1e-3)
+    np.testing.assert_allclose(tp.sigma[1], ref["sigma"][1], rtol=1e-3)
+    # The pressure of the call defines the state, not the Properties one
+    tp.set_saturation("water", by="P")
+    P = coolprop(T=T)["P"]
+    sigma = p.sigma(T=0.0, P=P)
+    np.testing.assert_allclose(sigma, ref["sigma"], rtol=1e-3)
+    tp.P = P
+    np.testing.assert_allclose(tp.sigma[:], ref["sigma"], rtol=1e-3)
+
+
+def test_single_lookup(tp, monkeypatch):
+    ref = tp.ptt.barnea1987(), tp.slug.taitelbarnea1990()["l_s"]
+    state = Saturation.state
+    calls = []
+
+    def count(self, T=None, P=None):
+        calls.append(1)
+        return state(self, T, P)
+
+    monkeypatch.setattr(Saturation, "state", count)
+    for foo in (
+        tp.ptt.barnea1987,
+        tp.ptt.taitel1980,
+        tp.hg.Rem,
+        tp.slug.taitelbarnea1990,
+        tp.eb_vel.petalasaziz2000,
+    ):
+        calls.clear()
+        foo()
+        assert len(calls) == 1
+    np.testing.assert_array_equal(tp.ptt.barnea1987(), ref[0])
+    np.testing.assert_array_equal(tp.slug.taitelbarnea1990()["l_s"], ref[1])
+
+
+def test_cache_key(tp, tmp_path):
+    tp.set_cache(path=str(tmp_path))
+    v_tb = tp.eb_vel.ebmodels()
+    tp.eb_vel.ebmodels()
+    tp.set_saturation("water", by="P")
+    tp.eb_vel.ebmodels()
+    tp.set_saturation(enable=False)
+    tp.eb_vel.ebmodels()
+    assert (tp.prop.cache.hits, tp.prop.cache.misses) == (1, 3)
+    tp.set_saturation("water")
+    np.testing.assert_array_equal(tp.eb_vel.ebmodels(), v_tb)
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from two_phase import scoring
+
+
+def data(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    meas = rng.uniform(0.5, 2.0, n)
+    pred = np.stack((meas + 0.1, 1.2 * meas, meas + rng.normal(0, 0.5, n)))
+    return pred, meas
+
+
+def test_metrics():
+    pred, meas = data()
+    val = scoring.metrics(pred, meas)
+    e = pred - meas
+    np.testing.assert_allclose(val["mae"], np.abs(e).mean(axis=1))
+    np.testing.assert_allclose(val["mape"], 100 * np.abs(e / meas).mean(axis=1))
+    np.testing.assert_allclose(val["bias"], e.mean(axis=1))
+    np.testing.assert_allclose(val["rmse"], np.sqrt((e ** 2).mean(axis=1)))
+
+
+def test_invalid_points():
+    # A zero measurement is only left out of the MAPE
+    val = scoring.metrics([1.0, 1.0, 1.0], [0.0, 1.0, 2.0])
+    np.testing.assert_allclose(val["mae"], [2 / 3])
+    np.testing.assert_allclose(val["bias"], [0.0])
+    np.testing.assert_allclose(val["mape"], [25.0])
+    # Non finite predictions are left out of the model only
+    val = scoring.metrics([[1.0, np.nan, 3.0], [2.0, 2.0, 2.0]], [1.0, 2.0, 2.0])
+    np.testing.assert_allclose(val["mae"], [0.5, 1 / 3])
+
+
+def test_bootstrap():
+    pred, meas = data(n=50)
+    n_boot = 20
+    boot = scoring.bootstrap(pred, meas, n_boot=n_boot, seed=3)
+    assert boot["rmse"].shape == (3, n_boot)
+    # Direct computation with the same resamples
+    rng = np.random.default_rng(np.random.SeedSequence(3).spawn(1)[0])
+    idx = rng.integers(0, meas.size, size=(n_boot, meas.size))
+    for b, i in enumerate(idx):
+        val = scoring.metrics(pred[:, i], meas[i])
+        for k in scoring.METRICS:
+            np.testing.assert_allclose(boot[k][:, b], val[k], rtol=1e-12)
+    # The chunks and the processes do not change the distributions
+    for kwargs in ({"chunk": 7}, {"chunk": 7, "workers": 2}):
+        out = scoring.bootstrap(pred, meas, n_boot=n_boot, seed=3, **kwargs)
+        out_ref = scoring.bootstrap(pred, meas, n_boot=n_boot, seed=3, chunk=7)
+        for k in scoring.METRICS:
+            np.testing.assert_allclose(out[k], out_ref[k], rtol=1e-12)
+
+
+def test_rank():
+    pred, meas = data()
+    rows = scoring.rank(pred, meas, models=["a", "b", "c"], n_boot=200)
+    assert [i[0] for i in rows] == ["a", "b", "c"]
+    for name, m, c in rows:
+        assert c["rmse"][0] <= m["rmse"] <= c["rmse"][1]
+    rows = scoring.rank(pred, meas, models=["a", "b", "c"], by="bias", n_boot=0)
+    assert rows[0][0] == "c" and rows[0][2] is None
+    txt = scoring.table(pred, meas, models=["a", "b", "c"], n_boot=0)
+    assert len(txt.splitlines()) == 4
+    with pytest.raises(ValueError):
+        scoring.rank(pred, meas, by="r2")
+
+
+def test_repeated_masks():
+    # The masks of the models without invalid points are shared, all the
+    # measurements are non zero so the MAPE masks are the same
+    pred, meas = data(n=50)
+    pred[2, 3] = np.nan
+    q, inv = scoring._unique_rows(scoring.errors(pred, meas))
+    assert q.shape[0] == 12 + 2
+    np.testing.assert_array_equal(q[inv], scoring.errors(pred, meas))
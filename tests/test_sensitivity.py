@@ -0,0 +1,104 @@
+import threading
+import warnings
+
+import numpy as np
+import pytest
+
+from two_phase import EBVelocity, TwoPhase
+from two_phase import Properties as p
+from two_phase import sensitivity
+
+G = 9.81
+
+
+@pytest.fixture
+def x():
+    # Points away from the regime switches (Fr_crit of bendiksen1984)
+    TwoPhase(d=0.05, l=8.1, theta=60)
+    rng = np.random.default_rng(0)
+    return {
+        "v_sg": rng.uniform(0.2, 5.0, 50),
+        "v_sl": rng.uniform(0.1, 1.0, 50),
+        "d": 0.05,
+        "theta": rng.uniform(10, 80, 50),
+        "T": rng.uniform(10, 40, 50),
+        "P": rng.uniform(1e5, 5e5, 50),
+    }
+
+
+def test_complex_vs_fd(x):
+    groups = ["EBVelocity", "Homogeneous", "Friction"]
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        J, names = sensitivity.jacobian(**x, groups=groups)
+    J_fd, names_fd = sensitivity.jacobian(**x, groups=groups, method="fd")
+    assert names == names_fd
+    assert J.shape == (50, len(names), len(sensitivity.INPUTS))
+    scale = np.abs(J).max(axis=0, keepdims=True) + 1e-300
+    np.testing.assert_allclose(J / scale, J_fd / scale, atol=1e-6)
+    # Exact derivatives of nicklin1962 and dukler1985
+    i = names.index("EBVelocity.nicklin1962")
+    np.testing.assert_allclose(J[:, i, 0], 1.2, rtol=1e-14)
+    np.testing.assert_allclose(J[:, i, 1], 1.2, rtol=1e-14)
+    i = names.index("EBVelocity.dukler1985")
+    np.testing.assert_allclose(J[:, i, 4:], 0.0, atol=1e-14)
+
+
+def test_taitel1980():
+    # Fixed points of every pattern, the boundaries are smooth functions of
+    # the velocities
+    TwoPhase(d=0.05, l=8.1, theta=60)
+    v_sg, v_sl = np.meshgrid([0.1, 0.5, 2.0, 10.0], [0.05, 0.3, 1.0, 3.0])
+    x = {"v_sg": v_sg.ravel(), "v_sl": v_sl.ravel(), "T": 20.0, "P": 2e5}
+    wrt = ("v_sg", "v_sl")
+    J, names = sensitivity.jacobian(**x, groups=["Pattern"], wrt=wrt)
+    J_fd, _ = sensitivity.jacobian(**x, groups=["Pattern"], wrt=wrt, method="fd")
+    assert len(names) == 6 and J.shape == (16, 6, 2)
+    assert np.isfinite(J).all()
+    np.testing.assert_allclose(J, J_fd, rtol=1e-7, atol=1e-9)
+    # Exact derivatives of the linear boundaries
+    np.testing.assert_allclose(J[:, 2, 0], 1 / 0.52 - 1, rtol=1e-14)
+    np.testing.assert_allclose(J[:, 3, 1], 1 / 3, rtol=1e-14)
+    np.testing.assert_allclose(J[:, 4, 1], -1.0, rtol=1e-14)
+
+
+def test_threads():
+    # The complex dtype of the Jacobian is only used by its thread
+    inside, done = threading.Event(), threading.Event()
+
+    def foo(x, g):
+        # Waits inside the complex step while the main thread runs a model
+        inside.set()
+        done.wait(10)
+        return ["v_m"], (p.cast(x["v_sg"]) + x["v_sl"],)
+
+    x = {"v_sg": np.array([1.0]), "v_sl": np.array([0.5])}
+    out = []
+    t = threading.Thread(
+        target=lambda: out.append(sensitivity._complex_step(foo, x, ["v_sg"], G))
+    )
+    t.start()
+    try:
+        assert inside.wait(10)
+        assert p.get_dtype() is np.float64
+        v_tb = EBVelocity.nicklin1962(np.array([1.0]), np.array([0.5]), 0.05, G)
+        assert v_tb.dtype == np.float64
+    finally:
+        done.set()
+        t.join()
+    np.testing.assert_allclose(out[0][1], 1.0)
+
+
+def test_chunks(x):
+    J, _ = sensitivity.jacobian(**x, groups=["Homogeneous"])
+    J_c, _ = sensitivity.jacobian(**x, groups=["Homogeneous"], chunk=7)
+    np.testing.assert_allclose(J_c, J, rtol=1e-12)
+
+
+def test_errors(x):
+    with pytest.raises(ValueError):
+        sensitivity.jacobian(**x, wrt=("rho_l",))
+    with pytest.raises(ValueError):
+        sensitivity.jacobian(**x, method="ad")
+    with pytest.raises(ValueError):
+        sensitivity.jacobian(**x, groups=["Slug"])
@@ -0,0 +1,155 @@
+import asyncio
+import json
+
+import numpy as np
+
+from two_phase import Pattern
+from two_phase import Properties as p
+from two_phase.server import EvalClient, EvalServer, Evaluator, LocalClient
+
+ARGS = {
+    "v_sg": [0.5, 1.0, 2.0],
+    "v_sl": [0.5, 0.2, 1.0],
+    "T": [20.0, 25.0, 30.0],
+    "P": [1e5, 2e5, 3e5],
+}
+
+
+def evaluator(**kwargs):
+    return Evaluator(d=0.0525, l=8.1, theta=90, **kwargs)
+
+
+def test_evaluator_fluids():
+    # The fluids are kept in the evaluator, the Properties are not changed
+    ev = evaluator(gas="nitrogen", liquid="water")
+    assert p.gas == "air"
+    rho_g, rho_l, mu_g, mu_l, sigma = ev.properties(ARGS["T"], ARGS["P"])
+    T, P = np.array(ARGS["T"]), np.array(ARGS["P"])
+    np.testing.assert_allclose(rho_g, p.rho(T=T, P=P, fluid="nitrogen"))
+    np.testing.assert_allclose(rho_l, p.rho(T=T, P=P, fluid="liq"))
+    # The Properties fluids when not given
+    rho_g = evaluator().properties(ARGS["T"], ARGS["P"])[0]
+    np.testing.assert_allclose(rho_g, p.rho(T=T, P=P, fluid="gas"))
+
+
+def test_evaluator_cache_size():
+    ev = evaluator(cache_size=10)
+    T = 10 + 0.5 * np.arange(50)
+    for i in range(3):
+        rho_g = ev.properties(T, np.full(T.size, 1e5))[0]
+        assert len(ev._cache) <= 10
+    np.testing.assert_allclose(rho_g, p.rho(T=T, P=np.full(T.size, 1e5), fluid="gas"))
+
+
+async def _round_trip(path, ev):
+    server = await EvalServer(ev, window=1e-3).start(path=path)
+    reader, writer = await asyncio.open_unix_connection(path)
+    lines = [
+        "[1, 2]",
+        '"x"',
+        "not json",
+        json.dumps({"id": 1, "op": "ebmodels", "args": [1, 2]}),
+        json.dumps({"id": 2, "op": ["ebmodels"], "args": ARGS}),
+        json.dumps({"id": 3, "op": "unknown", "args": ARGS}),
+        json.dumps({"id": 4, "op": "ebmodels", "args": dict(ARGS, v_sg=[[1], [1, 2]])}),
+        json.dumps({"id": 5, "op": "ebmodels", "args": ARGS}),
+    ]
+    writer.write(("\n".join(lines) + "\n").encode())
+    # A dead batcher would never reply
+    replies = [json.loads(await asyncio.wait_for(reader.readline(), 10)) for i in lines]
+    writer.close()
+    # The server is still running after the malformed requests
+    client = await EvalClient(path=path).connect()
+    res = await asyncio.wait_for(client.call("barnea1987", **ARGS), 10)
+    await client.close()
+    await server.close()
+    return replies, res
+
+
+def test_server_malformed_requests(tmp_path):
+    ev = evaluator()
+    replies, res = asyncio.run(_round_trip(str(tmp_path / "server.sock"), ev))
+    errors = [r for r in replies if "error" in r]
+    assert len(errors) == 7
+    assert sorted(r["id"] for r in errors if r["id"] is not None) == [1, 2, 3, 4]
+    ok = [r for r in replies if "result" in r]
+    assert [r["id"] for r in ok] == [5]
+    ref = ev.evaluate("ebmodels", ARGS)
+    np.testing.assert_allclose(ok[0]["result"], ref)
+    np.testing.assert_array_equal(res, ev.evaluate("barnea1987", ARGS))
+
+
+def test_local_client():
+    ev = evaluator()
+    client = LocalClient(ev)
+    res = asyncio.run(client.call("homogeneous", **ARGS))
+    np.testing.assert_allclose(res["gvf"], np.divide(ARGS["v_sg"], [1.0, 1.2, 3.0]))
+
+
+def test_evaluator_taitel1980():
+    # The batch is classified at once, same codes of the per-point model
+    ev = evaluator()
+    rng = np.random.default_rng(0)
+    args = {
+        "v_sg": 10 ** rng.uniform(-2, 1.5, 300),
+        "v_sl": 10 ** rng.uniform(-2, 0.5, 300),
+        "T": rng.uniform(15, 30, 300),
+        "P": rng.uniform(1e5, 3e5, 300),
+    }
+    ptt = ev.evaluate("taitel1980", args)
+    rho_g, rho_l, mu_g, mu_l, sigma = ev.properties(args["T"], args["P"])
+    ref = [
+        Pattern.taitel1980(*i, p.g, 8.1, 0.0525)
+        for i in zip(args["v_sg"], args["v_sl"], rho_g, rho_l, mu_l, sigma)
+    ]
+    np.testing.assert_array_equal(ptt, ref)
+    assert len(set(ref)) > 2
+
+
+class Writer(object):
+    # Writer side of a connection that records the calls
+    def __init__(self, error=None):
+        self.data = []
+        self.drained = 0
+        self.closed = False
+        self.error = error
+
+    def write(self, data):
+        self.data.append(data)
+
+    async def drain(self):
+        if self.error is not None:
+            raise self.error
+        self.drained += 1
+
+    def is_closing(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+
+async def _dropped(ev):
+    server = EvalServer(ev)
+    server._queue = asyncio.Queue()
+    # Connections reset by the client end the handler without errors
+    for err in (ConnectionResetError(), asyncio.IncompleteReadError(b"", 10)):
+        reader = asyncio.StreamReader()
+        reader.set_exception(err)
+        writer = Writer()
+        await server._handle(reader, writer)
+        assert writer.closed
+    # Every reply waits for the transport buffer
+    writer = Writer()
+    await server._reply(writer, {"id": 1, "result": 0})
+    assert writer.drained == 1
+    # Replies to a reset connection close it
+    writer = Writer(error=BrokenPipeError())
+    await server._reply(writer, {"id": 1, "result": 0})
+    assert writer.closed
+    await server._reply(writer, {"id": 2, "result": 0})
+    assert len(writer.data) == 1
+
+
+def test_server_dropped_connections():
+    asyncio.run(_dropped(evaluator()))
@@ -0,0 +1,58 @@
+import numpy as np
+
+from two_phase import EBVelocity, Slug, TwoPhase
+
+PROPS = dict(rho_g=1.19, rho_l=998.2, mu_g=1.8e-5, mu_l=1.0e-3, sigma=0.0728)
+G = 9.81
+
+
+def unit_cell(v_sg, v_sl, d, theta):
+    v_tb = EBVelocity.bendiksen1984(v_sg, v_sl, d, theta, G)
+    var = [PROPS[k] for k in ("rho_g", "rho_l", "mu_g", "mu_l", "sigma")]
+    return v_tb, Slug.taitelbarnea1990(v_sg, v_sl, v_tb, *var, G, d, theta)
+
+
+def test_taitelbarnea1990_closure():
+    v_sg = np.array([0.5, 1.0, 2.0, 0.5, 1.0, 2.0])
+    v_sl = np.array([0.5, 1.0, 0.5, 0.5, 1.0, 0.5])
+    theta = np.array([0, 0, 0, 90, 90, 90.0])
+    v_tb, res = unit_cell(v_sg, v_sl, 0.05, theta)
+    assert np.isfinite(res["l_u"]).all()
+    H_ls, H_lf, v_lf, v_gf = res["H_ls"], res["H_lf"], res["v_lf"], res["v_gf"]
+    # Slug body of the same mixture velocity
+    drho = PROPS["rho_l"] - PROPS["rho_g"]
+    u_0 = 1.53 * (G * drho * PROPS["sigma"] / PROPS["rho_l"] ** 2) ** 0.25
+    v_gls = 1.2 * (v_sg + v_sl) + u_0 * np.sqrt(H_ls) * np.sin(np.deg2rad(theta))
+    v_lls = (v_sg + v_sl - v_gls * (1 - H_ls)) / H_ls
+    beta = res["l_s"] / res["l_u"]
+    # Liquid and gas mass balances of the unit cell
+    q_l = beta * v_lls * H_ls + (1 - beta) * v_lf * H_lf
+    q_g = beta * v_gls * (1 - H_ls) + (1 - beta) * v_gf * (1 - H_lf)
+    np.testing.assert_allclose(q_l, v_sl, rtol=1e-10)
+    np.testing.assert_allclose(q_g, v_sg, rtol=1e-10)
+    # Liquid exchanged between the film and the slug body
+    np.testing.assert_allclose((v_tb - v_lls) * H_ls, (v_tb - v_lf) * H_lf, rtol=1e-10)
+    np.testing.assert_allclose(res["l_s"] + res["l_f"], res["l_u"])
+    np.testing.assert_allclose(res["freq"], v_tb / res["l_u"])
+    np.testing.assert_allclose(res["dp"], res["dp_g"] + res["dp_f"])
+
+
+def test_slugutil_eb_model():
+    tp = TwoPhase(d=0.05, l=8.1, theta=0)
+    tp.T, tp.P = np.full(2, 20.0), np.full(2, 1e5)
+    tp.v_sl, tp.v_sg = np.array([0.5, 1.0]), np.array([0.5, 1.0])
+    res = tp.slug.taitelbarnea1990(eb_model="nicklin1962")
+    v_tb = EBVelocity.nicklin1962(tp.v_sg, tp.v_sl, 0.05, G)
+    np.testing.assert_allclose(res["freq"] * res["l_u"], v_tb)
+
+
+def test_taitelbarnea1990_film_clamp():
+    # Thick films are limited to the slug body holdup, the film velocity is
+    # then the slug body one
+    v_sg = np.array([0.05, 0.06, 1.0])
+    v_tb, res = unit_cell(v_sg, np.full(3, 0.05), 0.05, -10.0)
+    np.testing.assert_allclose(res["H_lf"], res["H_ls"], rtol=1e-8)
+    annular = np.zeros(3, dtype=bool)
+    x = Slug.film_geometry(np.full(3, 0.5), annular)[3] / (np.pi / 4)
+    np.testing.assert_allclose(x, 0.5, rtol=1e-12)
+    np.testing.assert_allclose(Slug.film_holdup(0.5, annular, 0.5), 0.0, atol=1e-12)
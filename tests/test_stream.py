@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from two_phase import EBVelocity, Pattern
+from two_phase.stream import PatternStream
+
+# rho_g, rho_l, mu_l and sigma of air-water
+PROPS = (1.19, 998.2, 1.0e-3, 0.0728)
+BUBBLE = (0.05, 0.5)
+SLUG = (1.0, 0.5)
+
+
+def stream(**kwargs):
+    kwargs = dict(dict(d=0.1, l=8.1, theta=90, size=8, hold=3), **kwargs)
+    return PatternStream(props=lambda T, P: PROPS, **kwargs)
+
+
+def test_patterns():
+    for v, ptt in ((BUBBLE, 2), (SLUG, 3)):
+        assert Pattern.taitel1980(*v, *PROPS, 9.81, 8.1, 0.1) == ptt
+
+
+def test_hysteresis():
+    st = stream()
+    out = [st.update(*BUBBLE, 20.0, 1e5) for i in range(8)]
+    # The new pattern is confirmed after hold samples
+    assert out == [0, 0, 2, 2, 2, 2, 2, 2]
+    out = [st.update(*SLUG, 20.0, 1e5) for i in range(7)]
+    # Slug becomes the most frequent pattern of the window on the fifth
+    # sample and it is confirmed two samples later
+    assert out == [2, 2, 2, 2, 2, 2, 3]
+    assert st.text == "Slug"
+    # A single sample does not change the flow pattern
+    assert st.update(*BUBBLE, 20.0, 1e5) == 3
+    assert st.update(*SLUG, 20.0, 1e5) == 3
+
+
+def test_flicker():
+    # Alternating samples never confirm the change
+    st = stream()
+    for i in range(8):
+        st.update(*SLUG, 20.0, 1e5)
+    out = [st.update(*(BUBBLE if i % 2 else SLUG), 20.0, 1e5) for i in range(64)]
+    assert set(out) == {3}
+
+
+def test_update_batch():
+    rng = np.random.default_rng(0)
+    v = [BUBBLE, SLUG]
+    idx = np.repeat(rng.integers(0, 2, 20), rng.integers(1, 8, 20))
+    v_sg, v_sl = np.array([v[i] for i in idx]).T
+    T, P = np.full(idx.size, 20.0), np.full(idx.size, 1e5)
+    a, b = stream(), stream()
+    assert a.update_batch(v_sg, v_sl, T, P) == [
+        b.update(*i) for i in zip(v_sg, v_sl, T, P)
+    ]
+    # Window and mean velocities
+    w_sg, w_sl, w_ptt = a.window()
+    np.testing.assert_array_equal(w_sg, v_sg[-8:])
+    assert a.v_sg == pytest.approx(np.mean(v_sg[-8:]))
+    assert a.v_sl == pytest.approx(np.mean(v_sl[-8:]))
+
+
+def test_v_tb():
+    st = stream(eb_model="bendiksen1984")
+    for v in (BUBBLE, SLUG, SLUG):
+        st.update(*v, 20.0, 1e5)
+    v_sg, v_sl = np.mean([0.05, 1.0, 1.0]), 0.5
+    ref = EBVelocity.bendiksen1984(v_sg, v_sl, 0.1, 90, 9.81)
+    assert st.v_tb == pytest.approx(ref)
+    # Models with fluid properties use the ones of the last sample
+    st.eb_model = "petalasaziz2000"
+    ref = EBVelocity.petalasaziz2000(v_sg, v_sl, PROPS[1], PROPS[2], 0.1, 90, 9.81)
+    assert st.v_tb == pytest.approx(ref)
+    st.eb_model = "unknown"
+    with pytest.raises(ValueError):
+        st.v_tb
+
+
+def test_properties_cache():
+    calls = []
+
+    def props(T, P):
+        calls.append((T, P))
+        return PROPS
+
+    st = PatternStream(d=0.1, l=8.1, props=props, dT=0.1, dP=100.0, cache_size=2)
+    for T in (20.0, 20.01, 21.0, 22.0, 20.0):
+        st.update(*SLUG, T, 1e5)
+    # The quantized states are cached, the cache is cleared when full
+    assert len(calls) == 4
+    assert len(st._cache) <= 2
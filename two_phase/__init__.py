@@ -1,7 +1,7 @@
 # Simple access to the models
 from .flow_utils import Properties
 # Direct access to the models
-from .models import EBVelocity, Friction, Homogeneous, Pattern
+from .models import EBVelocity, Friction, Homogeneous, Pattern, Slug, Stratified
 from .two_phase import TwoPhase
 
 __version__ = "0.1.1"
@@ -0,0 +1,148 @@
+import hashlib
+import inspect
+import os
+
+import numpy as np
+
+
+class ResultCache(object):
+
+    # ======================= On-disk result cache ===========================
+
+    # Content addressed cache of the model results. The key is a hash of the
+    # model name, the library version, the source code of the functions of
+    # the model and all the inputs (arrays, fluids, geometry, options). The
+    # results are stored as .npy files named <model>-<code hash>-<key>.npy
+    # in the cache directory. Reading an entry updates its modification
+    # time, so the least recently used entries are removed first when the
+    # cache exceeds its size cap.
+
+    # Functions of each model whose source is part of the key
+    models = {}
+    # Code hash of each model, evaluated once per process
+    _codes = {}
+
+    def __init__(self, path=None, max_bytes=2 ** 30):
+        # path -> Cache directory, by default ~/.cache/two_phase
+        # max_bytes -> Size cap of the cache
+        if path is None:
+            path = os.path.join(os.path.expanduser("~"), ".cache", "two_phase")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(path, exist_ok=True)
+        pass
+
+    @staticmethod
+    def register(model, *funcs):
+        # Register the functions of a model
+        ResultCache.models[model] = funcs
+        ResultCache._codes.pop(model, None)
+
+    @staticmethod
+    def code_hash(model):
+        # Hash of the source code of the model functions
+        if model not in ResultCache._codes:
+            h = hashlib.sha256()
+            for foo in ResultCache.models.get(model, ()):
+                try:
+                    h.update(inspect.getsource(foo).encode())
+                except (OSError, TypeError):
+                    h.update(foo.__code__.co_code)
+            ResultCache._codes[model] = h.hexdigest()[:12]
+        return ResultCache._codes[model]
+
+    @staticmethod
+    def key(model, inputs):
+        # Hash of the inputs, arrays are hashed by dtype, shape and data
+        from . import __version__
+
+        h = hashlib.sha256()
+        h.update("{}\0{}\0".format(model, __version__).encode())
+        for name in sorted(inputs):
+            val = inputs[name]
+            h.update(name.encode() + b"\0")
+            if isinstance(val, (np.ndarray, list, tuple)):
+                val = np.ascontiguousarray(val)
+                h.update("{}{}".format(val.dtype.str, val.shape).encode())
+                h.update(val.tobytes())
+            else:
+                h.update(repr(val).encode())
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _file(self, model, key):
+        name = "{}-{}-{}.npy".format(model, ResultCache.code_hash(model), key)
+        return os.path.join(self.path, name)
+
+    def get_or_compute(self, model, inputs, foo):
+        # Return the cached result or evaluate foo() and store it
+        fname = self._file(model, ResultCache.key(model, inputs))
+        try:
+            res = np.load(fname, allow_pickle=False)
+            os.utime(fname)
+            self.hits += 1
+            return res
+        except (OSError, ValueError):
+            pass
+        self.misses += 1
+        res = np.asarray(foo())
+        # Atomic write, concurrent runs never read a partial file
+        tmp = "{}.{}.tmp".format(fname, os.getpid())
+        with open(tmp, "wb") as f:
+            np.save(f, res, allow_pickle=False)
+        os.replace(tmp, fname)
+        self.evict()
+        return res
+
+    # ============================ Maintenance ===============================
+
+    def entries(self):
+        # List of (path, size, mtime) of the entries, oldest first
+        out = []
+        for name in os.listdir(self.path):
+            if name.endswith(".npy"):
+                fname = os.path.join(self.path, name)
+                st = os.stat(fname)
+                out.append((fname, st.st_size, st.st_mtime))
+        return sorted(out, key=lambda i: i[2])
+
+    def size(self):
+        return sum(i[1] for i in self.entries())
+
+    def evict(self, max_bytes=None):
+        # Remove the least recently used entries above the size cap
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        ent = self.entries()
+        total = sum(i[1] for i in ent)
+        for fname, size, mtime in ent:
+            if total <= max_bytes:
+                break
+            os.remove(fname)
+            total -= size
+
+    def verify(self):
+        # Remove the entries created with an older code of a registered model
+        # and the entries that cannot be read, returns the number removed
+        removed = 0
+        for fname, size, mtime in self.entries():
+            model, code = os.path.basename(fname).split("-")[:2]
+            ok = model not in ResultCache.models or code == self.code_hash(model)
+            if ok:
+                try:
+                    np.load(fname, allow_pickle=False)
+                except (OSError, ValueError):
+                    ok = False
+            if not ok:
+                os.remove(fname)
+                removed += 1
+        return removed
+
+    def invalidate(self, model=None):
+        # Remove all the entries, or only the entries of the given model
+        for fname, size, mtime in self.entries():
+            if model is None or os.path.basename(fname).startswith(model + "-"):
+                os.remove(fname)
+
+    pass
@@ -0,0 +1,193 @@
+import numpy as np
+
+from .flow_utils import Properties as p
+from .models import EBVelocity
+from .solvers import least_squares
+
+# ============== Calibration of the elongated bubble correlations ============
+
+# The coefficients of nicklin1962, bendiksen1984 and theron1989 are fitted
+# to measured v_tb for many groups (fluid pairs, geometries, campaigns, ...)
+# at once. The residuals are the EBVelocity models themselves evaluated with
+# the per-point coefficients of its group and the Jacobians are analytic, the
+# fit is the batched Levenberg-Marquardt of solvers.least_squares.
+#
+# nicklin1962 and bendiksen1984 are linear in c, so they converge in one or
+# two iterations. The critical Froude number of bendiksen1984 is a regime
+# switch without derivative, it is fitted by profiling: the coefficients are
+# fitted for each Fr_crit candidate and the best one of each group is kept.
+# In theron1989 Fr_crit is a smooth parameter and it is fitted with c, as
+# log(Fr_crit) so it stays positive and 1 + Fr / Fr_crit * cos never vanishes.
+
+
+def _terms(v_sg, v_sl, d, theta, g):
+    # Variables shared by the models and their Jacobians
+    rad = np.deg2rad(theta)
+    s = np.sqrt(g * d)
+    return v_sg + v_sl, s, np.sin(rad), np.cos(rad), v_sl / s
+
+
+def _jac_nicklin1962(x, v_m, s, sin, cos, Fr):
+    return np.stack((v_m, s), axis=1)
+
+
+def _jac_bendiksen1984(x, v_m, s, sin, cos, Fr, Fr_crit):
+    hi = Fr >= Fr_crit
+    lo = ~hi
+    return np.stack(
+        (
+            lo * v_m,
+            lo * sin ** 2 * v_m,
+            lo * cos * s,
+            lo * sin * s,
+            hi * v_m,
+            hi * sin * s,
+        ),
+        axis=1,
+    )
+
+
+def _jac_theron1989(x, v_m, s, sin, cos, Fr):
+    c, F = x[:, :6].T, np.exp(x[:, 6])
+    TT = 1 + (Fr / F) * cos
+    # Derivative of v_tb with TT and of TT with log(Fr_crit)
+    dv_TT = (c[1] * v_m - c[4] * cos * s) / TT ** 2
+    dTT_F = -Fr * cos / F
+    return np.stack(
+        (
+            v_m,
+            -v_m / TT,
+            sin ** 2 * v_m,
+            -cos * s,
+            cos * s / TT,
+            sin * s,
+            dv_TT * dTT_F,
+        ),
+        axis=1,
+    )
+
+
+def calibrate(
+    model,
+    v_sg,
+    v_sl,
+    d,
+    theta,
+    v_tb,
+    groups=None,
+    g=None,
+    fit=None,
+    c0=None,
+    Fr_crit=3.5,
+    fit_Fr_crit=True,
+    Fr_grid=None,
+    **kwargs
+):
+    # Fit the coefficients of the model for each group of points
+    # model -> "nicklin1962", "bendiksen1984" or "theron1989"
+    # v_tb -> Measured elongated bubble velocity
+    # groups -> Label of the group of each point, a single group when None
+    # fit -> Indexes of the coefficients c to fit, all by default, the others
+    #        keep the values of c0
+    # c0 -> Initial coefficients, the EBVelocity defaults when None
+    # Fr_crit, fit_Fr_crit -> Initial (or fixed) critical Froude number
+    # Fr_grid -> Initial Fr_crit candidates of bendiksen1984
+    # kwargs -> Options of solvers.least_squares
+    # Returns a dictionary with the labels of the groups, the coefficients
+    # c (n_groups, k), Fr_crit (n_groups,), the RMSE and the number of
+    # points of each group
+    if model not in ("nicklin1962", "bendiksen1984", "theron1989"):
+        raise ValueError("Model without calibration: {}!".format(model))
+    g = p.g if g is None else g
+    var = (v_sg, v_sl, d, theta, v_tb)
+    var = np.broadcast_arrays(*[np.asarray(i, dtype=float) for i in var])
+    v_sg, v_sl, d, theta, v_tb = [i.ravel() for i in var]
+    groups = np.zeros(v_tb.size, dtype=int) if groups is None else groups
+    labels, groups = np.unique(np.ravel(groups), return_inverse=True)
+    n_groups = labels.size
+    # Points without measurement are left out
+    ok = np.isfinite(v_tb)
+    v_sg, v_sl, d, theta, v_tb, groups = [
+        i[ok] for i in (v_sg, v_sl, d, theta, v_tb, groups)
+    ]
+    terms = _terms(v_sg, v_sl, d, theta, g)
+
+    c0 = getattr(EBVelocity, model + "_c") if c0 is None else c0
+    k = len(c0)
+    mask = np.zeros(k + 1, dtype=bool)
+    mask[np.arange(k) if fit is None else fit] = True
+    # Fr_crit is the last parameter of theron1989
+    mask[k] = model == "theron1989" and fit_Fr_crit
+    x0 = np.tile(np.append(np.asarray(c0, dtype=float), Fr_crit), (n_groups, 1))
+    if model == "theron1989":
+        x0[:, k] = np.log(x0[:, k])
+    # The linear models need almost no damping, Gauss-Newton is exact
+    if model != "theron1989":
+        kwargs.setdefault("lam", 1e-9)
+
+    def fun(x, *extra):
+        foo = getattr(EBVelocity, model)
+        if model == "nicklin1962":
+            v = foo(v_sg, v_sl, d, g, c=x[:, :k].T)
+        else:
+            F = extra[0] if extra else np.exp(x[:, k])
+            v = foo(v_sg, v_sl, d, theta, g, c=x[:, :k].T, Fr_crit=F)
+        return v - v_tb
+
+    def jac(x, *extra):
+        if model == "nicklin1962":
+            J = _jac_nicklin1962(x, *terms)
+        elif model == "bendiksen1984":
+            J = _jac_bendiksen1984(x, *terms, *extra)
+        else:
+            J = _jac_theron1989(x, *terms)
+        J = np.concatenate((J, np.zeros((J.shape[0], k + 1 - J.shape[1]))), axis=1)
+        # Coefficients kept constant
+        return J * mask
+
+    if model == "bendiksen1984" and fit_Fr_crit:
+        # The cost only changes when Fr_crit crosses the Froude number of a
+        # point. The cost is profiled on the Fr_crit grid and then on the
+        # Froude numbers of the points of each group around the best value.
+        Fr_grid = np.linspace(1, 8, 36) if Fr_grid is None else np.sort(Fr_grid)
+        step = np.diff(Fr_grid).max() if len(Fr_grid) > 1 else 0.0
+        best = np.full(n_groups, np.inf)
+        x = x0.copy()
+
+        def profile(F):
+            x_F, cost = least_squares(fun, jac, x0, groups, (F[groups],), **kwargs)
+            x_F[:, k] = F
+            better = cost < best
+            x[better], best[better] = x_F[better], cost[better]
+
+        for F in Fr_grid:
+            profile(np.full(n_groups, F))
+        # Froude numbers sorted by group, the offset keeps the groups apart
+        # in the search key
+        Fr = terms[4][np.lexsort((terms[4], groups))]
+        big = np.abs(Fr).max() + 2 * step + 1
+        key = np.sort(groups) * big + Fr
+        off = np.arange(n_groups) * big
+        i0 = np.searchsorted(key, off + x[:, k] - step, side="left")
+        i1 = np.searchsorted(key, off + x[:, k] + step, side="right")
+        for j in range(int(np.max(i1 - i0, initial=0))):
+            idx = np.minimum(i0 + j, np.maximum(i1 - 1, 0))
+            profile(np.where(i1 > i0, Fr[idx], x[:, k]))
+        cost = best
+    elif model == "bendiksen1984":
+        F_pts = np.full(v_tb.size, float(Fr_crit))
+        x, cost = least_squares(fun, jac, x0, groups, (F_pts,), **kwargs)
+    else:
+        x, cost = least_squares(fun, jac, x0, groups, **kwargs)
+        x[:, k] = np.exp(x[:, k])
+
+    n = np.bincount(groups, minlength=n_groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rmse = np.sqrt(cost / n)
+    return {
+        "groups": labels,
+        "c": x[:, :k],
+        "Fr_crit": x[:, k],
+        "rmse": rmse,
+        "n": n,
+    }
@@ -0,0 +1,196 @@
+import CoolProp.CoolProp as cp
+import numpy as np
+
+from .flow_utils import Properties as p
+
+
+class DensityTable(object):
+
+    # ===================== Bulk specific mass lookup ========================
+
+    # Calling the equation of state for every DAQ sample is the bottleneck of
+    # the conversions. The table evaluates the specific mass once on a regular
+    # (T, P) grid and the samples are obtained by bilinear interpolation. The
+    # samples outside the table are evaluated directly with Properties.rho.
+    # The specific mass jumps at the saturation line, so the table is clipped
+    # to the single-phase side of the fluid.
+
+    def __init__(
+        self,
+        fluid="gas",
+        T_lim=(0, 100),
+        P_lim=(0.5e5, 20e5),
+        n=(101, 101),
+        phase=None,
+    ):
+        # fluid -> "liq", "gas" or a CoolProp fluid name
+        # T_lim -> [T_min, T_max] [°C]
+        # P_lim -> [P_min, P_max] [Pa]
+        # n -> Number of points of the table in T and P
+        # phase -> "gas" or "liq", side of the saturation line of the table,
+        #          see single_phase
+        self.fluid = fluid
+        T_lim = DensityTable.single_phase(fluid, T_lim, P_lim, phase=phase)
+        self.T = np.linspace(T_lim[0], T_lim[1], n[0])
+        self.P = np.linspace(P_lim[0], P_lim[1], n[1])
+        T, P = np.meshgrid(self.T, self.P, indexing="ij")
+        rho = p.rho(T=T.ravel(), P=P.ravel(), fluid=fluid)
+        self.rho = np.asarray(rho, dtype=float).reshape(T.shape)
+        pass
+
+    @staticmethod
+    def single_phase(fluid, T_lim, P_lim, margin=0.01, phase=None):
+        # Temperature range of the table without phase changes. The gas is
+        # kept above the saturation temperature of P_max and the liquid
+        # between the triple point and the saturation temperature of P_min,
+        # so the whole pressure range is single-phase.
+        # margin [°C] -> Distance to the saturation line
+        # phase -> "gas" or "liq", by default the phase of the configured
+        #          fluids, and for other CoolProp names the side with the
+        #          widest part of the range
+        if p.custom_functions() or p.saturation is not None:
+            return T_lim
+        name = {"liq": p.liq, "gas": p.gas}.get(fluid, fluid)
+        if phase is None and fluid in ("gas", p.gas):
+            phase = "gas"
+        elif phase is None and fluid in ("liq", p.liq):
+            phase = "liq"
+        elif phase not in (None, "gas", "liq"):
+            raise ValueError("The phase of the table is gas or liq!")
+        T_lo, T_hi = T_lim
+        P_crit = cp.PropsSI("pcrit", name)
+        if P_lim[0] < P_crit:
+            P = [max(P_lim[0], cp.PropsSI("ptriple", name)), min(P_lim[1], P_crit)]
+            T_sat = cp.PropsSI("T", "P", P, "Q", 0, name) - p.K
+            gas = (max(T_lo, T_sat[1] + margin), T_hi)
+            T_tr = cp.PropsSI("Ttriple", name) - p.K
+            liq = (max(T_lo, T_tr + margin), min(T_hi, T_sat[0] - margin))
+            if phase is None:
+                phase = "gas" if gas[1] - gas[0] >= liq[1] - liq[0] else "liq"
+            T_lo, T_hi = gas if phase == "gas" else liq
+        if T_lo >= T_hi:
+            txt = "The table range of {} has no single-phase states!"
+            raise ValueError(txt.format(name))
+        return T_lo, T_hi
+
+    def __call__(self, T, P):
+        T, P = np.broadcast_arrays(
+            np.asarray(T, dtype=float), np.asarray(P, dtype=float)
+        )
+        shape = T.shape
+        T, P = T.ravel(), P.ravel()
+        # Fractional indexes in the table
+        x = (T - self.T[0]) * ((self.T.size - 1) / (self.T[-1] - self.T[0]))
+        y = (P - self.P[0]) * ((self.P.size - 1) / (self.P[-1] - self.P[0]))
+        out = (x < 0) | (x > self.T.size - 1) | (y < 0) | (y > self.P.size - 1)
+        i = np.clip(x.astype(int), 0, self.T.size - 2)
+        j = np.clip(y.astype(int), 0, self.P.size - 2)
+        x -= i
+        y -= j
+        # Bilinear interpolation
+        r = self.rho
+        rho = (r[i, j] * (1 - x) + r[i + 1, j] * x) * (1 - y)
+        rho += (r[i, j + 1] * (1 - x) + r[i + 1, j + 1] * x) * y
+        if out.any():
+            rho[out] = p.rho(T=T[out], P=P[out], fluid=self.fluid)
+        return rho.reshape(shape)
+
+    pass
+
+
+class BatchConvert(object):
+
+    # ============ Flow meter signals to superficial velocities ==============
+
+    # The flow is converted to the local superficial velocity in a single
+    # pass over the samples, using the mass conservation between the meter
+    # (or the standard) conditions and the local conditions:
+    # v_s = flow * unit * rho_ref / (rho_local * A)
+    # where rho_ref = 1 for mass flows.
+
+    # Unit factors to SI
+    units = {
+        "kg/s": 1.0,
+        "kg/min": 1 / 60,
+        "kg/h": 1 / 3600,
+        "m3/s": 1.0,
+        "m3/min": 1 / 60,
+        "m3/h": 1 / 3600,
+        "L/s": 1e-3,
+        "L/min": 1e-3 / 60,
+        "L/h": 1e-3 / 3600,
+    }
+
+    # Standard conditions [°C, Pa]
+    T_std = 15.0
+    P_std = 101325.0
+
+    def __init__(self, d=None, table=True, **kwargs):
+        # d -> [m] Pipe diameter
+        # table -> Use DensityTable for the specific mass, the kwargs are
+        #          passed to the table
+        self.d = p.d if d is None else d
+        self.table = table
+        self.kwargs = kwargs
+        self._tables = {}
+        pass
+
+    def rho(self, T, P, fluid):
+        # Specific mass from the table of the fluid, built on the first use
+        if not self.table:
+            # CoolProp takes 1-D arrays
+            T, P = np.broadcast_arrays(
+                np.asarray(T, dtype=float), np.asarray(P, dtype=float)
+            )
+            rho = p.rho(T=T.ravel(), P=P.ravel(), fluid=fluid)
+            return np.asarray(rho, dtype=float).reshape(T.shape)
+        if fluid not in self._tables:
+            self._tables[fluid] = DensityTable(fluid=fluid, **self.kwargs)
+        return self._tables[fluid](T, P)
+
+    @staticmethod
+    def scale(signal, lo, hi, sig_lo=4.0, sig_hi=20.0):
+        # Linear scaling of a DAQ signal (e.g. 4-20 mA) to the meter range
+        return lo + (np.asarray(signal, dtype=float) - sig_lo) * (
+            (hi - lo) / (sig_hi - sig_lo)
+        )
+
+    def superficial(
+        self, flow, unit, T, P, fluid="gas", T_ref=None, P_ref=None, rho_ref=None
+    ):
+        # flow -> Mass or volumetric flow in the given unit
+        # T, P -> Local temperature [°C] and pressure [Pa]
+        # T_ref, P_ref -> Meter conditions of a volumetric flow, the
+        #                 standard conditions are used when not given
+        # rho_ref -> Specific mass at the meter conditions, overrides T_ref
+        #            and P_ref
+        if unit not in self.units:
+            raise ValueError("Unknown unit: {}!".format(unit))
+        # Constant part of the conversion
+        fct = self.units[unit] / (np.pi * ((self.d / 2) ** 2))
+        # Specific mass at the meter conditions
+        if unit.startswith("kg"):
+            ref = 1.0
+        elif rho_ref is not None:
+            ref = rho_ref
+        else:
+            T_ref = self.T_std if T_ref is None else T_ref
+            P_ref = self.P_std if P_ref is None else P_ref
+            ref = self.rho(T_ref, P_ref, fluid)
+        rho = self.rho(T, P, fluid)
+        # Fused evaluation reusing the same output array, with the shape of
+        # all the inputs (e.g. a constant flow and arrays of T and P)
+        shape = np.broadcast_shapes(*[np.shape(i) for i in (flow, fct, ref, rho)])
+        v_s = np.multiply(flow, fct, out=np.empty(shape))
+        v_s *= ref
+        v_s /= rho
+        return v_s[()]
+
+    def superficial2(self, flow_g, unit_g, flow_l, unit_l, T, P, **kwargs):
+        # Gas and liquid superficial velocities, the kwargs are the reference
+        # conditions of the gas meter
+        v_sg = self.superficial(flow_g, unit_g, T, P, fluid="gas", **kwargs)
+        v_sl = self.superficial(flow_l, unit_l, T, P, fluid="liq")
+        return v_sg, v_sl
+
+    pass
@@ -1,3 +1,6 @@
+import threading
+from contextlib import contextmanager
+
 import CoolProp.CoolProp as cp
 import numpy as np
 from .utils import iterable
@@ -48,6 +51,81 @@ class Properties(object):
     mu_l_default = False
     mu_g_default = False
 
+    # Optional on-disk cache of the model results (cache.ResultCache)
+    cache = None
+
+    # Optional saturation backend (saturation.Saturation), both phases are
+    # the same fluid at the saturation state, e.g. steam-water
+    saturation = None
+
+    # Floating point type of the models inputs and outputs
+    dtype = np.float64
+    dtypes = (np.float32, np.float64)
+
+    # Per-thread override of the dtype (local_dtype), e.g. the complex
+    # evaluations of sensitivity.py, the other threads keep the policy
+    _local = threading.local()
+
+    @staticmethod
+    def set_dtype(dtype):
+        # float64 (default) or float32, halves the memory of large batches
+        dtype = np.dtype(dtype).type
+        if dtype not in Properties.dtypes:
+            raise ValueError("Unsupported dtype: {}!".format(dtype))
+        Properties.dtype = dtype
+
+    @staticmethod
+    def get_dtype():
+        # dtype of the models in the current thread
+        return getattr(Properties._local, "dtype", Properties.dtype)
+
+    @staticmethod
+    @contextmanager
+    def local_dtype(dtype):
+        # Evaluate the models with dtype (any NumPy type, e.g. complex128)
+        # in the current thread only
+        local = Properties._local
+        old = getattr(local, "dtype", None)
+        local.dtype = dtype
+        try:
+            yield dtype
+        finally:
+            if old is None:
+                del local.dtype
+            else:
+                local.dtype = old
+
+    @staticmethod
+    def cast(*args):
+        # Convert the arguments to the dtype policy, so mixing them never
+        # upcasts the result. Scalars stay scalars (0-d arrays are much
+        # slower in the per-point models): the ones of the dtype and the
+        # Python scalars with float64 are kept, the others are converted.
+        dtype = Properties.get_dtype()
+        keep = (float, int, dtype) if dtype is np.float64 else (dtype,)
+        scalar = (np.generic, float, int, complex)
+        out = []
+        for a in args:
+            if a is None or type(a) in keep:
+                out.append(a)
+            elif isinstance(a, scalar):
+                out.append(dtype(a))
+            else:
+                out.append(np.asarray(a, dtype=dtype))
+        return out[0] if len(out) == 1 else out
+
+    @staticmethod
+    def custom_functions():
+        # Check if any custom property function is in use
+        p = Properties
+        return (
+            p.sigma_default
+            or p.rho_l_default
+            or p.rho_g_default
+            or p.mu_l_default
+            or p.mu_g_default
+        )
+
     # TODO: check what the "prop"_type means and consider removing it
     # FIXING this issue
     # Properties decision functions
@@ -64,14 +142,17 @@ class Properties(object):
         if callable(foo):
             # Use the passed function
             rho = foo(T, P)
-        elif fluid is "liq":
+        elif p.saturation is not None and fluid in ("liq", "gas"):
+            # Saturated liquid or vapour
+            rho = p.saturation.rho(T, P, fluid=fluid)
+        elif fluid == "liq":
             if p.rho_l_default:
                 # Use custom function
                 rho = p.rho_l_func(T, P)
             else:
                 # Use coolprop library to get the fluid properties
                 rho = cp.PropsSI("D", "T", T + p.K, "P", P, p.liq)
-        elif fluid is "gas":
+        elif fluid == "gas":
             if p.rho_g_default:
                 # Use custom function
                 rho = p.rho_l_func(T, P)
@@ -82,7 +163,7 @@ class Properties(object):
             # Unknown fluid
             # Use coolprop library to get the fluid properties
             rho = cp.PropsSI("D", "T", T + p.K, "P", P, fluid)
-        return rho
+        return Properties.cast(rho)
 
     @staticmethod
     def mu(T=None, P=None, foo=None, fluid=None):
@@ -98,14 +179,17 @@ class Properties(object):
         if callable(foo):
             # Use the passed function
             mu = foo(T, P)
-        elif fluid is "liq":
+        elif p.saturation is not None and fluid in ("liq", "gas"):
+            # Saturated liquid or vapour
+            mu = p.saturation.mu(T, P, fluid=fluid)
+        elif fluid == "liq":
             if p.mu_l_default:
                 # Use custom function
                 mu = p.mu_l_func(T, P)
             else:
                 # Use coolprop library to get the fluid properties
                 mu = cp.PropsSI("V", "T", T + p.K, "P", P, p.liq)
-        elif fluid is "gas":
+        elif fluid == "gas":
             if p.mu_g_default:
                 # Use custom function
                 mu = p.mu_l_func(T, P)
@@ -116,30 +200,35 @@ class Properties(object):
             # Unknown fluid
             # Use coolprop library to get the fluid properties
             mu = cp.PropsSI("V", "T", T + p.K, "P", P, fluid)
-        return mu
+        return Properties.cast(mu)
 
     @staticmethod
-    def sigma(T=None, x=None, foo=None, fluid=None):
+    def sigma(T=None, x=None, foo=None, fluid=None, P=None):
         # x = quality
         # In case you want to use custom function saved on the class
         # use the fluid var to specify if you the gas or liquid function.
         p = Properties
         #  Check the defined variables
         T = p.T if T is None else T
+        P = p.P if P is None else P
         x = 0.0 if x is None else x
-        fluid = p.liq if fluid is None else fluid
         # Check which method to use
         if callable(foo):
             # Use the passed function
             sigma = foo(T, x)
+        elif p.saturation is not None and fluid in (None, "liq", "gas", p.liq):
+            # Interface of the saturated phases, the saturation state may be
+            # defined by the pressure
+            sigma = p.saturation.sigma(T, P)
         else:
+            fluid = {None: p.liq, "liq": p.liq, "gas": p.gas}.get(fluid, fluid)
             if p.sigma_default:
                 # Use custom function
                 sigma = p.sigma_func(T, x)
             else:
                 # Use coolprop library to get the fluid properties
                 sigma = cp.PropsSI("I", "Q", x, "T", T + p.K, fluid)
-        return sigma
+        return Properties.cast(sigma)
 
     pass
 
@@ -152,36 +241,49 @@ class Convert(object):
         pass
 
     # ==================== General convertions ===========================
-    def kgmin2m3s(self, m, T=None, P=None, d=None, rho=None, foo=None, fluid=None):
+    # For large arrays of DAQ samples use the conversion.BatchConvert
+
+    @staticmethod
+    def kgmin2m3s(m, T=None, P=None, d=None, rho=None, foo=None, fluid=None):
         # m -> [kg/min]
         # t -> [°C]
         # p -> [Pa]
         # d -> [m]
         # Get the specific mass [kg/m^3]
-        rho = self.p.rho(rho_type=rho, T=T, P=P, foo=foo, fluid=fluid)
+        p = Convert.p
+        rho = p.rho(T=T, P=P, foo=foo, fluid=fluid) if rho is None else rho
         # Calculate m^3/s
         Q_f = m / (60 * rho)
         return Q_f
 
-    def Qx2Qy(self, Qx, T, P):
-        # Static function => Candidate
+    @staticmethod
+    def Qx2Qy(Qx, T, P, T_y=None, P_y=None):
         # Volume x to volume y using ideal gas equation
         # qx -> m3/s
-        # T -> [T_x, T_y] [°C]
-        # P -> [P_x, P_y] [Pa]
-        p = self.p
-        T = [T + p.K, p.T + p.K] if type(T) is not list else T
-        P = [P, p.P] if type(P) is not list else P
+        # T -> T_x or (T_x, T_y) [°C]
+        # P -> P_x or (P_x, P_y) [Pa]
+        # T_y, P_y -> Conditions y, by default the Properties T and P
+        # Lists and arrays are samples, only tuples are pairs of conditions
+        p = Convert.p
+        # Legacy pairs of conditions
+        if type(T) is tuple and len(T) == 2:
+            T, T_y = T
+        if type(P) is tuple and len(P) == 2:
+            P, P_y = P
+        T_y = p.T if T_y is None else T_y
+        P_y = p.P if P_y is None else P_y
         # Perform the calculation
-        Qy = ((P[0] * T[1]) / (P[1] * T[0])) * Qx
+        T_x, T_y = np.asarray(T) + p.K, np.asarray(T_y) + p.K
+        Qy = ((np.asarray(P) * T_y) / (np.asarray(P_y) * T_x)) * Qx
         return Qy
 
-    def m3s2vs(self, Q, d=None):
+    @staticmethod
+    def m3s2vs(Q, d=None):
         # q -> m^3/s
         # d -> m
-        p = self.p
+        p = Convert.p
         # Check if the variable exists
-        d = p.d if not d else d
+        d = p.d if d is None else d
         # Calculate
         vs = Q / (np.pi * ((d / 2) ** 2))
         return vs
@@ -202,11 +304,15 @@ class PropertyUtil(object):
         T = self.p.T
         P = self.p.P
         # Get fluid
-        fluid = self.p.liq if self.fluid is "liq" else self.p.gas
+        fluid = self.p.liq if self.fluid == "liq" else self.p.gas
+        # The saturated phases are the same fluid
+        fluid = self.fluid if self.p.saturation is not None else fluid
         # Get property
-        if self.prop is "rho":
+        if self.prop == "rho":
             return self.p.rho(T=T[index], P=P[index], foo=None, fluid=fluid)
-        elif self.prop is "mu":
+        elif self.prop == "mu":
             return self.p.mu(T=T[index], P=P[index], foo=None, fluid=fluid)
-        elif self.prop is "sigma":
-            return self.p.sigma(T=T[index], x=0.0, foo=None, fluid=fluid)
+        elif self.prop == "sigma":
+            # Interface of the phases, sigma resolves the phase name
+            T, P = T[index], P[index]
+            return self.p.sigma(T=T, x=0.0, foo=None, fluid=self.fluid, P=P)
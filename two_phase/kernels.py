@@ -0,0 +1,384 @@
+import os
+import warnings
+
+import numpy as np
+
+from .flow_utils import Properties as p
+from .models import EBVelocity, Friction, Homogeneous, Pattern
+
+try:
+    import numba
+
+    HAS_NUMBA = True
+except ImportError:
+    numba = None
+    HAS_NUMBA = False
+
+
+# ====================== Optional compiled kernels ===========================
+
+# Each model is written as a single loop over the points, so the whole model
+# is evaluated in one pass without the NumPy temporaries. With Numba the
+# loops are compiled with parallel=True, as every point is independent.
+# Without Numba the reference NumPy implementations of models.py are used.
+#
+# The backend is selected at runtime with set_backend("numba") or with the
+# TWO_PHASE_BACKEND environment variable. The utils get the function to call
+# with dispatch(), e.g. dispatch(EBVelocity.nicklin1962)(v_sg, v_sl, d, g).
+#
+# Inside the loops every argument is a 1-D array with the number of points
+# or with a single value (scalars), the stride s_x is 1 or 0 respectively.
+# The arguments and the outputs follow the Properties dtype policy.
+
+BACKENDS = ("numpy", "numba")
+_backend = "numpy"
+
+
+def set_backend(name):
+    # Select the backend, falls back to NumPy when Numba is not installed
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError("Unknown backend: {}!".format(name))
+    if name == "numba" and not HAS_NUMBA:
+        warnings.warn("Numba is not installed, using the NumPy backend.")
+        name = "numpy"
+    _backend = name
+
+
+def get_backend():
+    return _backend
+
+
+def _jit(foo):
+    if HAS_NUMBA:
+        return numba.njit(parallel=True, fastmath=False, cache=True)(foo)
+    return foo
+
+
+def _prange(n):
+    # Replaced by numba.prange inside the compiled kernels
+    return range(n)
+
+
+if HAS_NUMBA:
+    _prange = numba.prange
+
+
+def _prepare(*args):
+    # Broadcast shape, number of points and the 1-D arguments
+    args = [np.asarray(a, dtype=p.get_dtype()) for a in args]
+    shape = np.broadcast(*args).shape
+    n = int(np.prod(shape))
+    out = []
+    for a in args:
+        if a.size == 1:
+            out.append(a.reshape(1))
+        elif a.shape == shape:
+            out.append(np.ascontiguousarray(a).reshape(n))
+        else:
+            out.append(np.ascontiguousarray(np.broadcast_to(a, shape)).reshape(n))
+    return shape, n, out
+
+
+def _output(res, shape):
+    # Keep a scalar output for scalar inputs
+    return res.reshape(shape)[()]
+
+
+# ============================ Loops =========================================
+
+
+@_jit
+def _eb_loop(model, v_sg, v_sl, d, theta, rho_l, mu_l, g, c, Fr_crit, n):
+    # model: 0 nicklin1962, 1 bendiksen1984, 2 theron1989,
+    #        3 petalasaziz2000, 4 dukler1985
+    # c: coefficients of the model, the *_c of EBVelocity by default
+    s_g = 1 if v_sg.shape[0] > 1 else 0
+    s_l = 1 if v_sl.shape[0] > 1 else 0
+    s_d = 1 if d.shape[0] > 1 else 0
+    s_t = 1 if theta.shape[0] > 1 else 0
+    s_r = 1 if rho_l.shape[0] > 1 else 0
+    s_m = 1 if mu_l.shape[0] > 1 else 0
+    out = np.empty(n, dtype=v_sg.dtype)
+    for i in _prange(n):
+        vg = v_sg[i * s_g]
+        vl = v_sl[i * s_l]
+        di = d[i * s_d]
+        v_m = vg + vl
+        if model == 0:
+            out[i] = c[0] * v_m + c[1] * np.sqrt(g * di)
+        elif model == 4:
+            out[i] = 1.225 * v_m
+        elif model == 3:
+            th = np.deg2rad(theta[i * s_t])
+            Re_v = (rho_l[i * s_r] * v_m * di) / mu_l[i * s_m]
+            out[i] = (1.64 + 0.12 * np.sin(th)) / (Re_v ** 0.031) * v_m
+        else:
+            th = np.deg2rad(theta[i * s_t])
+            sin = np.sin(th)
+            cos = np.cos(th)
+            Fr_v = vl / np.sqrt(g * di)
+            if model == 1:
+                if Fr_v >= Fr_crit:
+                    c_0 = c[4]
+                    c_1 = c[5] * sin
+                else:
+                    c_0 = c[0] + c[1] * sin ** 2
+                    c_1 = c[2] * cos + c[3] * sin
+            else:
+                TT = 1 + (Fr_v / Fr_crit) * cos
+                c_0 = c[0] - c[1] / TT + c[2] * sin ** 2
+                c_1 = (-c[3] + c[4] / TT) * cos + c[5] * sin
+            out[i] = c_0 * v_m + c_1 * np.sqrt(g * di)
+    return out
+
+
+@_jit
+def _homogeneous_loop(v_sg, v_sl, rho_g, rho_l, mu_g, mu_l, d, n):
+    # Returns gvf, rho_m, mu_m and Re_m
+    s_g = 1 if v_sg.shape[0] > 1 else 0
+    s_l = 1 if v_sl.shape[0] > 1 else 0
+    s_rg = 1 if rho_g.shape[0] > 1 else 0
+    s_rl = 1 if rho_l.shape[0] > 1 else 0
+    s_mg = 1 if mu_g.shape[0] > 1 else 0
+    s_ml = 1 if mu_l.shape[0] > 1 else 0
+    s_d = 1 if d.shape[0] > 1 else 0
+    out = np.empty((4, n), dtype=v_sg.dtype)
+    for i in _prange(n):
+        v_m = v_sg[i * s_g] + v_sl[i * s_l]
+        gvf = v_sg[i * s_g] / v_m
+        rho_m = gvf * rho_g[i * s_rg] + (1 - gvf) * rho_l[i * s_rl]
+        mu_m = gvf * mu_g[i * s_mg] + (1 - gvf) * mu_l[i * s_ml]
+        out[0, i] = gvf
+        out[1, i] = rho_m
+        out[2, i] = mu_m
+        out[3, i] = rho_m * v_m * d[i * s_d] / mu_m
+    return out
+
+
+@_jit
+def _blasius_loop(Re, lmt, c_lam, c_tur, n):
+    s_r = 1 if Re.shape[0] > 1 else 0
+    out = np.empty(n, dtype=Re.dtype)
+    for i in _prange(n):
+        r = Re[i * s_r]
+        if r < lmt:
+            out[i] = c_lam / r
+        else:
+            out[i] = c_tur * r ** (-0.2)
+    return out
+
+
+@_jit
+def _taitel1980_loop(v_sg, v_sl, rho_g, rho_l, mu_l, sigma, g, l, d, n):
+    s_g = 1 if v_sg.shape[0] > 1 else 0
+    s_l = 1 if v_sl.shape[0] > 1 else 0
+    s_rg = 1 if rho_g.shape[0] > 1 else 0
+    s_rl = 1 if rho_l.shape[0] > 1 else 0
+    s_ml = 1 if mu_l.shape[0] > 1 else 0
+    s_s = 1 if sigma.shape[0] > 1 else 0
+    s_ll = 1 if l.shape[0] > 1 else 0
+    s_d = 1 if d.shape[0] > 1 else 0
+    out = np.empty(n, dtype=np.int64)
+    for i in _prange(n):
+        vg = v_sg[i * s_g]
+        vl = v_sl[i * s_l]
+        rg = rho_g[i * s_rg]
+        rl = rho_l[i * s_rl]
+        ml = mu_l[i * s_ml]
+        sg = sigma[i * s_s]
+        li = l[i * s_ll]
+        di = d[i * s_d]
+        if vg == 0:
+            out[i] = 0
+            continue
+        # Same equations of Pattern.taitel1980
+        v_sg_j = (3.1 * (sg * g * (rl - rg)) ** 0.25) / (rg ** 0.5)
+        v_m = vl + vg
+        f_l1 = 2 * (((0.4 * sg) / ((rl - rg) * g)) ** 0.5) * ((rl / sg) ** 0.6)
+        f_l2 = ((((2 * 0.046) / di) * ((rl * di / ml) ** -0.2)) ** 0.4) * (
+            v_m ** 1.12
+        )
+        f_r = 0.725 + 4.15 * ((vg / v_m) ** 0.5)
+        f = f_l1 * f_l2 - f_r
+        v_sl_g = vg / 0.52 - vg
+        v_sg_e = (vl + 1.15 * ((g * (rl - rg) * sg / (rl ** 2.0)) ** 0.25)) / 3.0
+        chk_bubble = (
+            ((rl ** 2.0) * g * (di ** 2.0) / ((rl - rg) * sg)) ** 0.25 - 4.36
+        ) >= 0
+        v_sg_h = (li / (di * 40.6) - 0.22) * ((g * di) ** 0.5) - vl
+        if vg > v_sg_j:
+            out[i] = 5
+        elif (f >= 0) and (vl > v_sl_g):
+            out[i] = 1
+        elif vg < v_sg_e:
+            out[i] = 2 if chk_bubble else 3
+        elif (vg > v_sg_e) and (vg < v_sg_h):
+            out[i] = 3
+        else:
+            out[i] = 4
+    return out
+
+
+# ============================ Wrappers ======================================
+
+
+def _eb(
+    model, v_sg, v_sl, d=1.0, theta=90.0, rho_l=1.0, mu_l=1.0, g=9.81, c=(), Fr_crit=3.5
+):
+    shape, n, arg = _prepare(v_sg, v_sl, d, theta, rho_l, mu_l)
+    c = np.asarray(c if len(c) > 0 else np.zeros(6), dtype=p.get_dtype())
+    return _output(_eb_loop(model, *arg, float(g), c, float(Fr_crit), n), shape)
+
+
+def _scalar(*c):
+    # The loops take a single value of each coefficient
+    return all(np.ndim(i) == 0 for i in c)
+
+
+def nicklin1962(v_sg, v_sl, d, g, c=None):
+    # The coefficients are read when called, as in the reference
+    c = EBVelocity.nicklin1962_c if c is None else c
+    if not _scalar(*c):
+        return EBVelocity.nicklin1962(v_sg, v_sl, d, g, c=c)
+    return _eb(0, v_sg, v_sl, d=d, g=g, c=c)
+
+
+def bendiksen1984(v_sg, v_sl, d, theta, g, c=None, Fr_crit=3.5):
+    c = EBVelocity.bendiksen1984_c if c is None else c
+    if not _scalar(*c, Fr_crit):
+        return EBVelocity.bendiksen1984(v_sg, v_sl, d, theta, g, c, Fr_crit)
+    return _eb(1, v_sg, v_sl, d=d, theta=theta, g=g, c=c, Fr_crit=Fr_crit)
+
+
+def theron1989(v_sg, v_sl, d, theta, g, c=None, Fr_crit=3.5):
+    c = EBVelocity.theron1989_c if c is None else c
+    if not _scalar(*c, Fr_crit):
+        return EBVelocity.theron1989(v_sg, v_sl, d, theta, g, c, Fr_crit)
+    return _eb(2, v_sg, v_sl, d=d, theta=theta, g=g, c=c, Fr_crit=Fr_crit)
+
+
+def petalasaziz2000(v_sg, v_sl, rho_l, mu_l, d, theta, g):
+    return _eb(3, v_sg, v_sl, d=d, theta=theta, rho_l=rho_l, mu_l=mu_l, g=g)
+
+
+def dukler1985(v_sg, v_sl):
+    return _eb(4, v_sg, v_sl)
+
+
+def homogeneous(v_sg, v_sl, rho_g, rho_l, mu_g, mu_l, d):
+    # Returns gvf, rho_m, mu_m and Re_m in a single pass
+    shape, n, arg = _prepare(v_sg, v_sl, rho_g, rho_l, mu_g, mu_l, d)
+    out = _homogeneous_loop(*arg, n)
+    return tuple(_output(i, shape) for i in out)
+
+
+def Rem(rho_g, rho_l, mu_g, mu_l, d, v_sg=None, v_sl=None, v_m=None, gvf=None):
+    if v_m is not None or gvf is not None or v_sg is None or v_sl is None:
+        # Mixed inputs are handled by the reference implementation
+        return Homogeneous.Rem(rho_g, rho_l, mu_g, mu_l, d, v_sg, v_sl, v_m, gvf)
+    return homogeneous(v_sg, v_sl, rho_g, rho_l, mu_g, mu_l, d)[3]
+
+
+def blasius_fanning(Re, lmt=2300):
+    shape, n, arg = _prepare(Re)
+    return _output(_blasius_loop(arg[0], float(lmt), 16.0, 0.046, n), shape)
+
+
+def blasius_moody(Re, lmt=2300):
+    shape, n, arg = _prepare(Re)
+    return _output(_blasius_loop(arg[0], float(lmt), 64.0, 0.184, n), shape)
+
+
+def taitel1980(v_sg, v_sl, rho_g, rho_l, mu_l, sigma, g, l, d, text=False):
+    shape, n, arg = _prepare(v_sg, v_sl, rho_g, rho_l, mu_l, sigma, l, d)
+    arg = arg[:6] + [float(g)] + arg[6:]
+    ptt = _output(_taitel1980_loop(*arg, n), shape)
+    if text:
+        names = Pattern.taitel1980_ptt
+        names = np.array([names[i] for i in range(len(names))])
+        return _output(names[ptt], shape)
+    return ptt
+
+
+# Compiled version of each reference implementation
+_kernels = {
+    EBVelocity.nicklin1962: nicklin1962,
+    EBVelocity.bendiksen1984: bendiksen1984,
+    EBVelocity.theron1989: theron1989,
+    EBVelocity.petalasaziz2000: petalasaziz2000,
+    EBVelocity.dukler1985: dukler1985,
+    Homogeneous.Rem: Rem,
+    Friction.blasius_fanning: blasius_fanning,
+    Friction.blasius_moody: blasius_moody,
+    Pattern.taitel1980: taitel1980,
+}
+
+
+def dispatch(ref):
+    # Function of the selected backend for the reference implementation
+    if _backend == "numba":
+        return _kernels.get(ref, ref)
+    return ref
+
+
+def check(n=10000, seed=0):
+    # Maximum relative difference between the kernels and the reference
+    # implementations on random operating points
+    rng = np.random.default_rng(seed)
+    v_sg = rng.uniform(0.01, 20, n)
+    v_sl = rng.uniform(0.01, 5, n)
+    d = rng.uniform(0.01, 0.2, n)
+    theta = rng.uniform(-90, 90, n)
+    rho_g = rng.uniform(1, 50, n)
+    rho_l = rng.uniform(600, 1200, n)
+    mu_g = rng.uniform(1e-5, 3e-5, n)
+    mu_l = rng.uniform(1e-4, 1e-1, n)
+    sigma = rng.uniform(0.01, 0.08, n)
+    l = rng.uniform(1, 50, n)
+    g = 9.81
+    Re = rng.uniform(100, 1e6, n)
+
+    def rel(a, b):
+        return float(np.max(np.abs(np.asarray(a) - b) / np.maximum(np.abs(b), 1e-300)))
+
+    gvf = Homogeneous.gvf(v_sg, v_sl)
+    rho_m = Homogeneous.rho_m(gvf, rho_g, rho_l)
+    mu_m = Homogeneous.mu_m(gvf, mu_g, mu_l)
+    ptt = [
+        Pattern.taitel1980(*i, g, j, k)
+        for i, j, k in zip(zip(v_sg, v_sl, rho_g, rho_l, mu_l, sigma), l, d)
+    ]
+    ref = {
+        "nicklin1962": (
+            nicklin1962(v_sg, v_sl, d, g),
+            EBVelocity.nicklin1962(v_sg, v_sl, d, g),
+        ),
+        "bendiksen1984": (
+            bendiksen1984(v_sg, v_sl, d, theta, g),
+            EBVelocity.bendiksen1984(v_sg, v_sl, d, theta, g),
+        ),
+        "theron1989": (
+            theron1989(v_sg, v_sl, d, theta, g),
+            EBVelocity.theron1989(v_sg, v_sl, d, theta, g),
+        ),
+        "petalasaziz2000": (
+            petalasaziz2000(v_sg, v_sl, rho_l, mu_l, d, theta, g),
+            EBVelocity.petalasaziz2000(v_sg, v_sl, rho_l, mu_l, d, theta, g),
+        ),
+        "dukler1985": (dukler1985(v_sg, v_sl), EBVelocity.dukler1985(v_sg, v_sl)),
+        "Rem": (
+            Rem(rho_g, rho_l, mu_g, mu_l, d, v_sg=v_sg, v_sl=v_sl),
+            rho_m * (v_sg + v_sl) * d / mu_m,
+        ),
+        "blasius_fanning": (blasius_fanning(Re), Friction.blasius_fanning(Re)),
+        "blasius_moody": (blasius_moody(Re), Friction.blasius_moody(Re)),
+        "taitel1980": (
+            taitel1980(v_sg, v_sl, rho_g, rho_l, mu_l, sigma, g, l, d),
+            np.array(ptt),
+        ),
+    }
+    return {k: rel(a, b) for k, (a, b) in ref.items()}
+
+
+set_backend(os.environ.get("TWO_PHASE_BACKEND", "numpy"))
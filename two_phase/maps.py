@@ -0,0 +1,238 @@
+import numpy as np
+
+from .flow_utils import Properties as p
+from .models import Pattern
+
+
+class PatternMap(object):
+
+    # ================= Adaptive flow pattern map generation =================
+
+    # Instead of evaluating the flow pattern model on a dense uniform
+    # (v_sg, v_sl) grid, the map starts from a coarse grid and recursively
+    # splits only the cells whose corners disagree on the flow pattern. The
+    # corners live on an integer lattice of the finest level, so each corner
+    # is evaluated only once and all the new corners of a level are evaluated
+    # in a single call of the model.
+
+    def __init__(self, func, x_lim, y_lim, log=True, n0=16, max_level=7):
+        # func -> f(v_sg, v_sl) returning the flow pattern code of each point
+        # x_lim -> [v_sg_min, v_sg_max] [m/s]
+        # y_lim -> [v_sl_min, v_sl_max] [m/s]
+        # log -> Logarithmic axes
+        # n0 -> Number of cells of the coarse grid in each direction
+        # max_level -> Number of refinements, the finest cell size is
+        #              1/(n0*2^max_level) of the axes range
+        self.func = func
+        self.x_lim = x_lim
+        self.y_lim = y_lim
+        self.log = log
+        self.n0 = n0
+        self.max_level = max_level
+        # Finest lattice size
+        self.N = n0 * 2 ** max_level
+        # Corners already evaluated, sorted keys and the flow pattern codes
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._vals = np.zeros(0, dtype=int)
+        # Outputs
+        self.n_eval = 0
+        self.cells = None
+        self.lines = None
+        pass
+
+    @staticmethod
+    def taitel1980(x_lim, y_lim, rho_g, rho_l, mu_l, sigma, l, d, **kwargs):
+        # Adaptive map of the Taitel (1980) model with fixed properties
+        def func(v_sg, v_sl):
+            return Pattern.taitel1980_array(
+                v_sg, v_sl, rho_g, rho_l, mu_l, sigma, p.g, l, d
+            )
+
+        return PatternMap(func, x_lim, y_lim, **kwargs).build()
+
+    @staticmethod
+    def barnea1987(x_lim, y_lim, rho_g, rho_l, mu_g, mu_l, sigma, d, theta, **kwargs):
+        # Adaptive map of the Barnea (1987) model with fixed properties
+        def func(v_sg, v_sl):
+            return Pattern.barnea1987(
+                v_sg, v_sl, rho_g, rho_l, mu_g, mu_l, sigma, p.g, d, theta
+            )
+
+        return PatternMap(func, x_lim, y_lim, **kwargs).build()
+
+    # ============================ Coordinates ===============================
+
+    def coords(self, i, j):
+        # Lattice indexes to superficial velocities
+        x = np.asarray(i) / self.N
+        y = np.asarray(j) / self.N
+        if self.log:
+            x_lim, y_lim = np.log10(self.x_lim), np.log10(self.y_lim)
+        else:
+            x_lim, y_lim = self.x_lim, self.y_lim
+        x = x_lim[0] + x * (x_lim[1] - x_lim[0])
+        y = y_lim[0] + y * (y_lim[1] - y_lim[0])
+        if self.log:
+            return 10 ** x, 10 ** y
+        return x, y
+
+    def _key(self, i, j):
+        return np.asarray(i, dtype=np.int64) * (self.N + 1) + j
+
+    def corners(self, i, j):
+        # Flow pattern of the lattice points (i, j), evaluating only the
+        # points that are not known yet in one call of the model
+        key = self._key(i, j)
+        new = np.unique(key)
+        if self._keys.size > 0:
+            pos = np.minimum(np.searchsorted(self._keys, new), self._keys.size - 1)
+            new = new[self._keys[pos] != new]
+        if new.size > 0:
+            v_sg, v_sl = self.coords(new // (self.N + 1), new % (self.N + 1))
+            val = np.asarray(self.func(v_sg, v_sl)).astype(int)
+            self.n_eval += new.size
+            # Merge the new values keeping the keys sorted
+            keys = np.concatenate([self._keys, new])
+            vals = np.concatenate([self._vals, val])
+            srt = np.argsort(keys, kind="mergesort")
+            self._keys, self._vals = keys[srt], vals[srt]
+        return self._vals[np.searchsorted(self._keys, key)]
+
+    # ============================ Refinement ================================
+
+    def build(self):
+        # Coarse grid of cells, each cell is the lower left corner and size
+        s = 2 ** self.max_level
+        i, j = np.meshgrid(np.arange(self.n0) * s, np.arange(self.n0) * s)
+        i, j = i.ravel(), j.ravel()
+        s = np.full(i.shape, s)
+        lvl = 0
+        # Final cells
+        out = {"i": [], "j": [], "s": [], "c": []}
+
+        while i.size > 0:
+            # Corners of all the active cells
+            c = np.stack(
+                [
+                    self.corners(i, j),
+                    self.corners(i + s, j),
+                    self.corners(i, j + s),
+                    self.corners(i + s, j + s),
+                ],
+                axis=1,
+            )
+            mixed = (c != c[:, :1]).any(axis=1)
+            # Cells that are uniform or at the finest level are final
+            final = ~mixed | (lvl == self.max_level)
+            for k, v in zip(("i", "j", "s", "c"), (i, j, s, c)):
+                out[k] += [v[final]]
+            # Split the mixed cells in four
+            i, j, s = i[~final], j[~final], s[~final] // 2
+            i = np.concatenate([i, i + s, i, i + s])
+            j = np.concatenate([j, j, j + s, j + s])
+            s = np.tile(s, 4)
+            lvl += 1
+
+        i, j, s, c = [np.concatenate(out[k]) for k in ("i", "j", "s", "c")]
+        self.cells = self._cells(i, j, s, c)
+        self.lines = self._lines(i, j, s, c)
+        return self
+
+    def _cells(self, i, j, s, c):
+        # Classified cells, the mixed cells are labelled with the most
+        # frequent flow pattern of its corners
+        x0, y0 = self.coords(i, j)
+        x1, y1 = self.coords(i + s, j + s)
+        cnt = (c[:, :, None] == c[:, None, :]).sum(axis=2)
+        ptt = c[np.arange(c.shape[0]), np.argmax(cnt, axis=1)]
+        return {
+            "x0": x0,
+            "x1": x1,
+            "y0": y0,
+            "y1": y1,
+            "ptt": ptt,
+            "boundary": (c != c[:, :1]).any(axis=1),
+        }
+
+    def _lines(self, i, j, s, c):
+        # Boundary polylines between each pair of flow patterns. Each edge of
+        # a mixed cell with different corners has a boundary point at its
+        # middle, and the points of the same pair of patterns inside a cell
+        # are joined in a segment. Points are in a lattice with twice the
+        # resolution so they are shared exactly by the neighbour cells. In a
+        # saddle cell (the same pattern in opposite corners) the 4 points of
+        # the pair are joined according to the pattern of the cell centre.
+        mixed = (c != c[:, :1]).any(axis=1)
+        i, j, s, c = 2 * i[mixed], 2 * j[mixed], 2 * s[mixed], c[mixed]
+        # Edges as pairs of corners (0: ll, 1: lr, 2: ul, 3: ur) and middle
+        edges = [
+            (0, 1, i + s // 2, j),
+            (2, 3, i + s // 2, j + s),
+            (0, 2, i, j + s // 2),
+            (1, 3, i + s, j + s // 2),
+        ]
+        seg = {}
+        saddle = []
+        for n in range(i.size):
+            pts = {}
+            for a, b, ei, ej in edges:
+                ca, cb = c[n, a], c[n, b]
+                if ca != cb:
+                    pair = (int(min(ca, cb)), int(max(ca, cb)))
+                    pts.setdefault(pair, []).append((int(ei[n]), int(ej[n])))
+            for pair, pt in pts.items():
+                if len(pt) == 2:
+                    seg.setdefault(pair, []).append((pt[0], pt[1]))
+                elif len(pt) == 4:
+                    saddle.append((n, pair, pt))
+        if saddle:
+            # Centres of the saddle cells in one call of the model
+            k = np.array([n for n, _, _ in saddle])
+            v_sg, v_sl = self.coords((i[k] + s[k] / 2) / 2, (j[k] + s[k] / 2) / 2)
+            ctr = np.asarray(self.func(v_sg, v_sl)).astype(int)
+            self.n_eval += k.size
+            for (n, pair, pt), cc in zip(saddle, ctr):
+                bottom, top, left, right = pt
+                if cc == c[n, 0]:
+                    # ll and ur are connected, the lines cut lr and ul
+                    seg.setdefault(pair, []).extend([(bottom, right), (left, top)])
+                else:
+                    seg.setdefault(pair, []).extend([(bottom, left), (top, right)])
+
+        lines = {}
+        for pair, sg in seg.items():
+            lines[pair] = []
+            for pl in PatternMap._chain(sg):
+                pl = np.array(pl) / 2
+                lines[pair] += [np.column_stack(self.coords(pl[:, 0], pl[:, 1]))]
+        return lines
+
+    @staticmethod
+    def _chain(seg):
+        # Join segments that share end points into polylines
+        nbr = {}
+        for a, b in seg:
+            nbr.setdefault(a, []).append(b)
+            nbr.setdefault(b, []).append(a)
+        seen = set()
+        lines = []
+        # Start from the open ends first, then the closed loops
+        start = [k for k, v in nbr.items() if len(v) == 1] + list(nbr.keys())
+        for pt in start:
+            if pt in seen:
+                continue
+            line = [pt]
+            seen.add(pt)
+            nxt = [q for q in nbr[pt] if q not in seen]
+            while nxt:
+                pt = nxt[0]
+                line.append(pt)
+                seen.add(pt)
+                nxt = [q for q in nbr[pt] if q not in seen]
+            # Close the loops
+            if len(line) > 2 and line[0] in nbr[pt]:
+                line.append(line[0])
+            lines.append(line)
+        return lines
+
+    pass
@@ -1,6 +1,7 @@
 import numpy as np
 
 from .flow_utils import Properties as p
+from .solvers import find_root
 
 
 class EBVelocity(object):
@@ -10,13 +11,26 @@ class EBVelocity(object):
     #  The models implemented follows the paper by Rodrigues et al. 20017
     # A COMPARITIVE STUDY OF CLOSURE EQUATIONS FOR GAS - LIQUID SLUG FLOW
 
+    # Default coefficients of the models, the c argument of each model
+    # overrides them (e.g. with the values of calibration.calibrate). The
+    # coefficients may be arrays with one value per point.
+    # nicklin1962 -> C_0, C_1
+    nicklin1962_c = (1.2, 0.351)
+    # bendiksen1984 -> Fr_v < Fr_crit: C_0 = c[0] + c[1]*sin^2, C_1 = c[2]*cos
+    #                  + c[3]*sin, Fr_v >= Fr_crit: C_0 = c[4], C_1 = c[5]*sin
+    bendiksen1984_c = (1.05, 0.15, 0.54, 0.35, 1.2, 0.35)
+    # theron1989 -> C_0 = c[0] - c[1]/TT + c[2]*sin^2,
+    #               C_1 = (-c[3] + c[4]/TT)*cos + c[5]*sin
+    theron1989_c = (1.3, 0.23, 0.13, 0.5, 0.8, 0.35)
+
     @staticmethod
-    def nicklin1962(v_sg, v_sl, d, g):
+    def nicklin1962(v_sg, v_sl, d, g, c=None):
+        v_sg, v_sl, d, g = p.cast(v_sg, v_sl, d, g)
         # The following equation is the number 15 of Taitel et al. 1980
         # The model is basically given by
         # V_TB = C_0*v_m + C_1*sqrt(g*d)
-        c_0 = 1.2
-        c_1 = 0.351
+        c = EBVelocity.nicklin1962_c if c is None else c
+        c_0, c_1 = p.cast(*c)
         # Mixture superficial velocity
         v_m = v_sg + v_sl
         # Finally calculate the Taylor bubble velocity
@@ -24,54 +38,59 @@ class EBVelocity(object):
         return v_tb
 
     @staticmethod
-    def bendiksen1984(v_sg, v_sl, d, theta, g):
+    def bendiksen1984(v_sg, v_sl, d, theta, g, c=None, Fr_crit=3.5):
+        v_sg, v_sl, d, theta, g, Fr_crit = p.cast(v_sg, v_sl, d, theta, g, Fr_crit)
         # The model is basically given by
         # V_TB = C_0*v_m + C_1*sqrt(g*d)
+        c = EBVelocity.bendiksen1984_c if c is None else c
+        c = p.cast(*c)
         # Convert the angle to radians
-        theta = np.deg2rad(theta)
+        theta = theta * (np.pi / 180)
         # Mixture velocity
         v_m = v_sg + v_sl
         # Froude number
         Fr_v = v_sl / np.sqrt(g * d)
-        # Critical Froude number
-        Fr_crit = 3.5
         # Get the c_0
-        c_0 = (Fr_v >= Fr_crit) * 1.2
-        c_0 += (Fr_v < Fr_crit) * (1.05 + 0.15 * np.power(np.sin(theta), 2))
+        c_0 = np.where(Fr_v >= Fr_crit, c[4], c[0] + c[1] * np.power(np.sin(theta), 2))
         # Get the c_1
-        c_1 = (Fr_v >= Fr_crit) * (0.35 * np.sin(theta))
-        c_1 += (Fr_v < Fr_crit) * (0.54 * np.cos(theta) + 0.35 * np.sin(theta))
+        c_1 = np.where(
+            Fr_v >= Fr_crit,
+            c[5] * np.sin(theta),
+            c[2] * np.cos(theta) + c[3] * np.sin(theta),
+        )
         # Finally calculate the Taylor bubble velocity
         v_tb = c_0 * v_m + c_1 * np.sqrt(g * d)
         return v_tb
 
     @staticmethod
-    def theron1989(v_sg, v_sl, d, theta, g):
+    def theron1989(v_sg, v_sl, d, theta, g, c=None, Fr_crit=3.5):
+        v_sg, v_sl, d, theta, g, Fr_crit = p.cast(v_sg, v_sl, d, theta, g, Fr_crit)
         # The model is basically given by
         # V_TB = C_0*v_m + C_1*sqrt(g*d)
+        c = EBVelocity.theron1989_c if c is None else c
+        c = p.cast(*c)
         # Convert the angle to radians
-        theta = np.deg2rad(theta)
+        theta = theta * (np.pi / 180)
         # Mixture velocity
         v_m = v_sg + v_sl
         # Froude number
         Fr_v = v_sl / np.sqrt(g * d)
-        # Critical Froude number
-        Fr_crit = 3.5
         # TT constant
         TT = 1 + (Fr_v / Fr_crit) * np.cos(theta)
         # C_0 constant
-        c_0 = 1.3 - 0.23 / TT + 0.13 * np.power(np.sin(theta), 2)
+        c_0 = c[0] - c[1] / TT + c[2] * np.power(np.sin(theta), 2)
         # C_1 constant
-        c_1 = (-0.5 + 0.8 / TT) * np.cos(theta) + 0.35 * np.sin(theta)
+        c_1 = (-c[3] + c[4] / TT) * np.cos(theta) + c[5] * np.sin(theta)
         # Finally calculate the Taylor bubble velocity
         v_tb = c_0 * v_m + c_1 * np.sqrt(g * d)
         return v_tb
 
     @staticmethod
     def petalasaziz2000(v_sg, v_sl, rho_l, mu_l, d, theta, g):
+        v_sg, v_sl, rho_l, mu_l, d, theta = p.cast(v_sg, v_sl, rho_l, mu_l, d, theta)
         # The model is basically given by
         # V_TB = C_0*v_m
-        theta = np.deg2rad(theta)  # Convert the angle to radians
+        theta = theta * (np.pi / 180)  # Convert the angle to radians
         # Reynolds number
         Re_v = (rho_l * (v_sg + v_sl) * d) / mu_l
         # C_0 constant
@@ -82,6 +101,7 @@ class EBVelocity(object):
 
     @staticmethod
     def dukler1985(v_sg, v_sl):
+        v_sg, v_sl = p.cast(v_sg, v_sl)
         # The model is basically given by
         # V_TB = C_0*v_m
         c_0 = 1.225
@@ -97,14 +117,17 @@ class Homogeneous(object):
     # ====================== Homogeneous model ==========================
     @staticmethod
     def gvf(v_sg, v_sl):
+        v_sg, v_sl = p.cast(v_sg, v_sl)
         return v_sg / (v_sg + v_sl)
 
     @staticmethod
     def Rem(rho_g, rho_l, mu_g, mu_l, d, v_sg=None, v_sl=None, v_m=None, gvf=None):
+        rho_g, rho_l, mu_g, mu_l, d = p.cast(rho_g, rho_l, mu_g, mu_l, d)
+        v_sg, v_sl, v_m, gvf = p.cast(v_sg, v_sl, v_m, gvf)
         # Check if it was passed the mixture velocity or it is possible
         # to calculate the mixture velocity.
-        if not v_m:
-            if not v_sl or not v_sg:
+        if v_m is None:
+            if v_sl is None or v_sg is None:
                 txt = (
                     "Please pass the mixture velocity or the"
                     + " superficial velocities!"
@@ -113,8 +136,8 @@ class Homogeneous(object):
             else:
                 v_m = v_sg + v_sl
         # Check if it was passed the GVF or it is possible to calculate it.
-        if not gvf:
-            if not v_sl or not v_sg:
+        if gvf is None:
+            if v_sl is None or v_sg is None:
                 txt = (
                     "Please pass the GVF explicitly or pass the"
                     + "superficial velocities!"
@@ -133,24 +156,105 @@ class Homogeneous(object):
     @staticmethod
     def rho_m(gvf, rho_g, rho_l):
         # gvf [0, 1]
+        gvf, rho_g, rho_l = p.cast(gvf, rho_g, rho_l)
         return gvf * rho_g + (1 - gvf) * rho_l
 
     @staticmethod
     def mu_m(gvf, mu_g, mu_l):
         # gvf [0, 1]
+        gvf, mu_g, mu_l = p.cast(gvf, mu_g, mu_l)
         return gvf * mu_g + (1 - gvf) * mu_l
 
     @staticmethod
     def dp_g(rho_m, g, theta):
-        return rho_m * g * np.sin(np.deg2rad(theta))
+        rho_m, g, theta = p.cast(rho_m, g, theta)
+        return rho_m * g * np.sin(theta * (np.pi / 180))
 
     @staticmethod
     def dp_f(f_f, rho_m, v_m, d):
+        f_f, rho_m, v_m, d = p.cast(f_f, rho_m, v_m, d)
         return (f_f * rho_m * (v_m) ** 2) / (2 * d)
 
     pass
 
 
+class Stratified(object):
+
+    # ====================== Stratified flow ================================
+
+    # Taitel and Dukler (1976) stratified flow equilibrium generalised for
+    # inclined pipes. All the geometric variables are dimensionless, lengths
+    # are normalised by d and areas by d^2. The liquid height h is h_l/d.
+
+    @staticmethod
+    def geometry(h):
+        # Returns S_l, S_g, S_i, A_l, A_g
+        c = 2 * h - 1
+        r = np.sqrt(1 - c ** 2)
+        acos = np.arccos(c)
+        # Wetted perimeters and the interface
+        S_l = np.pi - acos
+        S_g = acos
+        S_i = r
+        # Areas occupied by each phase
+        A_l = 0.25 * (np.pi - acos + c * r)
+        A_g = 0.25 * (acos - c * r)
+        return S_l, S_g, S_i, A_l, A_g
+
+    @staticmethod
+    def parameters(v_sg, v_sl, rho_g, rho_l, mu_g, mu_l, d, theta, g, lmt=2300):
+        # Lockhart and Martinelli parameter X^2, the inclination parameter Y
+        # and the Blasius exponents of each phase (Shoham 2006 - Eq. 3.12).
+        # Blasius constants based on the superficial Reynolds number
+        Re_sl = rho_l * v_sl * d / mu_l
+        Re_sg = rho_g * v_sg * d / mu_g
+        # Constants with the same dtype of the inputs
+        dtype = np.result_type(Re_sl, Re_sg)
+        one, c_lam, c_tur, n_tur = np.array([1.0, 16.0, 0.046, 0.2], dtype=dtype)
+        c_l = np.where(Re_sl < lmt, c_lam, c_tur)
+        n = np.where(Re_sl < lmt, one, n_tur)
+        c_g = np.where(Re_sg < lmt, c_lam, c_tur)
+        m = np.where(Re_sg < lmt, one, n_tur)
+        # Superficial frictional pressure gradients
+        dp_sl = (4 * c_l / d) * Re_sl ** (-n) * rho_l * v_sl ** 2 / 2
+        dp_sg = (4 * c_g / d) * Re_sg ** (-m) * rho_g * v_sg ** 2 / 2
+        X2 = dp_sl / dp_sg
+        Y = (rho_l - rho_g) * g * np.sin(np.deg2rad(theta)) / dp_sg
+        return X2, Y, n, m
+
+    @staticmethod
+    def residual(h, X2, Y, n, m):
+        # Dimensionless combined momentum equation - Shoham 2006 Eq. 3.13,
+        # with Y > 0 for upward flow the gravity holds back the liquid
+        S_l, S_g, S_i, A_l, A_g = Stratified.geometry(h)
+        A = np.pi / 4
+        # Dimensionless velocities and hydraulic diameters
+        u_l = A / A_l
+        u_g = A / A_g
+        D_l = 4 * A_l / S_l
+        D_g = 4 * A_g / (S_g + S_i)
+        # Liquid and gas terms
+        f_l = X2 * ((u_l * D_l) ** (-n)) * (u_l ** 2) * (S_l / A_l)
+        f_g = ((u_g * D_g) ** (-m)) * (u_g ** 2) * (S_g / A_g + S_i / A_l + S_i / A_g)
+        return f_l - f_g + 4 * Y
+
+    @staticmethod
+    def equilibrium(v_sg, v_sl, rho_g, rho_l, mu_g, mu_l, d, theta, g, eps=1e-6):
+        # Dimensionless equilibrium liquid height for all the points at once.
+        # In upward inclined flows the equation may have three roots, the
+        # smallest one is returned as it is the stable one.
+        X2, Y, n, m = Stratified.parameters(
+            v_sg, v_sl, rho_g, rho_l, mu_g, mu_l, d, theta, g
+        )
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            h = find_root(Stratified.residual, eps, 1 - eps, args=(X2, Y, n, m))
+        # The root is always solved in double precision, as the solver
+        # tolerance is below the float32 resolution
+        return h.astype(np.result_type(X2), copy=False)
+
+    pass
+
+
 class Pattern(object):
 
     taitel1980_ptt = {
@@ -162,53 +266,32 @@ class Pattern(object):
         5: "Annular",
     }
 
+    # The codes shared with taitel1980_ptt have the same meaning, churn flow
+    # is considered part of the intermittent flow in the unified model.
+    barnea1987_ptt = {
+        0: "Single-phase",
+        1: "Dispersed bubbles",
+        2: "Bubbles",
+        3: "Slug",
+        5: "Annular",
+        6: "Stratified smooth",
+        7: "Stratified wavy",
+    }
+
     @staticmethod
     def taitel1980(v_sg, v_sl, rho_g, rho_l, mu_l, sigma, g, l, d, text=False):
         # TODO: documentation and references
+        var = p.cast(v_sg, v_sl, rho_g, rho_l, mu_l, sigma, g, l, d)
+        v_sg, v_sl, rho_g, rho_l, mu_l, sigma, g, l, d = var
 
         if v_sg == 0:
             ptt = 0
         else:
-            # Annular
-            # when v_sg > v_sg_j -> Annular
-            v_sg_j = (3.1 * (sigma * g * (rho_l - rho_g)) ** 0.25) / (rho_g ** 0.5)
-
-            # Dispersed Bubble
-            # when f >= 0 or v_sl_g > v_sl -> Dispersed bubble
-            # Euqation 4.23 of Shoham 2006
-            v_m = v_sl + v_sg
-            # Left hand side part 1
-            f_l1 = (
-                2
-                * (((0.4 * sigma) / ((rho_l - rho_g) * g)) ** 0.5)
-                * ((rho_l / sigma) ** 0.6)
+            bnd = Pattern._taitel1980_boundaries(
+                v_sg, v_sl, rho_g, rho_l, mu_l, sigma, g, l, d
             )
-            # Left hand side part 2
-            f_l2 = ((((2 * 0.046) / d) * ((rho_l * d / mu_l) ** -0.2)) ** 0.4) * (
-                v_m ** 1.12
-            )
-            # Right hand side
-            f_r = 0.725 + 4.15 * ((v_sg / v_m) ** 0.5)
-            # Full equation
-            f = f_l1 * f_l2 - f_r
-
-            # Equation 4.24 of Shoham 2006
-            v_sl_g = v_sg / 0.52 - v_sg
-
-            # Bubble-Slug - Equation 4.13 of Shoham 2006
-            # when v_sg > v_sg_e -> Slug or Churn
-            v_sg_e = (
-                v_sl + 1.15 * ((g * (rho_l - rho_g) * sigma / (rho_l ** 2.0)) ** 0.25)
-            ) / 3.0
-            # Check existence of bubble flow - Equation 4.15 of Shoham 2006
-            chk_bubble = (
-                ((rho_l ** 2.0) * g * (d ** 2.0) / ((rho_l - rho_g) * sigma)) ** 0.25
-                - 4.36
-            ) >= 0
-
-            # Slug-Churn - Equation 4.31 of Shoham 2006
-            # when v_sg > v_sg_h -> Churn flow
-            v_sg_h = (l / (d * 40.6) - 0.22) * ((g * d) ** 0.5) - v_sl
+            v_sg_j, f, v_sl_g, v_sg_e, v_sg_h, bubble = bnd
+            chk_bubble = bubble >= 0
 
             # Conditions
             if v_sg > v_sg_j:
@@ -236,6 +319,340 @@ class Pattern(object):
         else:
             return ptt
 
+    @staticmethod
+    def taitel1980_boundaries(v_sg, v_sl, rho_g, rho_l, mu_l, sigma, g, l, d):
+        # Continuous transition functions of taitel1980, vectorized. Returns
+        # v_sg_j, f, v_sl_g, v_sg_e, v_sg_h and bubble, the bubble flow exists
+        # when bubble >= 0.
+        var = p.cast(v_sg, v_sl, rho_g, rho_l, mu_l, sigma, g, l, d)
+        return Pattern._taitel1980_boundaries(*var)
+
+    @staticmethod
+    def taitel1980_array(v_sg, v_sl, rho_g, rho_l, mu_l, sigma, g, l, d, text=False):
+        # Flow pattern codes of taitel1980 for arrays of points, the same
+        # conditions evaluated on the transition functions of all the points
+        var = p.cast(v_sg, v_sl, rho_g, rho_l, mu_l, sigma, g, l, d)
+        v_sg, v_sl = np.broadcast_arrays(var[0], var[1])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bnd = Pattern._taitel1980_boundaries(v_sg, v_sl, *var[2:])
+        v_sg_j, f, v_sl_g, v_sg_e, v_sg_h, bubble = bnd
+        ptt = np.select(
+            [
+                v_sg == 0,
+                v_sg > v_sg_j,
+                (f >= 0) & (v_sl > v_sl_g),
+                v_sg < v_sg_e,
+                (v_sg > v_sg_e) & (v_sg < v_sg_h),
+            ],
+            [0, 5, 1, np.where(bubble >= 0, 2, 3), 3],
+            default=4,
+        )
+        if text:
+            names = Pattern.taitel1980_ptt
+            return np.array([names[i] for i in range(len(names))])[ptt]
+        return ptt
+
+    @staticmethod
+    def _taitel1980_boundaries(v_sg, v_sl, rho_g, rho_l, mu_l, sigma, g, l, d):
+        # Annular
+        # when v_sg > v_sg_j -> Annular
+        v_sg_j = (3.1 * (sigma * g * (rho_l - rho_g)) ** 0.25) / (rho_g ** 0.5)
+
+        # Dispersed Bubble
+        # when f >= 0 or v_sl_g > v_sl -> Dispersed bubble
+        # Euqation 4.23 of Shoham 2006
+        v_m = v_sl + v_sg
+        # Left hand side part 1
+        f_l1 = (
+            2
+            * (((0.4 * sigma) / ((rho_l - rho_g) * g)) ** 0.5)
+            * ((rho_l / sigma) ** 0.6)
+        )
+        # Left hand side part 2
+        f_l2 = ((((2 * 0.046) / d) * ((rho_l * d / mu_l) ** -0.2)) ** 0.4) * (
+            v_m ** 1.12
+        )
+        # Right hand side
+        f_r = 0.725 + 4.15 * ((v_sg / v_m) ** 0.5)
+        # Full equation
+        f = f_l1 * f_l2 - f_r
+
+        # Equation 4.24 of Shoham 2006
+        v_sl_g = v_sg / 0.52 - v_sg
+
+        # Bubble-Slug - Equation 4.13 of Shoham 2006
+        # when v_sg > v_sg_e -> Slug or Churn
+        v_sg_e = (
+            v_sl + 1.15 * ((g * (rho_l - rho_g) * sigma / (rho_l ** 2.0)) ** 0.25)
+        ) / 3.0
+        # Check existence of bubble flow - Equation 4.15 of Shoham 2006
+        bubble = (
+            ((rho_l ** 2.0) * g * (d ** 2.0) / ((rho_l - rho_g) * sigma)) ** 0.25
+            - 4.36
+        )
+
+        # Slug-Churn - Equation 4.31 of Shoham 2006
+        # when v_sg > v_sg_h -> Churn flow
+        v_sg_h = (l / (d * 40.6) - 0.22) * ((g * d) ** 0.5) - v_sl
+
+        return v_sg_j, f, v_sl_g, v_sg_e, v_sg_h, bubble
+
+    @staticmethod
+    def barnea1987(
+        v_sg, v_sl, rho_g, rho_l, mu_g, mu_l, sigma, g, d, theta, text=False
+    ):
+        # Barnea (1987) unified model for the whole range of inclinations.
+        # Every transition is evaluated on arrays, so all the points are
+        # classified at once. The transition equations follow the chapter 3
+        # of Shoham 2006. theta [°] is positive for upward flow.
+        var = (v_sg, v_sl, rho_g, rho_l, mu_g, mu_l, sigma, d, theta)
+        var = np.broadcast_arrays(*[np.asarray(i, dtype=p.get_dtype()) for i in var])
+        v_sg, v_sl, rho_g, rho_l, mu_g, mu_l, sigma, d, theta = var
+        # Single-phase points are computed with a dummy velocity to avoid
+        # invalid operations and overwritten at the end
+        single = (v_sg <= 0) | (v_sl <= 0)
+        v_sg = np.where(single, 1.0, v_sg)
+        v_sl = np.where(single, 1.0, v_sl)
+
+        rad = np.deg2rad(theta)
+        cos = np.maximum(np.cos(rad), 1e-12)
+        sin = np.sin(rad)
+        drho = rho_l - rho_g
+        v_m = v_sg + v_sl
+
+        # Stratified to non-stratified - Kelvin-Helmholtz criterion of
+        # Taitel and Dukler (1976)
+        h = Stratified.equilibrium(v_sg, v_sl, rho_g, rho_l, mu_g, mu_l, d, theta, g)
+        h_ok = np.isfinite(h)
+        h = np.where(h_ok, h, 0.5)
+        S_l, S_g, S_i, A_l, A_g = Stratified.geometry(h)
+        u_l = v_sl * (np.pi / 4) / A_l
+        u_g = v_sg * (np.pi / 4) / A_g
+        F2 = (rho_g / drho) * (v_sg ** 2) / (d * g * cos)
+        kh = F2 * ((np.pi / 4) / A_g) ** 2 * S_i / (A_g * (1 - h) ** 2)
+        stratified = h_ok & (kh < 1)
+
+        # Stratified smooth to wavy - wind waves (Taitel and Dukler 1976)
+        # and gravity waves in downward flow (Barnea et al. 1982)
+        s = 0.01  # Sheltering coefficient
+        u_g_w = np.sqrt(4 * mu_l * drho * g * cos / (s * rho_l * rho_g * u_l))
+        Fr_l = u_l / np.sqrt(g * h * d)
+        wavy = (u_g >= u_g_w) | ((theta < 0) & (Fr_l >= 1.5))
+
+        # Annular to intermittent - film stability and slug blockage
+        X2, Y, n, m = Stratified.parameters(
+            v_sg, v_sl, rho_g, rho_l, mu_g, mu_l, d, theta, g
+        )
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            a_l = find_root(Pattern._barnea1987_film, 1e-6, 0.999, args=(X2, Y))
+            a_l = a_l.astype(p.get_dtype(), copy=False)
+            unstable = Y >= X2 * (2 - 1.5 * a_l) / ((a_l ** 3) * (1 - 1.5 * a_l))
+        annular = np.isfinite(a_l) & (a_l < 0.24) & ~unstable
+
+        # Intermittent to dispersed bubbles - Barnea (1986)
+        f_m = 0.046 * (rho_l * v_m * d / mu_l) ** -0.2
+        d_max = (0.725 + 4.15 * np.sqrt(v_sg / v_m)) * ((sigma / rho_l) ** 0.6)
+        d_max *= (2 * f_m * (v_m ** 3) / d) ** -0.4
+        d_cd = 2 * np.sqrt(0.4 * sigma / (drho * g))
+        d_cb = 0.375 * rho_l * f_m * (v_m ** 2) / (drho * g * cos)
+        dispersed = (d_max <= np.minimum(d_cd, d_cb)) & (v_sg / v_m <= 0.52)
+
+        # Bubbles to slug - Taitel et al. (1980) generalised by Barnea (1987)
+        u_0 = (g * drho * sigma / (rho_l ** 2)) ** 0.25
+        chk_d = ((rho_l ** 2) * g * (d ** 2) / (drho * sigma)) ** 0.25 >= 4.36
+        # Lift coefficient 0.8 and bubble distortion coefficient 1.3
+        with np.errstate(divide="ignore"):
+            chk_theta = (cos / sin ** 2) <= 0.75 * float(np.cos(np.pi / 4)) * (
+                (1.53 * u_0) ** 2 / (g * d)
+            ) * (0.8 * 1.3 ** 2 / 4)
+        v_sg_e = (v_sl + 1.15 * u_0 * sin) / 3
+        bubble = chk_d & chk_theta & (sin > 0) & (v_sg < v_sg_e)
+
+        # Apply the transitions from the lowest to the highest priority
+        ptt = np.full(v_sg.shape, 3)
+        ptt = np.where(bubble, 2, ptt)
+        ptt = np.where(dispersed, 1, ptt)
+        ptt = np.where(annular, 5, ptt)
+        ptt = np.where(stratified, np.where(wavy, 7, 6), ptt)
+        ptt = np.where(single, 0, ptt)
+
+        if text:
+            names = Pattern.barnea1987_ptt
+            names = np.array([names.get(i, "") for i in range(max(names) + 1)])
+            ptt = names[ptt]
+        # Keep the same output type of taitel1980 for a single point
+        return ptt.item() if ptt.ndim == 0 else ptt
+
+    @staticmethod
+    def _barnea1987_film(a_l, X2, Y):
+        # Annular film equation for the liquid holdup a_l - Barnea (1986)
+        return (1 + 75 * a_l) / (((1 - a_l) ** 2.5) * a_l) - X2 / (a_l ** 3) - Y
+
+    pass
+
+
+class Slug(object):
+
+    # ====================== Slug flow unit cell =============================
+
+    # Mechanistic unit cell model of Taitel and Barnea (1990) following the
+    # chapter 4 of Shoham 2006. The film zone is assumed in equilibrium
+    # (uniform film thickness) and the elongated bubble translational
+    # velocity v_tb comes from any of the EBVelocity correlations.
+
+    @staticmethod
+    def gregory1978(v_m):
+        # Liquid holdup in the slug body
+        return 1 / (1 + (v_m / 8.66) ** 1.39)
+
+    @staticmethod
+    def film_geometry(x, annular):
+        # Returns S_f, S_g, S_i, A_f, A_g normalised by d and d^2, x is the
+        # film variable in (0, 1). For stratified films x = h_f/d, for
+        # annular films (vertical pipes) x = 2*delta/d.
+        S_f, S_g, S_i, A_f, A_g = Stratified.geometry(x)
+        # Annular film with thickness delta
+        dlt = x / 2
+        S_f = np.where(annular, np.pi, S_f)
+        S_g = np.where(annular, 0.0, S_g)
+        S_i = np.where(annular, np.pi * (1 - 2 * dlt), S_i)
+        A_f = np.where(annular, np.pi * dlt * (1 - dlt), A_f)
+        A_g = np.where(annular, (np.pi / 4) * (1 - 2 * dlt) ** 2, A_g)
+        return S_f, S_g, S_i, A_f, A_g
+
+    @staticmethod
+    def film_velocities(H_lf, v_tb, v_lls, v_gls, H_ls):
+        # Mass balances in a frame moving with the elongated bubble
+        v_lf = v_tb - (v_tb - v_lls) * H_ls / H_lf
+        v_gf = v_tb - (v_tb - v_gls) * (1 - H_ls) / (1 - H_lf)
+        return v_lf, v_gf
+
+    @staticmethod
+    def film_stresses(
+        x, annular, v_tb, v_lls, v_gls, H_ls, rho_g, rho_l, mu_g, mu_l, d
+    ):
+        # Returns the geometry and the wall and interfacial shear stresses of
+        # the film zone
+        S_f, S_g, S_i, A_f, A_g = Slug.film_geometry(x, annular)
+        H_lf = A_f / (np.pi / 4)
+        v_lf, v_gf = Slug.film_velocities(H_lf, v_tb, v_lls, v_gls, H_ls)
+        # Hydraulic diameters
+        D_f = 4 * A_f * d / S_f
+        D_g = 4 * A_g * d / (S_g + S_i)
+        # Friction factors
+        f_f = Friction.blasius_fanning(rho_l * np.abs(v_lf) * D_f / mu_l)
+        f_g = Friction.blasius_fanning(rho_g * np.abs(v_gf) * D_g / mu_g)
+        # Wallis (1969) interfacial friction for annular films
+        f_i = np.where(annular, 0.005 * (1 + 300 * x / 2), f_g)
+        # Shear stresses
+        t_f = f_f * rho_l * v_lf * np.abs(v_lf) / 2
+        t_g = f_g * rho_g * v_gf * np.abs(v_gf) / 2
+        dv = v_gf - v_lf
+        t_i = f_i * rho_g * dv * np.abs(dv) / 2
+        return S_f, S_g, S_i, A_f, A_g, t_f, t_g, t_i
+
+    @staticmethod
+    def film_holdup(x, annular, H_l):
+        # Difference between the holdup of the film variable x and H_l
+        return Slug.film_geometry(x, annular)[3] / (np.pi / 4) - H_l
+
+    @staticmethod
+    def film_residual(
+        x, annular, v_tb, v_lls, v_gls, H_ls, rho_g, rho_l, mu_g, mu_l, d, g_sin
+    ):
+        # Combined momentum equation of the film zone
+        S_f, S_g, S_i, A_f, A_g, t_f, t_g, t_i = Slug.film_stresses(
+            x, annular, v_tb, v_lls, v_gls, H_ls, rho_g, rho_l, mu_g, mu_l, d
+        )
+        res = t_f * S_f / A_f - t_g * S_g / A_g - t_i * S_i * (1 / A_f + 1 / A_g)
+        return res / d + (rho_l - rho_g) * g_sin
+
+    @staticmethod
+    def taitelbarnea1990(
+        v_sg,
+        v_sl,
+        v_tb,
+        rho_g,
+        rho_l,
+        mu_g,
+        mu_l,
+        sigma,
+        g,
+        d,
+        theta,
+        l_s=None,
+        theta_vert=80,
+    ):
+        # Returns a dictionary with the slug body holdup H_ls, film holdup
+        # H_lf, film velocities v_lf and v_gf, slug l_s, film l_f and unit
+        # l_u lengths [m], slug frequency freq [1/s] and the gravitational
+        # dp_g, frictional dp_f and total dp pressure gradients [Pa/m].
+        # Points where the unit cell has no solution (non slug flow) are nan.
+        # l_s [m] -> Slug body length, default 30d horizontal and 20d vertical
+        # theta_vert [°] -> Above this inclination the film is annular
+        var = (v_sg, v_sl, v_tb, rho_g, rho_l, mu_g, mu_l, sigma, d, theta)
+        var = np.broadcast_arrays(*[np.asarray(i, dtype=float) for i in var])
+        v_sg, v_sl, v_tb, rho_g, rho_l, mu_g, mu_l, sigma, d, theta = var
+        rad = np.deg2rad(theta)
+        sin = np.sin(rad)
+        v_m = v_sg + v_sl
+        annular = np.abs(theta) >= theta_vert
+
+        # Slug body
+        H_ls = Slug.gregory1978(v_m)
+        # Dispersed bubbles velocity - drift of Harmathy (1960)
+        u_0 = 1.53 * (g * (rho_l - rho_g) * sigma / (rho_l ** 2)) ** 0.25
+        v_gls = 1.2 * v_m + u_0 * (H_ls ** 0.5) * sin
+        v_lls = (v_m - v_gls * (1 - H_ls)) / H_ls
+
+        # Film zone - all the points are solved at once
+        args = (annular, v_tb, v_lls, v_gls, H_ls, rho_g, rho_l, mu_g, mu_l, d, g * sin)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            x = find_root(Slug.film_residual, 1e-6, 1 - 1e-6, args=args)
+            # The film cannot hold more liquid than the slug body, the film
+            # variable is clamped so the stresses describe the same film
+            x_ls = find_root(Slug.film_holdup, 1e-6, 1 - 1e-6, args=(annular, H_ls))
+            x = np.where(x > x_ls, x_ls, x)
+            S_f, S_g, S_i, A_f, A_g, t_f, t_g, t_i = Slug.film_stresses(x, *args[:-1])
+        H_lf = A_f / (np.pi / 4)
+        v_lf, v_gf = Slug.film_velocities(H_lf, v_tb, v_lls, v_gls, H_ls)
+
+        # Unit cell lengths from the liquid mass balance
+        if l_s is None:
+            l_s = d * (30 * np.cos(rad) ** 2 + 20 * sin ** 2)
+        l_s = np.broadcast_to(np.asarray(l_s, dtype=float), v_m.shape)
+        beta = (v_sl - v_lf * H_lf) / (v_lls * H_ls - v_lf * H_lf)
+        beta = np.where((beta > 0) & (beta <= 1), beta, np.nan)
+        l_u = l_s / beta
+        l_f = l_u - l_s
+        freq = v_tb / l_u
+
+        # Pressure gradient of the unit cell
+        H_lu = beta * H_ls + (1 - beta) * H_lf
+        rho_u = rho_l * H_lu + rho_g * (1 - H_lu)
+        rho_s = rho_l * H_ls + rho_g * (1 - H_ls)
+        mu_s = mu_l * H_ls + mu_g * (1 - H_ls)
+        f_s = Friction.blasius_fanning(rho_s * v_m * d / mu_s)
+        t_s = f_s * rho_s * (v_m ** 2) / 2
+        dp_g = rho_u * g * sin
+        dp_f = (t_s * np.pi * beta + (t_f * S_f + t_g * S_g) * (1 - beta)) / (
+            (np.pi / 4) * d
+        )
+
+        return {
+            "H_ls": H_ls,
+            "H_lf": H_lf,
+            "v_lf": v_lf,
+            "v_gf": v_gf,
+            "l_s": l_s,
+            "l_f": l_f,
+            "l_u": l_u,
+            "freq": freq,
+            "dp_g": dp_g,
+            "dp_f": dp_f,
+            "dp": dp_g + dp_f,
+        }
+
     pass
 
 
@@ -246,12 +663,10 @@ class Friction(object):
         # correlation covering the widest range of the Reynolds number
         #  is n = 0.2, C F = 0.046 for the Fanning friction factor, and
         #  C M = 0.184 for the Moody friction factor."
-        if Re < lmt:
-            f = 16 * Re ** (-1)
-        else:
-            f = 0.046 * Re ** (-0.2)
-
-        return f
+        Re = np.asarray(Re, dtype=p.get_dtype())
+        f = np.where(Re < lmt, 16 * Re ** (-1), 0.046 * Re ** (-0.2))
+        # Keep a scalar output for a scalar input
+        return f[()]
 
     @staticmethod
     def blasius_moody(Re, lmt=2300):
@@ -259,15 +674,14 @@ class Friction(object):
         # correlation covering the widest range of the Reynolds number
         #  is n = 0.2, C F = 0.046 for the Fanning friction factor, and
         #  C M = 0.184 for the Moody friction factor."
-        if Re < lmt:
-            f = 64 * Re ** (-1)
-        else:
-            f = 0.184 * Re ** (-0.2)
-
-        return f
+        Re = np.asarray(Re, dtype=p.get_dtype())
+        f = np.where(Re < lmt, 64 * Re ** (-1), 0.184 * Re ** (-0.2))
+        # Keep a scalar output for a scalar input
+        return f[()]
 
     @staticmethod
     def moody(Re, e):
+        Re, e = p.cast(Re, e)
         return 0.0055 * (1 + (2e4 * e + 1e6 / Re) ** (1 / 3))
 
     @staticmethod
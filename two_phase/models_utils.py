@@ -1,67 +1,128 @@
 import numpy as np
 
+from .cache import ResultCache
 from .flow_utils import Properties as p
-from .models import EBVelocity, Homogeneous, Pattern
+from .kernels import dispatch, get_backend
+from .models import EBVelocity, Homogeneous, Pattern, Slug
+from .registry import Registry
 from .utils import get_kwargs
 
 
+def _key(**inputs):
+    # Inputs of a cached result with the Properties that change all the
+    # results, the fluids, the gravity, the dtype policy, the saturation
+    # backend and the kernels backend
+    key = {"gas": p.gas, "liq": p.liq, "g": p.g, "dtype": np.dtype(p.get_dtype()).str}
+    key["saturation"] = None if p.saturation is None else p.saturation.key
+    key["backend"] = get_backend()
+    key.update(inputs)
+    return key
+
+
+def _coefficients(names):
+    # Default coefficients of the models (EBVelocity.*_c), part of the cache
+    # keys as they can be changed at runtime
+    c = {k: getattr(EBVelocity, k + "_c", None) for k in names}
+    return {
+        "c_" + k: np.concatenate([np.ravel(np.asarray(i, dtype=float)) for i in v])
+        for k, v in c.items()
+        if v is not None
+    }
+
+
+def _saturated(T, P, foo, **props):
+    # Missing fluid properties (rho_g, rho_l, mu_g, mu_l, sigma) from the
+    # saturation backend, all of them with a single lookup of the curve.
+    # Without the backend or with custom functions they are left as None.
+    missing = [k for k, v in props.items() if v is None]
+    if p.saturation is None or not missing or any(callable(f) for f in foo):
+        return list(props.values())
+    names = ("rho_g", "rho_l", "mu_g", "mu_l", "sigma")
+    sat = dict(zip(names, p.saturation.properties(T, P)))
+    return [sat[k] if v is None else v for k, v in props.items()]
+
+
 class EBVelUtil(object):
     def __init__(self):
-        # Models
-        self.functions = {
-            "nicklin1962": self.nicklin1962,
-            "bendiksen1984": self.bendiksen1984,
-            "theron1989": self.theron1989,
-            "petalasaziz2000": self.petalasaziz2000,
-            "dukler1985": self.dukler1985,
+        pass
+
+    # The models are the elongated bubble models of the registry.Registry,
+    # the built-in correlations and the ones registered by the user
+
+    @property  # functions -> Function of each model, evaluated with Properties
+    def functions(self):
+        return {
+            key: getattr(self, key, lambda key=key: self.model(key))
+            for key in Registry.names("eb")
         }
 
-        self.authors = [
-            "Nicklin (1962)",
-            "Bendiksen (1984)",
-            "Theron (1989)",
-            "Petalas and Aziz (2000)",
-            "Dukler (1985)",
-        ]
-        pass
+    @property  # authors -> Author of each model
+    def authors(self):
+        return Registry.authors("eb")
 
-    def ebmodels(self, models=False):
-        eb = self.functions
+    def ebmodels(self, models=False, names=None, **inputs):
+        # All the models, or the given names, evaluated at once. The inputs
+        # (e.g. v_sg, rho_l) replace the Properties values.
+        eb = Registry.names("eb") if names is None else list(names)
+        if p.cache is None or p.custom_functions():
+            val = Registry.evaluate("eb", eb, **inputs)
+        else:
+            # All the models are evaluated with the Properties values
+            key = _key(
+                v_sg=p.v_sg,
+                v_sl=p.v_sl,
+                d=p.d,
+                l=p.l,
+                theta=p.theta,
+                T=p.T,
+                P=p.P,
+                models=Registry.signature("eb", eb),
+            )
+            key.update(_coefficients(eb))
+            key.update(inputs)
+            val = p.cache.get_or_compute(
+                "ebmodels", key, lambda: Registry.evaluate("eb", eb, **inputs)
+            )
         if models:
-            val = np.array([eb[key]() for key in eb.keys()])
-            mdl = list(eb.keys())
-            return val, mdl
+            return val, eb
         else:
-            return np.array([eb[key]() for key in eb.keys()])
+            return val
+
+    @staticmethod
+    def model(name, **inputs):
+        # A single registered model
+        return Registry.evaluate("eb", [name], **inputs)[0]
 
     @staticmethod
-    def nicklin1962(v_sg=None, v_sl=None, d=None):
+    def nicklin1962(v_sg=None, v_sl=None, d=None, c=None):
         # Check for default variables
-        v_sl = p.v_sl if not v_sl else v_sl
-        v_sg = p.v_sg if not v_sg else v_sg
-        d = p.d if not d else d
+        v_sl = p.v_sl if v_sl is None else v_sl
+        v_sg = p.v_sg if v_sg is None else v_sg
+        d = p.d if d is None else d
         # Calculate and return the value
-        return EBVelocity.nicklin1962(v_sg, v_sl, d, p.g)
+        return dispatch(EBVelocity.nicklin1962)(v_sg, v_sl, d, p.g, c=c)
 
     @staticmethod
-    def bendiksen1984(v_sg=None, v_sl=None, d=None, theta=None):
+    def bendiksen1984(v_sg=None, v_sl=None, d=None, theta=None, c=None, Fr_crit=3.5):
         # Check for default variables
-        v_sg = p.v_sg if not v_sg else v_sg
-        v_sl = p.v_sl if not v_sl else v_sl
-        d = p.d if not d else d
-        theta = p.theta if not theta else theta
+        v_sg = p.v_sg if v_sg is None else v_sg
+        v_sl = p.v_sl if v_sl is None else v_sl
+        d = p.d if d is None else d
+        theta = p.theta if theta is None else theta
         # Calculate and return the value
-        return EBVelocity.bendiksen1984(v_sg, v_sl, d, theta, p.g)
+        bendiksen1984 = dispatch(EBVelocity.bendiksen1984)
+        return bendiksen1984(v_sg, v_sl, d, theta, p.g, c=c, Fr_crit=Fr_crit)
 
     @staticmethod
-    def theron1989(v_sg=None, v_sl=None, d=None, theta=None):
+    def theron1989(v_sg=None, v_sl=None, d=None, theta=None, c=None, Fr_crit=3.5):
         # Check for default variables
-        v_sg = p.v_sg if not v_sg else v_sg
-        v_sl = p.v_sl if not v_sl else v_sl
-        d = p.d if not d else d
-        theta = p.theta if not theta else theta
+        v_sg = p.v_sg if v_sg is None else v_sg
+        v_sl = p.v_sl if v_sl is None else v_sl
+        d = p.d if d is None else d
+        theta = p.theta if theta is None else theta
         # Calculate and return the value
-        return EBVelocity.theron1989(v_sg, v_sl, d, theta, p.g)
+        theron1989 = dispatch(EBVelocity.theron1989)
+        return theron1989(v_sg, v_sl, d, theta, p.g, c=c, Fr_crit=Fr_crit)
 
     @staticmethod
     def petalasaziz2000(
@@ -75,24 +136,28 @@ class EBVelUtil(object):
         fluid=None,
     ):
         # Check for default variables
-        v_sg = p.v_sg if not v_sg else v_sg
-        v_sl = p.v_sl if not v_sl else v_sl
-        d = p.d if not d else d
-        theta = p.theta if not theta else theta
-        fluid = "liq" if not fluid else fluid
+        v_sg = p.v_sg if v_sg is None else v_sg
+        v_sl = p.v_sl if v_sl is None else v_sl
+        d = p.d if d is None else d
+        theta = p.theta if theta is None else theta
+        fluid = "liq" if fluid is None else fluid
+        if fluid == "liq":
+            # Saturated liquid with a single lookup
+            rho_l, mu_l = _saturated(None, None, [foo], rho_l=rho_l, mu_l=mu_l)
         # Calculate the liquid specific mass
         rho_l = p.rho(T=None, P=None, foo=foo, fluid=fluid) if rho_l is None else rho_l
         # Calculate the liquid viscosity
         mu_l = p.mu(T=None, P=None, foo=foo, fluid=fluid) if mu_l is None else mu_l
         # Calculate and return the value
-        return EBVelocity.petalasaziz2000(v_sg, v_sl, rho_l, mu_l, d, theta, p.g)
+        petalasaziz2000 = dispatch(EBVelocity.petalasaziz2000)
+        return petalasaziz2000(v_sg, v_sl, rho_l, mu_l, d, theta, p.g)
 
     @staticmethod
     def dukler1985(v_sg=None, v_sl=None):
         # Check for default variables
-        v_sg = p.v_sg if not v_sg else v_sg
-        v_sl = p.v_sl if not v_sl else v_sl
-        return EBVelocity.dukler1985(v_sg, v_sl)
+        v_sg = p.v_sg if v_sg is None else v_sg
+        v_sl = p.v_sl if v_sl is None else v_sl
+        return dispatch(EBVelocity.dukler1985)(v_sg, v_sl)
 
     pass
 
@@ -102,6 +167,7 @@ class HomogeneousUtil(object):
         pass
 
     # ===================== Homogeneous model utility ========================
+    @staticmethod
     def Rem(
         v_sg=None,
         v_sl=None,
@@ -124,12 +190,16 @@ class HomogeneousUtil(object):
         d = p.d if d is None else d
         foo = [None] * 4 if type(foo) is not list else foo
 
-        # Get the fluid properties
+        # Get the fluid properties, the saturated phases in a single lookup
+        rho_l, rho_g, mu_l, mu_g = _saturated(
+            T, P, foo, rho_l=rho_l, rho_g=rho_g, mu_l=mu_l, mu_g=mu_g
+        )
         rho_l = p.rho(T=T, P=P, foo=foo[0], fluid="liq") if rho_l is None else rho_l
         rho_g = p.rho(T=T, P=P, foo=foo[1], fluid="gas") if rho_g is None else rho_g
         mu_l = p.mu(T=T, P=P, foo=foo[2], fluid="liq") if mu_l is None else mu_l
         mu_g = p.mu(T=T, P=P, foo=foo[3], fluid="gas") if mu_g is None else mu_g
-        return Homogeneous.Rem(v_sg, v_sl, rho_l, rho_g, mu_l, mu_g, d, gvf)
+        Rem = dispatch(Homogeneous.Rem)
+        return Rem(rho_g, rho_l, mu_g, mu_l, d, v_sg=v_sg, v_sl=v_sl, gvf=gvf)
 
     pass
 
@@ -163,13 +233,46 @@ class PatternUtil(object):
         v_sl = p.v_sl if v_sl is None else v_sl
         foo = [None] * 3 if type(foo) is not list else foo
 
+        # Cached result, only when the properties come from CoolProp
+        custom = p.custom_functions() or any(callable(f) for f in foo)
+        if p.cache is None or custom:
+            return PatternUtil._taitel1980(
+                d, l, v_sg, v_sl, rho_g, rho_l, mu_l, sigma, T, P, x, foo, text
+            )
+        inputs = _key(
+            d=d,
+            l=l,
+            v_sg=v_sg,
+            v_sl=v_sl,
+            rho_g=rho_g,
+            rho_l=rho_l,
+            mu_l=mu_l,
+            sigma=sigma,
+            T=p.T if T is None else T,
+            P=p.P if P is None else P,
+            x=x,
+            text=text,
+        )
+        return p.cache.get_or_compute(
+            "taitel1980",
+            inputs,
+            lambda: PatternUtil._taitel1980(
+                d, l, v_sg, v_sl, rho_g, rho_l, mu_l, sigma, T, P, x, foo, text
+            ),
+        )
+
+    @staticmethod
+    def _taitel1980(d, l, v_sg, v_sl, rho_g, rho_l, mu_l, sigma, T, P, x, foo, text):
         # TODO: Consider changing fluid var from gas or liq to the value of coolprop
         # fluid
-        # Set properties
+        # Set properties, the saturated phases in a single lookup
+        rho_g, rho_l, mu_l, sigma = _saturated(
+            T, P, foo, rho_g=rho_g, rho_l=rho_l, mu_l=mu_l, sigma=sigma
+        )
         rho_g = p.rho(T=T, P=P, foo=foo[1], fluid="gas") if rho_g is None else rho_g
         rho_l = p.rho(T=T, P=P, foo=foo[0], fluid="liq") if rho_l is None else rho_l
         mu_l = p.mu(T=T, P=P, foo=foo[0], fluid="liq") if mu_l is None else mu_l
-        sigma = p.sigma(T=T, x=x, foo=foo[2]) if sigma is None else sigma
+        sigma = p.sigma(T=T, x=x, foo=foo[2], P=P) if sigma is None else sigma
 
         # Create a dictionary to pass to the function
         kwargs = {
@@ -185,9 +288,146 @@ class PatternUtil(object):
             "text": text,
         }
 
+        # The compiled kernel evaluates all the points at once
+        taitel1980 = dispatch(Pattern.taitel1980)
+        if taitel1980 is not Pattern.taitel1980:
+            return np.asarray(taitel1980(**kwargs)).ravel()
+
         ptt = []
         for kwarg in get_kwargs(kwargs):
             ptt += [Pattern.taitel1980(**kwarg)]
         return np.array(ptt)
 
+    @staticmethod
+    def barnea1987(
+        d=None,
+        theta=None,
+        v_sg=None,
+        v_sl=None,
+        rho_g=None,
+        rho_l=None,
+        mu_g=None,
+        mu_l=None,
+        sigma=None,
+        T=None,
+        P=None,
+        x=None,
+        foo=None,
+        text=False,
+    ):
+        # Return the array of flow patterns
+
+        # Check for default variables
+        d = p.d if d is None else d
+        theta = p.theta if theta is None else theta
+        v_sg = p.v_sg if v_sg is None else v_sg
+        v_sl = p.v_sl if v_sl is None else v_sl
+        foo = [None] * 3 if type(foo) is not list else foo
+
+        # Set properties, the saturated phases in a single lookup
+        rho_g, rho_l, mu_g, mu_l, sigma = _saturated(
+            T, P, foo, rho_g=rho_g, rho_l=rho_l, mu_g=mu_g, mu_l=mu_l, sigma=sigma
+        )
+        rho_g = p.rho(T=T, P=P, foo=foo[1], fluid="gas") if rho_g is None else rho_g
+        rho_l = p.rho(T=T, P=P, foo=foo[0], fluid="liq") if rho_l is None else rho_l
+        mu_g = p.mu(T=T, P=P, foo=foo[1], fluid="gas") if mu_g is None else mu_g
+        mu_l = p.mu(T=T, P=P, foo=foo[0], fluid="liq") if mu_l is None else mu_l
+        sigma = p.sigma(T=T, x=x, foo=foo[2], P=P) if sigma is None else sigma
+
+        # The model is vectorized, so all the points are evaluated at once
+        ptt = Pattern.barnea1987(
+            v_sg, v_sl, rho_g, rho_l, mu_g, mu_l, sigma, p.g, d, theta, text=text
+        )
+        return np.array(ptt)
+
+    @staticmethod
+    def patterns(names=None, **inputs):
+        # Flow pattern codes (n_models, n) of all the registered pattern
+        # models, or of the given names, with the fluid properties computed
+        # once. The inputs (e.g. rho_g, sigma) replace the Properties values.
+        return Registry.evaluate("pattern", names, **inputs)
+
     pass
+
+
+class SlugUtil(object):
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def taitelbarnea1990(
+        d=None,
+        theta=None,
+        v_sg=None,
+        v_sl=None,
+        v_tb=None,
+        rho_g=None,
+        rho_l=None,
+        mu_g=None,
+        mu_l=None,
+        sigma=None,
+        T=None,
+        P=None,
+        x=None,
+        foo=None,
+        l_s=None,
+        eb_model="bendiksen1984",
+    ):
+        # Return a dictionary with the unit cell variables of each point
+
+        # Check for default variables
+        d = p.d if d is None else d
+        theta = p.theta if theta is None else theta
+        v_sg = p.v_sg if v_sg is None else v_sg
+        v_sl = p.v_sl if v_sl is None else v_sl
+        foo = [None] * 3 if type(foo) is not list else foo
+
+        # Set properties, the saturated phases in a single lookup
+        rho_g, rho_l, mu_g, mu_l, sigma = _saturated(
+            T, P, foo, rho_g=rho_g, rho_l=rho_l, mu_g=mu_g, mu_l=mu_l, sigma=sigma
+        )
+        rho_g = p.rho(T=T, P=P, foo=foo[1], fluid="gas") if rho_g is None else rho_g
+        rho_l = p.rho(T=T, P=P, foo=foo[0], fluid="liq") if rho_l is None else rho_l
+        mu_g = p.mu(T=T, P=P, foo=foo[1], fluid="gas") if mu_g is None else mu_g
+        mu_l = p.mu(T=T, P=P, foo=foo[0], fluid="liq") if mu_l is None else mu_l
+        sigma = p.sigma(T=T, x=x, foo=foo[2], P=P) if sigma is None else sigma
+
+        # Elongated bubble velocity from the chosen correlation
+        if v_tb is None:
+            if eb_model not in Registry.models["eb"]:
+                txt = "Unknown elongated bubble model: {}!".format(eb_model)
+                raise ValueError(txt)
+            inputs = {
+                "v_sg": v_sg,
+                "v_sl": v_sl,
+                "d": d,
+                "theta": theta,
+                "rho_g": rho_g,
+                "rho_l": rho_l,
+                "mu_g": mu_g,
+                "mu_l": mu_l,
+                "sigma": sigma,
+            }
+            v_tb = Registry.evaluate("eb", [eb_model], **inputs)[0]
+
+        return Slug.taitelbarnea1990(
+            v_sg,
+            v_sl,
+            v_tb,
+            rho_g,
+            rho_l,
+            mu_g,
+            mu_l,
+            sigma,
+            p.g,
+            d,
+            theta,
+            l_s=l_s,
+        )
+
+    pass
+
+
+# Code of each cached model, a change on it invalidates the cached results
+ResultCache.register("ebmodels", EBVelocity, EBVelUtil, Registry, p)
+ResultCache.register("taitel1980", Pattern, PatternUtil, p)
@@ -0,0 +1,123 @@
+import numpy as np
+
+from .flow_utils import Properties as p
+from .models import EBVelocity, Friction, Homogeneous, Pattern
+
+# ====================== Reduced precision accuracy ==========================
+
+# The models can be evaluated in float32 with Properties.set_dtype(np.float32)
+# which halves the memory traffic of large batches. The report below
+# evaluates every model on the same random operating points with both dtypes
+# and returns the relative error of the float32 results. For the flow
+# pattern maps the error is the fraction of points with a different pattern,
+# which only happens next to the transitions.
+
+
+def _points(n, seed):
+    # Random operating points covering air-water to oil-gas conditions
+    rng = np.random.default_rng(seed)
+    return {
+        "v_sg": rng.uniform(0.01, 20, n),
+        "v_sl": rng.uniform(0.01, 5, n),
+        "d": rng.uniform(0.01, 0.2, n),
+        "theta": rng.uniform(-90, 90, n),
+        "rho_g": rng.uniform(1, 50, n),
+        "rho_l": rng.uniform(600, 1200, n),
+        "mu_g": rng.uniform(1e-5, 3e-5, n),
+        "mu_l": rng.uniform(1e-4, 1e-1, n),
+        "sigma": rng.uniform(0.01, 0.08, n),
+        "l": rng.uniform(1, 50, n),
+        "Re": 10 ** rng.uniform(2, 6, n),
+    }
+
+
+def _models(x, g):
+    # Output of each model for the points x with the current dtype policy
+    gvf = Homogeneous.gvf(x["v_sg"], x["v_sl"])
+    rho_m = Homogeneous.rho_m(gvf, x["rho_g"], x["rho_l"])
+    v_m = x["v_sg"] + x["v_sl"]
+    f_f = Friction.blasius_fanning(x["Re"])
+    m = 2000  # taitel1980 is evaluated point by point
+    keys = ("v_sg", "v_sl", "rho_g", "rho_l", "mu_l", "sigma")
+    ptt = [
+        Pattern.taitel1980(*i, g, l, d)
+        for i, l, d in zip(zip(*[x[k][:m] for k in keys]), x["l"][:m], x["d"][:m])
+    ]
+    return {
+        "EBVelocity.nicklin1962": EBVelocity.nicklin1962(
+            x["v_sg"], x["v_sl"], x["d"], g
+        ),
+        "EBVelocity.bendiksen1984": EBVelocity.bendiksen1984(
+            x["v_sg"], x["v_sl"], x["d"], x["theta"], g
+        ),
+        "EBVelocity.theron1989": EBVelocity.theron1989(
+            x["v_sg"], x["v_sl"], x["d"], x["theta"], g
+        ),
+        "EBVelocity.petalasaziz2000": EBVelocity.petalasaziz2000(
+            x["v_sg"], x["v_sl"], x["rho_l"], x["mu_l"], x["d"], x["theta"], g
+        ),
+        "EBVelocity.dukler1985": EBVelocity.dukler1985(x["v_sg"], x["v_sl"]),
+        "Homogeneous.gvf": gvf,
+        "Homogeneous.rho_m": rho_m,
+        "Homogeneous.mu_m": Homogeneous.mu_m(gvf, x["mu_g"], x["mu_l"]),
+        "Homogeneous.Rem": Homogeneous.Rem(
+            x["rho_g"],
+            x["rho_l"],
+            x["mu_g"],
+            x["mu_l"],
+            x["d"],
+            v_sg=x["v_sg"],
+            v_sl=x["v_sl"],
+        ),
+        "Homogeneous.dp_g": Homogeneous.dp_g(rho_m, g, x["theta"]),
+        "Homogeneous.dp_f": Homogeneous.dp_f(f_f, rho_m, v_m, x["d"]),
+        "Friction.blasius_fanning": f_f,
+        "Friction.blasius_moody": Friction.blasius_moody(x["Re"]),
+        "Pattern.taitel1980": np.array(ptt),
+        "Pattern.barnea1987": Pattern.barnea1987(
+            x["v_sg"],
+            x["v_sl"],
+            x["rho_g"],
+            x["rho_l"],
+            x["mu_g"],
+            x["mu_l"],
+            x["sigma"],
+            g,
+            x["d"],
+            x["theta"],
+        ),
+    }
+
+
+def report(n=100000, seed=0, dtype=np.float32):
+    # Returns {model: (dtype of the output, max relative error, 99th
+    # percentile of the relative error)}, the errors of the Pattern models
+    # are the fraction of points classified differently
+    x = _points(n, seed)
+    g = p.g
+    old = p.dtype
+    try:
+        p.set_dtype(np.float64)
+        ref = _models(x, g)
+        p.set_dtype(dtype)
+        # Inputs already stored with the reduced precision
+        low = _models({k: v.astype(dtype) for k, v in x.items()}, g)
+    finally:
+        p.set_dtype(old)
+    out = {}
+    for key in ref:
+        a, b = np.asarray(low[key]), np.asarray(ref[key])
+        if key.startswith("Pattern"):
+            err = np.mean(a != b)
+            out[key] = (a.dtype, err, err)
+        else:
+            # Relative to the magnitude of each output, dp_g crosses zero
+            rel = np.abs(a - b) / np.maximum(np.abs(b), np.finfo(dtype).tiny)
+            out[key] = (a.dtype, np.max(rel), np.percentile(rel, 99))
+    return out
+
+
+if __name__ == "__main__":
+    print("{:28s} {:>8s} {:>10s} {:>10s}".format("Model", "dtype", "max", "p99"))
+    for key, (dt, e_max, e_99) in report().items():
+        print("{:28s} {:>8s} {:10.2e} {:10.2e}".format(key, str(dt), e_max, e_99))
@@ -0,0 +1,189 @@
+import os
+
+import numpy as np
+
+from .flow_utils import Properties as p
+
+
+class TwinProbe(object):
+
+    # ============ Elongated bubble velocity from twin probes ================
+
+    # Two void fraction probes placed `dist` apart see the same elongated
+    # bubbles delayed by the transit time, so v_tb = dist / lag where the
+    # lag is the peak of the cross-correlation between the signals.
+    #
+    # The recording is split in overlapping windows. The windows are stacked
+    # in batches and correlated at once with real FFTs zero padded to avoid
+    # the circular wrap. The peak is refined to a fraction of a sample with a
+    # parabola through the peak and its neighbours. The slug frequency of
+    # each window is the number of bubble fronts seen by the first probe,
+    # detected with a hysteresis around the void fraction threshold.
+    #
+    # Long recordings are processed in chunks, only the samples of one
+    # window are kept between chunks, so the memory does not depend on the
+    # recording length.
+
+    def __init__(
+        self,
+        fs,
+        dist,
+        window=2.0,
+        overlap=0.5,
+        max_lag=None,
+        min_corr=0.3,
+        threshold=0.5,
+        hysteresis=0.1,
+        batch=256,
+    ):
+        # fs [Hz] -> Sampling frequency
+        # dist [m] -> Distance between the probes
+        # window [s] -> Length of each correlation window
+        # overlap [0, 1) -> Overlap between consecutive windows
+        # max_lag [s] -> Maximum transit time, half the window by default
+        # min_corr -> Windows with a smaller correlation peak are nan
+        # threshold, hysteresis -> Void fraction of a bubble front, the front
+        #                          is counted when the signal crosses
+        #                          threshold + hysteresis after being below
+        #                          threshold - hysteresis
+        # batch -> Number of windows per FFT batch
+        if not 0 <= overlap < 1:
+            raise ValueError("The overlap must be in [0, 1)!")
+        self.fs = fs
+        self.dist = dist
+        self.n_win = int(round(window * fs))
+        self.n_hop = max(int(round(self.n_win * (1 - overlap))), 1)
+        max_lag = window / 2 if max_lag is None else max_lag
+        self.n_lag = min(int(round(max_lag * fs)), self.n_win - 1)
+        self.min_corr = min_corr
+        self.threshold = threshold
+        self.hysteresis = hysteresis
+        self.batch = batch
+        # Zero padding for the linear correlation, next power of 2
+        self.n_fft = 1 << int(np.ceil(np.log2(self.n_win + self.n_lag)))
+        pass
+
+    # ============================ Windows ===================================
+
+    def correlate(self, x1, x2):
+        # Normalized cross-correlation of the windows x1 and x2 (n, n_win) for
+        # the lags 0 to n_lag samples, x2 delayed relative to x1
+        x1 = x1 - x1.mean(axis=1, keepdims=True)
+        x2 = x2 - x2.mean(axis=1, keepdims=True)
+        X1 = np.fft.rfft(x1, n=self.n_fft, axis=1)
+        X2 = np.fft.rfft(x2, n=self.n_fft, axis=1)
+        r = np.fft.irfft(np.conj(X1) * X2, n=self.n_fft, axis=1)[:, : self.n_lag + 1]
+        norm = np.sqrt(np.sum(x1 ** 2, axis=1) * np.sum(x2 ** 2, axis=1))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return r / norm[:, None]
+
+    @staticmethod
+    def peak(r):
+        # Sub-sample lag and value of the correlation peak of each row, the
+        # lag 0 and the last lag are excluded as they cannot be refined
+        k = np.argmax(r[:, 1:-1], axis=1) + 1
+        i = np.arange(r.shape[0])
+        y0, y1, y2 = r[i, k - 1], r[i, k], r[i, k + 1]
+        # Vertex of the parabola through the 3 points
+        den = y0 - 2 * y1 + y2
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dlt = np.where(den < 0, 0.5 * (y0 - y2) / den, 0.0)
+        return k + dlt, y1 - 0.25 * (y0 - y2) * dlt
+
+    def fronts(self, x):
+        # Number of bubble fronts of each window x (n, n_win)
+        hi = x > self.threshold + self.hysteresis
+        lo = x < self.threshold - self.hysteresis
+        # Forward fill the state between the thresholds
+        idx = np.where(hi | lo, np.arange(x.shape[1]), 0)
+        idx = np.maximum.accumulate(idx, axis=1)
+        state = np.take_along_axis(hi, idx, axis=1)
+        return np.count_nonzero(state[:, 1:] & ~state[:, :-1], axis=1)
+
+    def _batch(self, x1, x2):
+        # Results of a batch of windows
+        lag, corr = self.peak(self.correlate(x1, x2))
+        with np.errstate(divide="ignore"):
+            v_tb = self.dist * self.fs / lag
+        v_tb[~(corr >= self.min_corr)] = np.nan
+        freq = self.fronts(x1) * (self.fs / self.n_win)
+        return v_tb, lag / self.fs, corr, freq
+
+    # ============================ Streaming =================================
+
+    def stream(self, chunks):
+        # Generator of the results of each batch of windows. chunks is an
+        # iterable of (x1, x2) arrays of any length with consecutive samples.
+        # Each result is a dictionary with the arrays:
+        # t [s] -> Centre of the window
+        # v_tb [m/s] -> Elongated bubble velocity
+        # lag [s] -> Transit time between the probes
+        # corr -> Correlation peak
+        # freq [Hz] -> Slug frequency
+        n_win, n_hop = self.n_win, self.n_hop
+        buf1 = np.empty(0, dtype=p.dtype)
+        buf2 = np.empty(0, dtype=p.dtype)
+        # Sample index of the first sample of the buffer
+        start = 0
+        for x1, x2 in chunks:
+            buf1 = np.concatenate((buf1, np.asarray(x1, dtype=p.dtype)))
+            buf2 = np.concatenate((buf2, np.asarray(x2, dtype=p.dtype)))
+            if buf1.size < n_win:
+                # Not a whole window yet
+                continue
+            n = (buf1.size - n_win) // n_hop + 1
+            # Windows of the buffer as views, n_hop samples apart
+            w1 = np.lib.stride_tricks.sliding_window_view(buf1, n_win)[::n_hop]
+            w2 = np.lib.stride_tricks.sliding_window_view(buf2, n_win)[::n_hop]
+            for i in range(0, n, self.batch):
+                j = min(i + self.batch, n)
+                v_tb, lag, corr, freq = self._batch(w1[i:j], w2[i:j])
+                t = (start + np.arange(i, j) * n_hop + n_win / 2) / self.fs
+                yield {"t": t, "v_tb": v_tb, "lag": lag, "corr": corr, "freq": freq}
+            # Keep the samples of the next windows
+            buf1, buf2 = buf1[n * n_hop :], buf2[n * n_hop :]
+            start += n * n_hop
+
+    def process(self, x1, x2=None, chunk=2 ** 20):
+        # Results of a whole recording. x1 and x2 are the probe signals, or x1
+        # is an iterable of (x1, x2) chunks, e.g. TwinProbe.read(path).
+        chunks = x1
+        if x2 is not None:
+            idx = range(0, len(x1), chunk)
+            chunks = ((x1[i : i + chunk], x2[i : i + chunk]) for i in idx)
+        res = list(self.stream(chunks))
+        keys = ("t", "v_tb", "lag", "corr", "freq")
+        if len(res) == 0:
+            return {k: np.empty(0) for k in keys}
+        return {k: np.concatenate([i[k] for i in res]) for k in keys}
+
+    @staticmethod
+    def read(path, channels=(0, 1), n_channels=2, dtype="float32", chunk=2 ** 20):
+        # Generator of (x1, x2) chunks of a recording, the file is memory
+        # mapped so it can be larger than the memory.
+        # .npy -> Array with shape (n_samples, n_channels)
+        # other -> Raw binary with interleaved channels of the given dtype
+        if os.path.splitext(path)[1] == ".npy":
+            data = np.load(path, mmap_mode="r")
+        else:
+            data = np.memmap(path, dtype=dtype, mode="r").reshape(-1, n_channels)
+        for i in range(0, data.shape[0], chunk):
+            blk = np.array(data[i : i + chunk, list(channels)])
+            yield blk[:, 0], blk[:, 1]
+
+    # ============================ Alignment =================================
+
+    def resample(self, t, x, t_win):
+        # Mean of the series x(t) inside each window centred at t_win, used to
+        # evaluate the models (e.g. EBVelUtil.ebmodels) with the operating
+        # conditions of each window. Windows without samples are nan.
+        t = np.asarray(t, dtype=float)
+        x = np.asarray(x, dtype=p.dtype)
+        half = self.n_win / (2 * self.fs)
+        i0 = np.searchsorted(t, t_win - half, side="left")
+        i1 = np.searchsorted(t, t_win + half, side="right")
+        csum = np.concatenate(([0], np.cumsum(x, dtype=float)))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return ((csum[i1] - csum[i0]) / (i1 - i0)).astype(p.dtype)
+
+    pass
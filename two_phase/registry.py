@@ -0,0 +1,304 @@
+import ast
+import inspect
+
+import numpy as np
+
+from .cache import ResultCache
+from .flow_utils import Properties as p
+from .kernels import dispatch
+from .models import EBVelocity, Friction, Homogeneous, Pattern
+
+try:
+    import numexpr
+
+    HAS_NUMEXPR = True
+except ImportError:
+    numexpr = None
+    HAS_NUMEXPR = False
+
+
+# ========================== Model registry ==================================
+
+# Elongated bubble velocity, flow pattern and friction models are registered
+# with the inputs they need, either as a function or as an expression, e.g.
+#
+#   Registry.register("eb", "mine2024", expr="1.1 * v_m + 0.3 * sqrt(g * d)")
+#
+#   @Registry.register("eb", "other2024", author="Other (2024)")
+#   def other2024(v_sg, v_sl, d, g):
+#       ...
+#
+# Registry.evaluate resolves the inputs of all the selected models once (the
+# fluid properties and the derived variables, e.g. v_m or Re_m, are computed
+# a single time) and evaluates the models into one output array. With
+# numexpr installed the expressions are compiled and evaluated in one pass
+# over the memory, writing directly to their row of the output, so custom
+# correlations run as fast as the built-in ones. Without it they are
+# evaluated with NumPy.
+#
+# The inputs of a function are the arguments without default values, the
+# inputs of an expression are its variable names. Any input can be given to
+# evaluate, the missing ones come from the Properties.
+
+KINDS = ("eb", "pattern", "friction")
+
+# Inputs taken directly from the Properties
+_props = ("v_sg", "v_sl", "d", "l", "theta", "g", "T", "P")
+
+# Inputs computed from other inputs, name -> (inputs, function)
+_derived = {
+    "x": ((), lambda: 0.0),
+    "rho_g": (("T", "P"), lambda T, P: p.rho(T=T, P=P, fluid="gas")),
+    "rho_l": (("T", "P"), lambda T, P: p.rho(T=T, P=P, fluid="liq")),
+    "mu_g": (("T", "P"), lambda T, P: p.mu(T=T, P=P, fluid="gas")),
+    "mu_l": (("T", "P"), lambda T, P: p.mu(T=T, P=P, fluid="liq")),
+    "sigma": (("T", "P", "x"), lambda T, P, x: p.sigma(T=T, x=x, P=P)),
+    "v_m": (("v_sg", "v_sl"), lambda v_sg, v_sl: v_sg + v_sl),
+    "gvf": (("v_sg", "v_sl"), Homogeneous.gvf),
+    "rho_m": (("gvf", "rho_g", "rho_l"), Homogeneous.rho_m),
+    "mu_m": (("gvf", "mu_g", "mu_l"), Homogeneous.mu_m),
+    "Re_m": (
+        ("rho_m", "v_m", "d", "mu_m"),
+        lambda rho_m, v_m, d, mu_m: rho_m * v_m * d / mu_m,
+    ),
+    "Re": (("Re_m",), lambda Re_m: Re_m),
+}
+
+# Fluid properties given by the saturation backend in a single call
+_phases = ("rho_g", "rho_l", "mu_g", "mu_l", "sigma")
+
+# Functions and constants of the expressions, the names follow numexpr
+_numpy = {
+    "where": np.where,
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+    "arcsin": np.arcsin,
+    "arccos": np.arccos,
+    "arctan": np.arctan,
+    "arctan2": np.arctan2,
+    "sinh": np.sinh,
+    "cosh": np.cosh,
+    "tanh": np.tanh,
+    "sqrt": np.sqrt,
+    "exp": np.exp,
+    "expm1": np.expm1,
+    "log": np.log,
+    "log10": np.log10,
+    "log1p": np.log1p,
+    "abs": np.abs,
+}
+_consts = {"pi": np.pi}
+
+
+class Model(object):
+
+    # A registered model, evaluated with the dictionary of resolved inputs
+
+    def __init__(
+        self,
+        kind,
+        name,
+        foo=None,
+        expr=None,
+        inputs=None,
+        author=None,
+        vectorized=True,
+        **params
+    ):
+        # foo -> Function of the model, or
+        # expr -> Expression of the model
+        # inputs -> Names of the inputs, from the signature or the expression
+        #           when None
+        # author -> Name used in tables and plots
+        # vectorized -> False for functions of a single point, they are
+        #               evaluated point by point, e.g. Pattern.taitel1980
+        # params -> Fixed keyword arguments of foo, e.g. text=False
+        if (foo is None) == (expr is None):
+            raise ValueError("A model needs either a function or an expression!")
+        self.kind = kind
+        self.name = name
+        self.foo = foo
+        self.expr = expr
+        self.author = name if author is None else author
+        self.params = params
+        if expr is not None:
+            tree = ast.parse(expr, mode="eval")
+            self._code = compile(tree, "<{}>".format(name), "eval")
+            if inputs is None:
+                names = {i.id for i in ast.walk(tree) if isinstance(i, ast.Name)}
+                inputs = sorted(names - set(_numpy) - set(_consts))
+        elif inputs is None:
+            sig = inspect.signature(foo).parameters.values()
+            inputs = [i.name for i in sig if i.default is inspect.Parameter.empty]
+        self.inputs = tuple(inputs)
+        self.vectorized = vectorized
+        pass
+
+    @property  # code -> Identifies the model in the cache keys
+    def code(self):
+        if self.expr is not None:
+            return self.expr
+        key = "{}.{}".format(self.kind, self.name)
+        if key not in ResultCache.models:
+            ResultCache.register(key, self.foo)
+        return ResultCache.code_hash(key)
+
+    def __call__(self, env, out=None):
+        # Evaluate the model, out is the preallocated row of the output that
+        # numexpr fills without temporaries
+        local = {k: env[k] for k in self.inputs}
+        if self.expr is not None:
+            if HAS_NUMEXPR and Registry.fuse:
+                local.update(_consts)
+                return numexpr.evaluate(
+                    self.expr,
+                    local_dict=local,
+                    global_dict={},
+                    out=out,
+                    casting="unsafe",
+                )
+            with np.errstate(divide="ignore", invalid="ignore"):
+                val = eval(
+                    self._code, dict(_numpy, __builtins__={}), dict(local, **_consts)
+                )
+            if out is None:
+                return val
+            out[...] = val
+            return out
+        foo = dispatch(self.foo)
+        if self.vectorized or foo is not self.foo:
+            return foo(**local, **self.params)
+        # Point by point evaluation
+        var = np.broadcast_arrays(*local.values())
+        val = [
+            foo(**dict(zip(local, i)), **self.params)
+            for i in zip(*[np.ravel(v) for v in var])
+        ]
+        return np.reshape(val, var[0].shape if var else ())
+
+    pass
+
+
+class Registry(object):
+
+    # Models of each kind, name -> Model, in the evaluation order
+    models = {kind: {} for kind in KINDS}
+    # Evaluate the expressions with numexpr when it is installed
+    fuse = True
+
+    @staticmethod
+    def register(kind, name, foo=None, expr=None, inputs=None, author=None, **params):
+        # Register a model, replacing any model with the same name. Without
+        # foo and expr it returns a decorator that registers the function.
+        if kind not in KINDS:
+            raise ValueError("Unknown model kind: {}!".format(kind))
+        if foo is None and expr is None:
+            return lambda f: Registry.register(
+                kind, name, f, inputs=inputs, author=author, **params
+            )
+        model = Model(kind, name, foo, expr, inputs, author, **params)
+        Registry.models[kind][name] = model
+        ResultCache._codes.pop("{}.{}".format(kind, name), None)
+        ResultCache.models.pop("{}.{}".format(kind, name), None)
+        return foo if foo is not None else model
+
+    @staticmethod
+    def unregister(kind, name):
+        Registry.models[kind].pop(name, None)
+
+    @staticmethod
+    def names(kind):
+        return list(Registry.models[kind].keys())
+
+    @staticmethod
+    def authors(kind):
+        return [m.author for m in Registry.models[kind].values()]
+
+    @staticmethod
+    def select(kind, names=None):
+        # Registered models of a kind, all of them when names is None
+        if kind not in KINDS:
+            raise ValueError("Unknown model kind: {}!".format(kind))
+        models = Registry.models[kind]
+        names = list(models) if names is None else names
+        for name in names:
+            if name not in models:
+                raise ValueError("Unknown {} model: {}!".format(kind, name))
+        return [models[name] for name in names]
+
+    @staticmethod
+    def signature(kind, names=None):
+        # Names and code of the models, part of the cache keys
+        return tuple((m.name, m.code) for m in Registry.select(kind, names))
+
+    @staticmethod
+    def resolve(names, inputs=None):
+        # Dictionary with the values of the inputs names. The given inputs
+        # are used as they are, the others are computed once from the
+        # Properties.
+        env = {k: v for k, v in (inputs or {}).items() if v is not None}
+
+        def get(name):
+            if name in env:
+                return env[name]
+            if name in _props:
+                env[name] = p.cast(getattr(p, name))
+            elif name in _phases and p.saturation is not None:
+                state = p.saturation.state(get("T"), get("P"))
+                for k in _phases:
+                    env.setdefault(k, state[k])
+            elif name in _derived:
+                deps, foo = _derived[name]
+                env[name] = p.cast(foo(*[get(i) for i in deps]))
+            else:
+                raise ValueError("Unknown input: {}!".format(name))
+            return env[name]
+
+        for name in names:
+            get(name)
+        return env
+
+    @staticmethod
+    def evaluate(kind, names=None, **inputs):
+        # Output of the models (n_models, *shape), the rows follow names or
+        # the registration order
+        models = Registry.select(kind, names)
+        needed = [i for m in models for i in m.inputs]
+        env = Registry.resolve(dict.fromkeys(needed), inputs)
+        shape = np.broadcast_shapes(*[np.shape(env[i]) for i in set(needed)])
+        # The flow patterns are integer codes
+        dtype = int if kind == "pattern" else p.get_dtype()
+        out = np.empty((len(models),) + shape, dtype=dtype)
+        for i, model in enumerate(models):
+            own = np.broadcast_shapes(*[np.shape(env[k]) for k in model.inputs])
+            if model.expr is not None and own == shape:
+                model(env, out=out[i])
+            else:
+                out[i] = model(env)
+        return out
+
+    pass
+
+
+# ============================ Built-in models ===============================
+
+for _name, _author in (
+    ("nicklin1962", "Nicklin (1962)"),
+    ("bendiksen1984", "Bendiksen (1984)"),
+    ("theron1989", "Theron (1989)"),
+    ("petalasaziz2000", "Petalas and Aziz (2000)"),
+    ("dukler1985", "Dukler (1985)"),
+):
+    Registry.register("eb", _name, getattr(EBVelocity, _name), author=_author)
+
+Registry.register(
+    "pattern",
+    "taitel1980",
+    Pattern.taitel1980,
+    author="Taitel (1980)",
+    vectorized=False,
+)
+Registry.register("pattern", "barnea1987", Pattern.barnea1987, author="Barnea (1987)")
+Registry.register("friction", "blasius_fanning", Friction.blasius_fanning)
+Registry.register("friction", "blasius_moody", Friction.blasius_moody)
@@ -0,0 +1,115 @@
+import CoolProp.CoolProp as cp
+import numpy as np
+
+from .flow_utils import Properties as p
+
+
+class Saturation(object):
+
+    # ================= Saturated single-component mixtures ==================
+
+    # In steam-water or refrigerant flows both phases are the same fluid at
+    # the saturation state, so the properties of both phases depend only on
+    # T or P. The saturation curve of the fluid (P_sat, rho, mu of both
+    # phases and sigma) is evaluated once on a temperature grid from the
+    # triple point to just below the critical point, and kept in memory for
+    # the process. The grid is denser close to the critical point where the
+    # properties change faster.
+    #
+    # Every point set is resolved with a single interpolation: the position
+    # of each point on the curve is found once (by T, or by log(P) with the
+    # pressure) and all the properties are interpolated at once. The quality
+    # x does not change the phase properties of a saturated mixture, it sets
+    # the superficial velocities of a given mass flux. Points outside the
+    # curve (above the critical point or below the triple point) are nan.
+
+    # Columns of the curves
+    columns = ("T", "P", "rho_l", "rho_g", "mu_l", "mu_g", "sigma")
+    # Curves of each (fluid, n), shared by all the instances
+    _curves = {}
+
+    def __init__(self, fluid=None, by="T", n=2000):
+        # fluid -> CoolProp fluid name, Properties.liq by default
+        # by -> "T" or "P", the variable that defines the saturation state,
+        #       the other one is ignored
+        # n -> Number of points of the curve
+        if by not in ("T", "P"):
+            raise ValueError("The saturation state is defined by T or P!")
+        self.fluid = p.liq if fluid is None else fluid
+        self.by = by
+        self.n = n
+        self.curve = Saturation.build(self.fluid, n)
+        pass
+
+    @property  # key -> Identifies the curve and the state variable
+    def key(self):
+        return (self.fluid, self.by, self.n)
+
+    @staticmethod
+    def build(fluid, n=2000):
+        # Saturation curve (n, 7) with the columns, T [°C] and P [Pa]
+        key = (fluid, n)
+        if key not in Saturation._curves:
+            T_min = cp.PropsSI("T_triple", fluid)
+            T_crit = cp.PropsSI("Tcrit", fluid)
+            # Quadratic spacing towards the critical point, excluded
+            s = np.linspace(0, 1, n + 1)[:-1]
+            T = T_crit - (T_crit - T_min) * (1 - s) ** 2
+            curve = [
+                T - p.K,
+                cp.PropsSI("P", "T", T, "Q", 0, fluid),
+                cp.PropsSI("D", "T", T, "Q", 0, fluid),
+                cp.PropsSI("D", "T", T, "Q", 1, fluid),
+                cp.PropsSI("V", "T", T, "Q", 0, fluid),
+                cp.PropsSI("V", "T", T, "Q", 1, fluid),
+                cp.PropsSI("I", "T", T, "Q", 0, fluid),
+            ]
+            curve = np.stack(curve, axis=1)
+            # Some correlations (e.g. sigma) fail next to the critical point
+            Saturation._curves[key] = curve[np.isfinite(curve).all(axis=1)]
+        return Saturation._curves[key]
+
+    def state(self, T=None, P=None):
+        # Saturation state of each point, dictionary with the columns. The
+        # state comes from T or P according to self.by, the Properties value
+        # is used when it is None.
+        if self.by == "T":
+            x = np.asarray(p.T if T is None else T, dtype=float)
+            xp = self.curve[:, 0]
+        else:
+            x = np.log(np.asarray(p.P if P is None else P, dtype=float))
+            xp = np.log(self.curve[:, 1])
+        # Position on the curve, once for all the properties
+        i = np.clip(np.searchsorted(xp, x, side="right") - 1, 0, xp.size - 2)
+        w = (x - xp[i]) / (xp[i + 1] - xp[i])
+        val = self.curve[i] * (1 - w)[..., None] + self.curve[i + 1] * w[..., None]
+        # The pressure is interpolated in log
+        lp = np.log(self.curve[:, 1])
+        val[..., 1] = np.exp(lp[i] * (1 - w) + lp[i + 1] * w)
+        val[(x < xp[0]) | (x > xp[-1])] = np.nan
+        return {k: p.cast(val[..., j]) for j, k in enumerate(self.columns)}
+
+    # ======================= Properties backend =============================
+
+    def rho(self, T=None, P=None, fluid="liq"):
+        return self.state(T, P)["rho_l" if fluid == "liq" else "rho_g"]
+
+    def mu(self, T=None, P=None, fluid="liq"):
+        return self.state(T, P)["mu_l" if fluid == "liq" else "mu_g"]
+
+    def sigma(self, T=None, P=None):
+        return self.state(T, P)["sigma"]
+
+    def properties(self, T=None, P=None):
+        # rho_g, rho_l, mu_g, mu_l and sigma of each point in one call
+        s = self.state(T, P)
+        return s["rho_g"], s["rho_l"], s["mu_g"], s["mu_l"], s["sigma"]
+
+    def superficial(self, G, x, T=None, P=None):
+        # Superficial velocities [m/s] of a mass flux G [kg/(m^2 s)] with
+        # quality x, returns v_sg and v_sl
+        s = self.state(T, P)
+        G, x = p.cast(G, x)
+        return G * x / s["rho_g"], G * (1 - x) / s["rho_l"]
+
+    pass
@@ -0,0 +1,175 @@
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# ==================== Models against measurements ===========================
+
+# All the models are scored at once: pred has one row per model (e.g. the
+# output of EBVelUtil.ebmodels) and meas the measured values. The metrics are
+# means of per-point errors, so a bootstrap resample only changes how many
+# times each point is counted. The counts of each chunk of resamples are
+# drawn into a matrix (n_boot, n), one resample at a time with bincount, and
+# all the metrics of all the models are obtained with a single matrix
+# product. The masks of the valid points are usually the same for all the
+# models, the repeated rows are left out of the product.
+#
+# The cost is dominated by drawing the counts of 1e6 points (about 8 ms),
+# the whole resample of 5 models takes about 15 ms on one core, so 1000
+# resamples of 1e6 points take about 15 s divided by the number of workers.
+#
+# Points where the prediction or the measurement are not finite are left out
+# of the metrics of that model, the points with a zero measurement are also
+# left out of the MAPE only.
+
+METRICS = ("mae", "mape", "bias", "rmse")
+
+
+def errors(pred, meas):
+    # Per-point terms of the metrics, returns q (6 * n_models, n): |e|,
+    # |e / meas|, e, e^2 of each model, the mask of the valid points and the
+    # mask of the valid points of the MAPE
+    pred = np.atleast_2d(np.asarray(pred, dtype=float))
+    meas = np.asarray(meas, dtype=float)
+    e = pred - meas
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.abs(e / meas)
+    ok = np.isfinite(e)
+    ok_pct = ok & np.isfinite(pct)
+    q = [np.where(ok, np.abs(e), 0.0), np.where(ok_pct, pct, 0.0)]
+    q += [np.where(ok, e, 0.0), np.where(ok, e ** 2, 0.0)]
+    return np.concatenate(q + [ok.astype(float), ok_pct.astype(float)])
+
+
+def _reduce(s):
+    # Metrics from the sums of the error terms, s (6 * n_models, k)
+    n_mdl = s.shape[0] // 6
+    ok, ok_pct = s[4 * n_mdl : 5 * n_mdl], s[5 * n_mdl :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        m = s[: 4 * n_mdl].reshape(4, n_mdl, -1) / np.stack((ok, ok_pct, ok, ok))
+    return {
+        "mae": m[0],
+        "mape": 100 * m[1],
+        "bias": m[2],
+        "rmse": np.sqrt(m[3]),
+    }
+
+
+def metrics(pred, meas):
+    # MAE, MAPE [%], bias and RMSE of each model, arrays (n_models,)
+    s = errors(pred, meas).sum(axis=1, keepdims=True)
+    return {k: v[:, 0] for k, v in _reduce(s).items()}
+
+
+# ============================== Bootstrap ===================================
+
+# Error terms shared with the worker processes
+_q = None
+
+
+def _init(q):
+    global _q
+    _q = q
+
+
+def _chunk(seed, n_boot, q=None):
+    # Sums of the error terms of n_boot resamples, (rows, n_boot)
+    q = _q if q is None else q
+    n = q.shape[1]
+    rng = np.random.default_rng(seed)
+    # Number of times each point is drawn by each resample
+    cnt = np.empty((n_boot, n))
+    for i in range(n_boot):
+        cnt[i] = np.bincount(rng.integers(0, n, size=n), minlength=n)
+    return q @ cnt.T
+
+
+def _unique_rows(q):
+    # Rows of q without the repeated masks and the index of each row in them
+    n_mdl = q.shape[0] // 6
+    keep, inv = list(range(4 * n_mdl)), list(range(4 * n_mdl))
+    for i in range(4 * n_mdl, q.shape[0]):
+        same = [j for j in keep[4 * n_mdl :] if np.array_equal(q[i], q[j])]
+        if same:
+            inv.append(keep.index(same[0]))
+        else:
+            inv.append(len(keep))
+            keep.append(i)
+    return q[keep], np.array(inv)
+
+
+def bootstrap(
+    pred, meas, n_boot=1000, seed=0, chunk=None, workers=None, max_bytes=2 ** 28
+):
+    # Bootstrap distributions of the metrics, dict of (n_models, n_boot)
+    # chunk -> Resamples per chunk, by default limited by max_bytes
+    # workers -> Number of processes, the chunks run in the current process
+    #            when None
+    q, inv = _unique_rows(errors(pred, meas))
+    n = q.shape[1]
+    if chunk is None:
+        # Count matrix of 8 bytes per point and resample
+        chunk = max(1, min(n_boot, int(max_bytes // (8 * n))))
+    sizes = [min(chunk, n_boot - i) for i in range(0, n_boot, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if workers is None:
+        s = [_chunk(i, k, q) for i, k in zip(seeds, sizes)]
+    else:
+        # Spawned workers, a fork would copy the state of the threads of the
+        # parallel kernels (kernels.set_backend("numba"))
+        ctx = mp.get_context("spawn")
+        with ProcessPoolExecutor(
+            workers, mp_context=ctx, initializer=_init, initargs=(q,)
+        ) as ex:
+            s = list(ex.map(_chunk, seeds, sizes))
+    return _reduce(np.concatenate(s, axis=1)[inv])
+
+
+def confidence(boot, ci=0.95):
+    # Percentile confidence intervals of the bootstrap distributions,
+    # dict of (lower, upper) arrays (n_models,)
+    q = 100 * np.array([(1 - ci) / 2, (1 + ci) / 2])
+    return {k: tuple(np.nanpercentile(v, q, axis=1)) for k, v in boot.items()}
+
+
+# ============================== Ranking =====================================
+
+
+def rank(pred, meas, models=None, by="rmse", n_boot=1000, ci=0.95, **kwargs):
+    # List of (model, metrics, intervals) sorted by the given metric, the
+    # kwargs are passed to bootstrap. The |bias| is used to rank by bias.
+    if by not in METRICS:
+        raise ValueError("Unknown metric: {}!".format(by))
+    pred = np.atleast_2d(np.asarray(pred, dtype=float))
+    if models is None:
+        models = ["model {}".format(i) for i in range(pred.shape[0])]
+    val = metrics(pred, meas)
+    ints = None
+    if n_boot:
+        ints = confidence(bootstrap(pred, meas, n_boot=n_boot, **kwargs), ci)
+    out = []
+    for i, name in enumerate(models):
+        m = {k: val[k][i] for k in METRICS}
+        c = {k: (ints[k][0][i], ints[k][1][i]) for k in METRICS} if ints else None
+        out.append((name, m, c))
+    key = (lambda i: abs(i[1][by])) if by == "bias" else (lambda i: i[1][by])
+    return sorted(out, key=lambda i: np.inf if np.isnan(key(i)) else key(i))
+
+
+def table(pred, meas, models=None, by="rmse", n_boot=1000, ci=0.95, **kwargs):
+    # Ranked table of the models as text
+    rows = rank(pred, meas, models, by=by, n_boot=n_boot, ci=ci, **kwargs)
+    width = max([len(str(i[0])) for i in rows] + [5])
+    col = 12 if n_boot == 0 else 34
+    head = "{:>4s}  {:{w}s}".format("#", "Model", w=width)
+    head += "".join(k.upper().rjust(col) for k in METRICS)
+    lines = [head]
+    for j, (name, m, c) in enumerate(rows):
+        txt = "{:>4d}  {:{w}s}".format(j + 1, str(name), w=width)
+        for k in METRICS:
+            if c is None:
+                txt += "{:.4g}".format(m[k]).rjust(col)
+            else:
+                txt += "{:.4g} [{:.3g}, {:.3g}]".format(m[k], *c[k]).rjust(col)
+        lines.append(txt)
+    return "\n".join(lines)
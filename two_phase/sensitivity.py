@@ -0,0 +1,249 @@
+import warnings
+
+import numpy as np
+
+from .flow_utils import Properties as p
+from .models import EBVelocity, Friction, Homogeneous, Pattern
+from .registry import Registry
+
+ComplexWarning = getattr(np, "exceptions", np).ComplexWarning
+
+# ===================== Sensitivities of the models ==========================
+
+# Jacobian of the model outputs with the operating conditions at every point,
+# J[i, j, k] = d(output j)/d(input k) at the point i.
+#
+# The models are differentiated with the complex step: an input x is given as
+# x + i*h and the derivative is imag(f) / h, exact to the machine precision
+# as there is no subtraction. The models are written with NumPy operations
+# (the angles are converted with a product, np.deg2rad has no complex loop),
+# so they run with complex inputs when the dtype is complex. The dtype is
+# only changed in the calling thread (Properties.local_dtype), so the
+# Jacobian can be computed while other threads evaluate the models. All
+# the directions are stacked in a new leading axis, so the Jacobian of every
+# point is obtained with a single evaluation of the models. A group of models
+# that does not accept complex inputs falls back to central finite
+# differences, also stacked in one evaluation.
+#
+# T and P enter only through the fluid properties, which come from CoolProp
+# (or the saturation backend) and cannot take the complex step. Their
+# derivatives are the chain rule of the model derivatives with the property
+# derivatives, obtained by central differences with a single batched call of
+# the properties for all the points.
+
+INPUTS = ("v_sg", "v_sl", "d", "theta", "T", "P")
+
+# Fluid properties, the inputs of the models that depend on T and P
+_phases = ("rho_g", "rho_l", "mu_g", "mu_l", "sigma")
+
+# Inputs of the model functions
+_direct = ("v_sg", "v_sl", "d", "theta")
+
+
+def _eb(x, g):
+    names = (
+        "nicklin1962",
+        "bendiksen1984",
+        "theron1989",
+        "petalasaziz2000",
+        "dukler1985",
+    )
+    val = (
+        EBVelocity.nicklin1962(x["v_sg"], x["v_sl"], x["d"], g),
+        EBVelocity.bendiksen1984(x["v_sg"], x["v_sl"], x["d"], x["theta"], g),
+        EBVelocity.theron1989(x["v_sg"], x["v_sl"], x["d"], x["theta"], g),
+        EBVelocity.petalasaziz2000(
+            x["v_sg"], x["v_sl"], x["rho_l"], x["mu_l"], x["d"], x["theta"], g
+        ),
+        EBVelocity.dukler1985(x["v_sg"], x["v_sl"]),
+    )
+    return ["EBVelocity." + i for i in names], val
+
+
+def _homogeneous(x, g):
+    v_m = x["v_sg"] + x["v_sl"]
+    gvf = Homogeneous.gvf(x["v_sg"], x["v_sl"])
+    rho_m = Homogeneous.rho_m(gvf, x["rho_g"], x["rho_l"])
+    mu_m = Homogeneous.mu_m(gvf, x["mu_g"], x["mu_l"])
+    Re_m = Homogeneous.Rem(
+        x["rho_g"], x["rho_l"], x["mu_g"], x["mu_l"], x["d"], v_m=v_m, gvf=gvf
+    )
+    dp_g = Homogeneous.dp_g(rho_m, g, x["theta"])
+    dp_f = Homogeneous.dp_f(Friction.blasius_fanning(Re_m), rho_m, v_m, x["d"])
+    names = ("gvf", "rho_m", "mu_m", "Rem", "dp_g", "dp_f", "dp")
+    val = (gvf, rho_m, mu_m, Re_m, dp_g, dp_f, dp_g + dp_f)
+    return ["Homogeneous." + i for i in names], val
+
+
+def _friction(x, g):
+    # Friction factors at the homogeneous Reynolds number
+    Re_m = Homogeneous.Rem(
+        x["rho_g"], x["rho_l"], x["mu_g"], x["mu_l"], x["d"], x["v_sg"], x["v_sl"]
+    )
+    names = ("blasius_fanning", "blasius_moody")
+    val = (Friction.blasius_fanning(Re_m), Friction.blasius_moody(Re_m))
+    return ["Friction." + i for i in names], val
+
+
+def _taitel1980(x, g):
+    # Continuous transition functions, the boundaries are their zeros
+    var = ("v_sg", "v_sl", "rho_g", "rho_l", "mu_l", "sigma")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        val = Pattern.taitel1980_boundaries(*[x[k] for k in var], g, x["l"], x["d"])
+    names = ("v_sg_j", "f", "v_sl_g", "v_sg_e", "v_sg_h", "bubble")
+    return ["Pattern.taitel1980." + i for i in names], val
+
+
+# Groups of outputs, each group is differentiated as a whole
+GROUPS = {
+    "EBVelocity": _eb,
+    "Homogeneous": _homogeneous,
+    "Friction": _friction,
+    "Pattern": _taitel1980,
+}
+
+
+def _complex_step(foo, x, wrt, g, h=1e-20):
+    # Jacobian (n_outputs, n_wrt, n) with the directions stacked in axis 0
+    k = len(wrt)
+    xs = {}
+    for key, val in x.items():
+        val = np.broadcast_to(val, (k,) + np.shape(val)).astype(complex)
+        if key in wrt:
+            val[wrt.index(key)] += 1j * h
+        xs[key] = val
+    with p.local_dtype(np.complex128), warnings.catch_warnings():
+        # A model that drops the imaginary part cannot use the step
+        warnings.simplefilter("error", ComplexWarning)
+        names, val = foo(xs, g)
+    val = [np.broadcast_to(i, xs[wrt[0]].shape) for i in val]
+    return names, np.imag(np.stack(val)) / h
+
+
+def _finite_differences(foo, x, wrt, g, rel=None):
+    # Central differences, the 2 * n_wrt evaluations stacked in axis 0
+    k = len(wrt)
+    rel = np.finfo(float).eps ** (1 / 3) if rel is None else rel
+    xs, steps = {}, []
+    for key, val in x.items():
+        val = np.broadcast_to(val, (2 * k,) + np.shape(val)).astype(float)
+        if key in wrt:
+            j = wrt.index(key)
+            # Relative step, the viscosities are much smaller than 1
+            h = rel * np.where(val[j] != 0, np.abs(val[j]), 1.0)
+            val[j] += h
+            val[j + k] -= h
+            steps.append(2 * h)
+        xs[key] = val
+    with p.local_dtype(np.float64):
+        names, val = foo(xs, g)
+    val = np.stack([np.broadcast_to(i, xs[wrt[0]].shape) for i in val])
+    return names, (val[:, :k] - val[:, k:]) / np.stack(steps)
+
+
+def properties(T, P, rel=None):
+    # Fluid properties and their derivatives with T and P, dictionaries of
+    # arrays (n,). Every property is evaluated once for the points and the
+    # 4 perturbed states.
+    rel = np.finfo(float).eps ** (1 / 3) if rel is None else rel
+    T, P = np.broadcast_arrays(np.asarray(T, dtype=float), np.asarray(P, dtype=float))
+    h_T = rel * np.maximum(np.abs(T + p.K), 1.0)
+    h_P = rel * np.maximum(np.abs(P), 1.0)
+    T_s = np.stack((T, T + h_T, T - h_T, T, T))
+    P_s = np.stack((P, P, P, P + h_P, P - h_P))
+    with p.local_dtype(np.float64):
+        # CoolProp takes 1-D arrays
+        env = Registry.resolve(_phases, {"T": T_s.ravel(), "P": P_s.ravel()})
+    val = {k: np.broadcast_to(env[k], T_s.size).reshape(T_s.shape) for k in _phases}
+    d_T = {k: (v[1] - v[2]) / (2 * h_T) for k, v in val.items()}
+    d_P = {k: (v[3] - v[4]) / (2 * h_P) for k, v in val.items()}
+    return {k: v[0] for k, v in val.items()}, d_T, d_P
+
+
+def jacobian(
+    v_sg=None,
+    v_sl=None,
+    d=None,
+    theta=None,
+    T=None,
+    P=None,
+    l=None,
+    wrt=INPUTS,
+    groups=None,
+    method="complex",
+    chunk=2 ** 16,
+):
+    # Jacobian (n_points, n_outputs, n_inputs) of the outputs of the groups
+    # (all of GROUPS by default) with the inputs wrt, and the output names.
+    # The missing inputs come from the Properties.
+    # method -> "complex" (complex step, finite differences for the groups
+    #           that do not support it) or "fd" (finite differences)
+    # chunk -> Points evaluated at once, limits the memory of the stacked
+    #          directions
+    for k in wrt:
+        if k not in INPUTS:
+            raise ValueError("Unknown input: {}!".format(k))
+    if method not in ("complex", "fd"):
+        raise ValueError("Unknown method: {}!".format(method))
+    groups = list(GROUPS) if groups is None else groups
+    for k in groups:
+        if k not in GROUPS:
+            raise ValueError("Unknown group: {}!".format(k))
+    given = {
+        "v_sg": v_sg,
+        "v_sl": v_sl,
+        "d": d,
+        "theta": theta,
+        "T": T,
+        "P": P,
+        "l": l,
+    }
+    x = Registry.resolve(INPUTS + ("l",), given)
+    var = np.broadcast_arrays(*[np.asarray(x[k], dtype=float) for k in x])
+    x = {k: v.ravel() for k, v in zip(x, var)}
+    n = x["v_sg"].size
+    g = p.g
+
+    # Model inputs to differentiate, the chain rule gives T and P
+    inner = [k for k in _direct if k in wrt]
+    if "T" in wrt or "P" in wrt:
+        inner += list(_phases)
+        # Properties and their derivatives with T and P
+        prop, d_T, d_P = properties(x["T"], x["P"])
+    else:
+        env = Registry.resolve(_phases, {"T": x["T"], "P": x["P"]})
+        prop = {k: np.broadcast_to(env[k], n) for k in _phases}
+    x.update(prop)
+    model = {k: x[k] for k in _direct + _phases + ("l",)}
+
+    names, J = [], []
+    for grp in groups:
+        foo = GROUPS[grp]
+        out = []
+        for i in range(0, n, chunk):
+            xc = {k: v[i : i + chunk] for k, v in model.items()}
+            nm = None
+            if method == "complex":
+                try:
+                    nm, jc = _complex_step(foo, xc, inner, g)
+                except (ComplexWarning, TypeError):
+                    txt = "{} does not support the complex step, using finite "
+                    warnings.warn(txt.format(grp) + "differences.")
+            if nm is None:
+                nm, jc = _finite_differences(foo, xc, inner, g)
+            out.append(jc)
+        names += nm
+        J.append(np.concatenate(out, axis=2))
+    # (n_outputs, n_inner, n)
+    J = np.concatenate(J)
+
+    cols = []
+    for k in wrt:
+        if k in inner:
+            cols.append(J[:, inner.index(k)])
+        else:
+            dp = d_T if k == "T" else d_P
+            pos = [inner.index(i) for i in _phases]
+            cols.append(sum(J[:, j] * dp[i] for i, j in zip(_phases, pos)))
+    out = np.stack(cols, axis=-1).transpose(1, 0, 2)
+    return out.astype(p.get_dtype()), names
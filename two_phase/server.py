@@ -0,0 +1,490 @@
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from .flow_utils import Properties as p
+from .models import Homogeneous, Pattern
+from .registry import Registry
+
+
+class Evaluator(object):
+
+    # ==================== Vectorized evaluation of requests =================
+
+    # Evaluates the TwoPhase pattern, elongated bubble velocity and
+    # homogeneous calculations on arrays. The geometry (d, l, theta) can be
+    # given per request, otherwise the evaluator values are used. The fluid
+    # properties are kept in a cache of quantized (T, P) states shared by
+    # all the requests, so only the unseen states call the equation of state.
+
+    ops = ("taitel1980", "barnea1987", "ebmodels", "homogeneous")
+
+    def __init__(
+        self,
+        d=None,
+        l=None,
+        theta=None,
+        gas=None,
+        liquid=None,
+        dT=0.01,
+        dP=10.0,
+        cache_size=100000,
+    ):
+        # gas, liquid -> CoolProp fluid names, the Properties fluids (and
+        #                custom functions or saturation backend) when None
+        # dT [°C], dP [Pa] -> Quantization of the properties cache
+        # cache_size -> Maximum number of cached (T, P) states
+        self.d = p.d if d is None else d
+        self.l = p.l if l is None else l
+        self.theta = p.theta if theta is None else theta
+        self.gas = gas
+        self.liq = liquid
+        self.dT = dT
+        self.dP = dP
+        self.cache_size = cache_size
+        self._cache = {}
+        pass
+
+    def properties(self, T, P):
+        # Returns rho_g, rho_l, mu_g, mu_l and sigma of each point
+        qT = np.round(np.asarray(T, dtype=float) / self.dT).astype(np.int64)
+        qP = np.round(np.asarray(P, dtype=float) / self.dP).astype(np.int64)
+        key, inv = np.unique(
+            np.stack([qT.ravel(), qP.ravel()]), axis=1, return_inverse=True
+        )
+        key = list(map(tuple, key.T.tolist()))
+        tab = {k: self._cache.get(k) for k in key}
+        # States that are not cached yet are evaluated in one call
+        new = [k for k, v in tab.items() if v is None]
+        if new:
+            T_n = np.array([k[0] for k in new]) * self.dT
+            P_n = np.array([k[1] for k in new]) * self.dP
+            if p.saturation is not None and self.gas is None and self.liq is None:
+                val = np.broadcast_arrays(*p.saturation.properties(T_n, P_n))
+            else:
+                gas = "gas" if self.gas is None else self.gas
+                liq = "liq" if self.liq is None else self.liq
+                val = np.broadcast_arrays(
+                    p.rho(T=T_n, P=P_n, fluid=gas),
+                    p.rho(T=T_n, P=P_n, fluid=liq),
+                    p.mu(T=T_n, P=P_n, fluid=gas),
+                    p.mu(T=T_n, P=P_n, fluid=liq),
+                    p.sigma(T=T_n, fluid=self.liq, P=P_n),
+                )
+            val = list(zip(new, np.stack(val, axis=1).tolist()))
+            tab.update(val)
+            # The cache is cleared when full
+            if len(self._cache) + len(new) > self.cache_size:
+                self._cache.clear()
+            self._cache.update(val[: self.cache_size])
+        tab = np.array([tab[k] for k in key])
+        out = tab[inv.ravel()].T.reshape((5,) + qT.shape)
+        return tuple(out)
+
+    def evaluate(self, op, args):
+        if op not in self.ops:
+            raise ValueError("Unknown operation: {}!".format(op))
+        v_sg = np.asarray(args["v_sg"], dtype=float)
+        v_sl = np.asarray(args["v_sl"], dtype=float)
+        T = np.asarray(args["T"], dtype=float)
+        P = np.asarray(args["P"], dtype=float)
+        d = np.asarray(args.get("d", self.d), dtype=float)
+        l = np.asarray(args.get("l", self.l), dtype=float)
+        theta = np.asarray(args.get("theta", self.theta), dtype=float)
+        g = p.g
+        # Properties of the whole batch
+        rho_g, rho_l, mu_g, mu_l, sigma = self.properties(T, P)
+        if op == "ebmodels":
+            # Every registered model, including the user ones
+            return Registry.evaluate(
+                "eb",
+                v_sg=v_sg,
+                v_sl=v_sl,
+                d=d,
+                l=l,
+                theta=theta,
+                g=g,
+                T=T,
+                P=P,
+                rho_g=rho_g,
+                rho_l=rho_l,
+                mu_g=mu_g,
+                mu_l=mu_l,
+                sigma=sigma,
+            )
+        if op == "homogeneous":
+            gvf = Homogeneous.gvf(v_sg, v_sl)
+            rho_m = Homogeneous.rho_m(gvf, rho_g, rho_l)
+            mu_m = Homogeneous.mu_m(gvf, mu_g, mu_l)
+            return {
+                "gvf": gvf,
+                "rho_m": rho_m,
+                "mu_m": mu_m,
+                "Re_m": rho_m * (v_sg + v_sl) * d / mu_m,
+                "dp_g": Homogeneous.dp_g(rho_m, g, theta),
+            }
+        if op == "taitel1980":
+            return Pattern.taitel1980_array(
+                v_sg, v_sl, rho_g, rho_l, mu_l, sigma, g, l, d
+            )
+        return Pattern.barnea1987(
+            v_sg, v_sl, rho_g, rho_l, mu_g, mu_l, sigma, g, d, theta
+        )
+
+    pass
+
+
+# ============================ Batch utilities ===============================
+
+
+def _size(args):
+    # Number of points of a request, scalars are broadcast
+    return max([np.size(v) for v in args.values()] + [1])
+
+
+def _merge(reqs):
+    # Concatenate the arguments of many requests with the same keys
+    sizes = [_size(r["args"]) for r in reqs]
+    args = {}
+    for key in reqs[0]["args"]:
+        args[key] = np.concatenate(
+            [
+                np.broadcast_to(np.asarray(r["args"][key], dtype=float), (n,))
+                for r, n in zip(reqs, sizes)
+            ]
+        )
+    return args, np.cumsum([0] + sizes)
+
+
+def _split(res, a, b):
+    # Points [a, b) of a result, the points are on the last axis
+    if isinstance(res, dict):
+        return {k: _split(v, a, b) for k, v in res.items()}
+    return np.asarray(res)[..., a:b]
+
+
+def _validate(req):
+    # Structure of a request, the values are checked by the evaluation
+    if not isinstance(req, dict):
+        raise ValueError("The request must be a JSON object!")
+    if not isinstance(req.get("op"), str):
+        raise ValueError("The request op must be a string!")
+    if not isinstance(req.get("args", {}), dict):
+        raise ValueError("The request args must be a JSON object!")
+
+
+def _encode(res):
+    if isinstance(res, dict):
+        return {k: _encode(v) for k, v in res.items()}
+    return np.asarray(res).tolist()
+
+
+def _decode(res):
+    if isinstance(res, dict):
+        return {k: _decode(v) for k, v in res.items()}
+    return np.asarray(res)
+
+
+class EvalServer(object):
+
+    # ===================== Asyncio micro-batching server ====================
+
+    # Newline delimited JSON protocol. A request is
+    # {"id": 1, "op": "ebmodels", "args": {"v_sg": [...], "v_sl": [...],
+    #  "T": [...], "P": [...]}} and the reply {"id": 1, "result": ...} or
+    # {"id": 1, "error": "..."}. The requests received inside a time window
+    # (from all the connections) are grouped by operation and arguments and
+    # evaluated in a single vectorized call.
+
+    def __init__(self, evaluator=None, window=2e-3, max_points=1000000):
+        # window [s] -> Time to wait for more requests after the first one
+        # max_points -> Maximum number of points of a batch
+        self.evaluator = Evaluator() if evaluator is None else evaluator
+        self.window = window
+        self.max_points = max_points
+        self.n_batches = 0
+        self.n_requests = 0
+        self._queue = None
+        self._server = None
+        self._task = None
+        pass
+
+    async def start(self, host="127.0.0.1", port=8765, path=None):
+        # Listen on a TCP port or on a Unix socket when path is given
+        self._queue = asyncio.Queue()
+        self._task = asyncio.ensure_future(self._batcher())
+        if path is None:
+            self._server = await asyncio.start_server(self._handle, host, port)
+        else:
+            self._server = await asyncio.start_unix_server(self._handle, path)
+        return self
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _handle(self, reader, writer):
+        # Read the requests of a connection and queue them with its writer, a
+        # connection dropped by the client only ends its own handler
+        try:
+            while True:
+                req = None
+                try:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    req = json.loads(line)
+                    _validate(req)
+                except (ConnectionResetError, asyncio.IncompleteReadError):
+                    break
+                except ValueError as err:
+                    # Malformed requests and lines longer than the limit
+                    rid = req.get("id") if isinstance(req, dict) else None
+                    await self._reply(writer, {"id": rid, "error": str(err)})
+                    continue
+                await self._queue.put((req, writer))
+        finally:
+            writer.close()
+
+    async def _reply(self, writer, msg):
+        # Write a reply and wait for the transport buffer to drain, so a
+        # client that does not read its replies cannot grow it without bound
+        if writer.is_closing():
+            return
+        try:
+            writer.write((json.dumps(msg) + "\n").encode())
+            await writer.drain()
+        except (ConnectionResetError, BrokenPipeError):
+            writer.close()
+
+    async def _batcher(self):
+        while True:
+            # Wait for the first request and collect the next ones
+            items = [await self._queue.get()]
+            try:
+                await self._batch(items)
+            except Exception as err:
+                # An unexpected error only fails the requests of the batch
+                for req, writer in items:
+                    await self._reply(writer, {"id": req.get("id"), "error": str(err)})
+
+    async def _batch(self, items):
+        # Evaluate the items and the requests received during the window,
+        # all the items are added to the list
+        loop = asyncio.get_running_loop()
+        n = _size(items[0][0].get("args", {}))
+        end = loop.time() + self.window
+        while n < self.max_points:
+            tmo = end - loop.time()
+            if tmo <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), tmo)
+            except asyncio.TimeoutError:
+                break
+            items += [item]
+            n += _size(item[0].get("args", {}))
+        # Group by operation and argument names
+        groups = {}
+        for req, writer in items:
+            key = (req.get("op"), tuple(sorted(req.get("args", {}))))
+            groups.setdefault(key, []).append((req, writer))
+        for (op, keys), grp in groups.items():
+            reqs = [r for r, w in grp]
+            try:
+                args, off = _merge(reqs)
+                res = await loop.run_in_executor(
+                    None, self.evaluator.evaluate, op, args
+                )
+            except Exception as err:
+                for req, writer in grp:
+                    await self._reply(writer, {"id": req.get("id"), "error": str(err)})
+                continue
+            for k, (req, writer) in enumerate(grp):
+                out = _encode(_split(res, off[k], off[k + 1]))
+                await self._reply(writer, {"id": req.get("id"), "result": out})
+            self.n_batches += 1
+            self.n_requests += len(grp)
+
+    pass
+
+
+class EvalClient(object):
+
+    # ============================ Socket client =============================
+
+    def __init__(self, host="127.0.0.1", port=8765, path=None):
+        self.host = host
+        self.port = port
+        self.path = path
+        self._id = 0
+        self._futures = {}
+        self._reader = None
+        self._writer = None
+        self._task = None
+        pass
+
+    async def connect(self):
+        if self.path is None:
+            conn = await asyncio.open_connection(self.host, self.port)
+        else:
+            conn = await asyncio.open_unix_connection(self.path)
+        self._reader, self._writer = conn
+        self._task = asyncio.ensure_future(self._receive())
+        return self
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._task.cancel()
+
+    async def _receive(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                break
+            msg = json.loads(line)
+            fut = self._futures.pop(msg["id"], None)
+            if fut is None or fut.done():
+                continue
+            if "error" in msg:
+                fut.set_exception(ValueError(msg["error"]))
+            else:
+                fut.set_result(_decode(msg["result"]))
+
+    async def call(self, op, **args):
+        # Evaluate the operation op on the server, the args are v_sg, v_sl,
+        # T, P and optionally d, l and theta
+        self._id += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._futures[self._id] = fut
+        msg = {"id": self._id, "op": op, "args": _encode(args)}
+        self._writer.write((json.dumps(msg) + "\n").encode())
+        return await fut
+
+    pass
+
+
+class LocalClient(object):
+
+    # ========================= In-process stand-in ==========================
+
+    # Same interface of EvalClient, but the requests are evaluated in the
+    # current process. Useful when no server is running and as the
+    # reference of the benchmark.
+
+    def __init__(self, evaluator=None):
+        self.evaluator = Evaluator() if evaluator is None else evaluator
+        pass
+
+    async def connect(self):
+        return self
+
+    async def close(self):
+        pass
+
+    async def call(self, op, **args):
+        return self.evaluator.evaluate(op, args)
+
+    pass
+
+
+# ================================ Benchmark =================================
+
+
+async def benchmark(
+    client, op="ebmodels", n_requests=200, n_points=100, concurrency=20
+):
+    # Latency and throughput of n_requests with n_points each, keeping
+    # `concurrency` requests in flight
+    rng = np.random.default_rng(0)
+    args = {
+        "v_sg": rng.uniform(0.1, 5, n_points),
+        "v_sl": rng.uniform(0.1, 2, n_points),
+        "T": rng.uniform(15, 30, n_points),
+        "P": rng.uniform(1e5, 3e5, n_points),
+    }
+    sem = asyncio.Semaphore(concurrency)
+    lat = []
+
+    async def one():
+        async with sem:
+            t = time.perf_counter()
+            await client.call(op, **args)
+            lat.append(time.perf_counter() - t)
+
+    t = time.perf_counter()
+    await asyncio.gather(*[one() for i in range(n_requests)])
+    total = time.perf_counter() - t
+    lat = np.array(lat)
+    return {
+        "requests/s": n_requests / total,
+        "points/s": n_requests * n_points / total,
+        "latency p50 [ms]": 1e3 * np.percentile(lat, 50),
+        "latency p99 [ms]": 1e3 * np.percentile(lat, 99),
+    }
+
+
+async def _main(opt):
+    evaluator = Evaluator(
+        d=opt.d, l=opt.l, theta=opt.theta, gas=opt.gas, liquid=opt.liquid
+    )
+    if opt.cmd == "serve":
+        server = await EvalServer(evaluator, window=opt.window).start(
+            opt.host, opt.port, opt.path
+        )
+        await server.serve_forever()
+    else:
+        kw = dict(
+            op=opt.op,
+            n_requests=opt.requests,
+            n_points=opt.points,
+            concurrency=opt.concurrency,
+        )
+        server = await EvalServer(evaluator, window=opt.window).start(
+            opt.host, opt.port, opt.path
+        )
+        clients = [
+            ("in-process", LocalClient(evaluator)),
+            ("server", EvalClient(opt.host, opt.port, opt.path)),
+        ]
+        for name, client in clients:
+            await client.connect()
+            res = await benchmark(client, **kw)
+            await client.close()
+            print(name, " ".join("{}: {:.4g}".format(k, v) for k, v in res.items()))
+        print("batches: {}, requests: {}".format(server.n_batches, server.n_requests))
+        await server.close()
+
+
+if __name__ == "__main__":
+    # python -m two_phase.server serve --port 8765
+    # python -m two_phase.server bench --op ebmodels --requests 500
+    parser = argparse.ArgumentParser(description="Two-phase evaluation server")
+    parser.add_argument("cmd", choices=["serve", "bench"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", default=None, help="Unix socket path")
+    parser.add_argument("--window", type=float, default=2e-3)
+    parser.add_argument("--d", type=float, default=0.0525)
+    parser.add_argument("--l", type=float, default=8.1)
+    parser.add_argument("--theta", type=float, default=90)
+    parser.add_argument("--gas", default="air")
+    parser.add_argument("--liquid", default="water")
+    parser.add_argument("--op", default="ebmodels", choices=Evaluator.ops)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--points", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(_main(parser.parse_args()))
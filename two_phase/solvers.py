@@ -0,0 +1,169 @@
+import numpy as np
+
+# ==================== Batched scalar root finding ===========================
+
+# The implicit closures of the mechanistic models (stratified equilibrium
+# liquid height, annular film holdup, slug film thickness, etc.) are all
+# scalar equations f(x) = 0 per operating point. Instead of calling a scalar
+# solver in a Python loop, the functions below solve every point at once:
+# the function passed must be vectorized and receive the per-point arguments
+# as arrays that broadcast with x. Only the points that are still not solved
+# are evaluated on each iteration.
+
+
+def _take(args, idx, shape):
+    # Per-point arguments restricted to the active points
+    return tuple(np.broadcast_to(arg, shape)[idx] for arg in args)
+
+
+def scan_bracket(func, lo, hi, args=(), n_scan=20):
+    # Scan the interval [lo, hi] in n_scan steps and return the first bracket
+    # where the function changes its sign. Returning the first bracket makes
+    # the solver pick the smallest root when the equation has multiple roots.
+    # Initial point of the scan, it also defines the number of points
+    f_prv = np.asarray(func(lo, *args), dtype=float).ravel()
+    shape = np.broadcast(np.empty(f_prv.shape), *[np.ravel(i) for i in args]).shape
+    args = tuple(np.ravel(i) for i in args)
+    f_prv = np.broadcast_to(f_prv, shape)
+    lo = np.broadcast_to(np.ravel(np.asarray(lo, dtype=float)), shape)
+    hi = np.broadcast_to(np.ravel(np.asarray(hi, dtype=float)), shape)
+    # Bracket to be filled, nan where no sign change is found
+    a = np.full(shape, np.nan)
+    b = np.full(shape, np.nan)
+    # Points still without a bracket
+    idx = np.arange(shape[0])
+    x_prv = lo
+    for i in range(1, n_scan + 1):
+        x_nxt = lo[idx] + (hi[idx] - lo[idx]) * (i / n_scan)
+        f_nxt = func(x_nxt, *_take(args, idx, shape))
+        # Sign change
+        chg = np.sign(f_prv) != np.sign(f_nxt)
+        chg &= np.isfinite(f_prv) & np.isfinite(f_nxt)
+        a[idx[chg]] = x_prv[chg]
+        b[idx[chg]] = x_nxt[chg]
+        # Keep scanning only the points without a bracket
+        idx = idx[~chg]
+        if idx.size == 0:
+            break
+        x_prv, f_prv = x_nxt[~chg], f_nxt[~chg]
+    return a, b
+
+
+def newton_bracket(func, a, b, args=(), fprime=None, tol=1e-10, max_iter=50):
+    # Safeguarded Newton method on the brackets [a, b]. The Newton step is
+    # replaced by a bisection whenever it leaves the bracket, so it always
+    # converges. When fprime is not given the derivative is approximated by a
+    # forward finite difference.
+    shape = np.broadcast(np.ravel(a), np.ravel(b), *[np.ravel(i) for i in args]).shape
+    args = tuple(np.ravel(i) for i in args)
+    a = np.array(np.broadcast_to(np.ravel(a), shape), dtype=float)
+    b = np.array(np.broadcast_to(np.ravel(b), shape), dtype=float)
+    # Start from the middle of the bracket, points without bracket are nan
+    x = 0.5 * (a + b)
+    idx = np.flatnonzero(np.isfinite(x))
+    # Active points
+    a, b = a[idx], b[idx]
+    f_a = func(a, *_take(args, idx, shape))
+    x_i = x[idx]
+    for i in range(max_iter):
+        if idx.size == 0:
+            break
+        arg = _take(args, idx, shape)
+        f_x = func(x_i, *arg)
+        # Derivative
+        if fprime is None:
+            h = 1e-7 * np.maximum(np.abs(b - a), 1e-12)
+            df = (func(x_i + h, *arg) - f_x) / h
+        else:
+            df = fprime(x_i, *arg)
+        # Update the bracket keeping the sign change inside it
+        same = np.sign(f_x) == np.sign(f_a)
+        a = np.where(same, x_i, a)
+        f_a = np.where(same, f_x, f_a)
+        b = np.where(same, b, x_i)
+        # Converged points are stored and removed from the active set
+        done = (np.abs(f_x) < tol) | (np.abs(b - a) < tol)
+        x[idx[done]] = x_i[done]
+        # Newton step with bisection as a fallback
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_nwt = x_i - f_x / df
+        bad = ~np.isfinite(x_nwt) | (x_nwt <= a) | (x_nwt >= b)
+        x_i = np.where(bad, 0.5 * (a + b), x_nwt)
+        keep = ~done
+        idx, a, b, f_a, x_i = idx[keep], a[keep], b[keep], f_a[keep], x_i[keep]
+    # Points that reached max_iter keep the last estimate
+    x[idx] = x_i
+    return x
+
+
+def find_root(func, lo, hi, args=(), fprime=None, n_scan=20, tol=1e-10, max_iter=50):
+    # Smallest root of func inside [lo, hi] for every point, nan when the
+    # function does not change its sign in the interval. The output has the
+    # broadcast shape of the arguments.
+    shape = np.broadcast(np.asarray(lo), np.asarray(hi), *args).shape
+    a, b = scan_bracket(func, lo, hi, args=args, n_scan=n_scan)
+    x = newton_bracket(func, a, b, args=args, fprime=fprime, tol=tol, max_iter=max_iter)
+    return x.reshape(shape)
+
+
+# ==================== Batched nonlinear least squares =======================
+
+# Many independent least squares problems (groups) are fitted at once. The
+# residuals and the Jacobian are evaluated for all the points of all the
+# groups in a single call. The normal equations of all the groups are summed
+# with one weighted bincount per pair of parameters, so the memory scales
+# with the number of points and not with the largest group. Each group has
+# its own Levenberg-Marquardt damping and stops updating when it converges.
+
+
+def least_squares(fun, jac, x0, groups, args=(), max_iter=100, tol=1e-10, lam=1e-3):
+    # fun(x, *args) -> residuals (n,) for the per-point parameters x (n, k)
+    # jac(x, *args) -> Jacobian of the residuals (n, k)
+    # x0 -> Initial parameters of each group (n_groups, k)
+    # groups -> Group index of each point, integers in [0, n_groups)
+    # Returns the parameters (n_groups, k) and the sum of the squared
+    # residuals of each group
+    x = np.array(x0, dtype=float)
+    n_groups, k = x.shape
+    groups = np.asarray(groups)
+    A = np.empty((n_groups, k, k))
+    g = np.empty((n_groups, k, 1))
+
+    r = fun(x[groups], *args)
+    cost = np.bincount(groups, weights=r ** 2, minlength=n_groups)
+    lam = np.full(n_groups, float(lam))
+    active = np.ones(n_groups, dtype=bool)
+    eye = np.eye(k)
+    for i in range(max_iter):
+        if not active.any():
+            break
+        # Normal equations of each group, A is symmetric
+        J = jac(x[groups], *args)
+        for a in range(k):
+            for b in range(a, k):
+                A[:, a, b] = np.bincount(
+                    groups, weights=J[:, a] * J[:, b], minlength=n_groups
+                )
+                A[:, b, a] = A[:, a, b]
+            g[:, a, 0] = np.bincount(groups, weights=J[:, a] * r, minlength=n_groups)
+        # Marquardt scaling, the parameters without information keep their
+        # values thanks to the small ridge
+        D = np.diagonal(A, axis1=1, axis2=2)
+        D = np.maximum(D, 1e-12 * np.maximum(D.max(axis=1, keepdims=True), 1e-300))
+        M = A + (lam[:, None] * D)[:, :, None] * eye
+        step = -np.linalg.solve(M, g)[:, :, 0]
+        step[~active] = 0.0
+        x_new = x + step
+        r_new = fun(x_new[groups], *args)
+        cost_new = np.bincount(groups, weights=r_new ** 2, minlength=n_groups)
+        # Accept the steps that reduce the cost of the group
+        ok = active & (cost_new < cost)
+        # Converged when the cost or the parameters stop changing
+        small = np.abs(step).max(axis=1) <= tol * (np.abs(x).max(axis=1) + tol)
+        done = (np.abs(cost - cost_new) <= tol * cost) | small
+        x = np.where(ok[:, None], x_new, x)
+        r = np.where(ok[groups], r_new, r)
+        cost = np.where(ok, cost_new, cost)
+        lam = np.where(ok, lam / 10, lam * 10)
+        active &= ~done & (lam < 1e16)
+    return x, cost
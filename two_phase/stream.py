@@ -0,0 +1,211 @@
+from .flow_utils import Properties as p
+from .models import Pattern
+from .registry import Registry
+
+
+class PatternStream(object):
+
+    # ===================== Real-time flow pattern classifier ================
+
+    # Receives the sensor samples one by one (or in micro-batches), keeps the
+    # last `size` samples in a ring buffer and outputs the smoothed Taitel
+    # (1980) flow pattern. The smoothed pattern is the most frequent one of
+    # the window and it only changes after the new pattern has been the most
+    # frequent for `hold` consecutive samples (hysteresis), which avoids
+    # flicker near the transitions.
+    #
+    # The per-sample work is constant: the buffers are preallocated, the
+    # pattern histogram and the velocity sums are updated incrementally and
+    # the fluid properties come from a cache of quantized (T, P). The
+    # elongated bubble velocity is only evaluated when it is read, using the
+    # mean velocities of the window.
+
+    def __init__(
+        self,
+        d=None,
+        l=None,
+        theta=None,
+        size=64,
+        hold=8,
+        eb_model="bendiksen1984",
+        props=None,
+        dT=0.1,
+        dP=100.0,
+        cache_size=100000,
+    ):
+        # d, l [m], theta [°] -> Pipe geometry, Properties values by default
+        # size -> Number of samples of the ring buffer
+        # hold -> Number of samples to confirm a flow pattern change
+        # eb_model -> Elongated bubble model of the registry.Registry used for
+        #             the v_tb estimate
+        # props -> f(T, P) returning (rho_g, rho_l, mu_l, sigma), by default
+        #          the Properties functions are used
+        # dT [°C], dP [Pa] -> Quantization of the properties cache
+        # cache_size -> Maximum number of cached (T, P) states
+        self.d = p.d if d is None else d
+        self.l = p.l if l is None else l
+        self.theta = p.theta if theta is None else theta
+        self.size = size
+        self.hold = hold
+        self.eb_model = eb_model
+        self.props = self._coolprop if props is None else props
+        self.dT = dT
+        self.dP = dP
+        self.cache_size = cache_size
+        self._cache = {}
+        # Ring buffers
+        self._ptt = [0] * size
+        self._v_sg = [0.0] * size
+        self._v_sl = [0.0] * size
+        self.reset()
+        pass
+
+    def reset(self):
+        # Clear the buffers and the smoothed state, keeps the properties cache
+        self._i = 0
+        self.n = 0
+        self._count = [0] * len(Pattern.taitel1980_ptt)
+        self._sum_g = 0.0
+        self._sum_l = 0.0
+        self._mode = 0
+        self.state = 0
+        self._pending = 0
+        self._pending_n = 0
+        # Properties of the last sample, rho_g, rho_l, mu_l and sigma
+        self._props = None
+
+    # ============================ Properties ================================
+
+    @staticmethod
+    def _coolprop(T, P):
+        return (
+            float(p.rho(T=T, P=P, fluid="gas")),
+            float(p.rho(T=T, P=P, fluid="liq")),
+            float(p.mu(T=T, P=P, fluid="liq")),
+            float(p.sigma(T=T, P=P)),
+        )
+
+    def _properties(self, T, P):
+        key = (round(T / self.dT), round(P / self.dP))
+        val = self._cache.get(key)
+        if val is None:
+            # Evaluate at the quantized state so cached values are exact
+            val = self.props(key[0] * self.dT, key[1] * self.dP)
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[key] = val
+        return val
+
+    # ============================== Update ==================================
+
+    def update(self, v_sg, v_sl, T, P):
+        # Add one sample and return the smoothed flow pattern code
+        rho_g, rho_l, mu_l, sigma = self._props = self._properties(T, P)
+        ptt = Pattern.taitel1980(
+            v_sg, v_sl, rho_g, rho_l, mu_l, sigma, p.g, self.l, self.d
+        )
+
+        i = self._i
+        count = self._count
+        # Remove the oldest sample when the buffer is full
+        if self.n == self.size:
+            old = self._ptt[i]
+            count[old] -= 1
+            self._sum_g -= self._v_sg[i]
+            self._sum_l -= self._v_sl[i]
+        else:
+            old = ptt
+            self.n += 1
+        self._ptt[i] = ptt
+        self._v_sg[i] = v_sg
+        self._v_sl[i] = v_sl
+        count[ptt] += 1
+        self._sum_g += v_sg
+        self._sum_l += v_sl
+        # Advance the ring, the sums are recomputed on each lap to avoid the
+        # accumulation of round-off errors
+        i += 1
+        if i == self.size:
+            i = 0
+            self._sum_g = sum(self._v_sg)
+            self._sum_l = sum(self._v_sl)
+        self._i = i
+
+        # Most frequent pattern of the window, a full search is only needed
+        # when the current mode lost a sample. The mode is kept on ties.
+        if count[ptt] > count[self._mode]:
+            self._mode = ptt
+        elif old == self._mode and old != ptt:
+            mode = max(range(len(count)), key=count.__getitem__)
+            if count[mode] > count[old]:
+                self._mode = mode
+
+        # Hysteresis
+        mode = self._mode
+        if mode == self.state:
+            self._pending_n = 0
+        elif mode == self._pending:
+            self._pending_n += 1
+            if self._pending_n >= self.hold:
+                self.state = mode
+                self._pending_n = 0
+        else:
+            self._pending = mode
+            self._pending_n = 1
+            if self.hold <= 1:
+                self.state = mode
+                self._pending_n = 0
+        return self.state
+
+    def update_batch(self, v_sg, v_sl, T, P):
+        # Add a micro-batch of samples and return the smoothed flow pattern
+        # after each sample
+        update = self.update
+        return [update(*i) for i in zip(v_sg, v_sl, T, P)]
+
+    # ============================== Outputs =================================
+
+    @property
+    def text(self):
+        return Pattern.taitel1980_ptt[self.state]
+
+    @property
+    def v_sg(self):
+        # Mean gas superficial velocity of the window
+        return self._sum_g / self.n if self.n else 0.0
+
+    @property
+    def v_sl(self):
+        # Mean liquid superficial velocity of the window
+        return self._sum_l / self.n if self.n else 0.0
+
+    @property
+    def v_tb(self):
+        # Elongated bubble velocity with the mean velocities of the window
+        # and the fluid properties of the last sample
+        inputs = {
+            "v_sg": self.v_sg,
+            "v_sl": self.v_sl,
+            "d": self.d,
+            "l": self.l,
+            "theta": self.theta,
+            "g": p.g,
+        }
+        if self._props is not None:
+            var = ("rho_g", "rho_l", "mu_l", "sigma")
+            inputs.update(zip(var, self._props))
+        return Registry.evaluate("eb", [self.eb_model], **inputs)[0].item()
+
+    def window(self):
+        # Samples of the window in chronological order
+        if self.n < self.size:
+            idx = list(range(self.n))
+        else:
+            idx = list(range(self._i, self.size)) + list(range(self._i))
+        return (
+            [self._v_sg[k] for k in idx],
+            [self._v_sl[k] for k in idx],
+            [self._ptt[k] for k in idx],
+        )
+
+    pass
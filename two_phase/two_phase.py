@@ -2,10 +2,12 @@ import CoolProp.CoolProp as cp
 import numpy as np
 
 # from .utils import Convert
+from .cache import ResultCache
 from .flow_utils import Convert
 from .flow_utils import Properties as p
 from .flow_utils import PropertyUtil
 from .models_utils import *
+from .saturation import Saturation
 
 
 class TwoPhase(object):
@@ -21,7 +23,8 @@ class TwoPhase(object):
         # Physical properties
         p.d = 0 if d is None else d  # [m] -> Tube diameter
         p.l = 0 if l is None else l  # [m] -> Tube diameter
-        self.theta = 90 if theta is None else theta  # [°] -> Tube angle
+        p.theta = 90 if theta is None else theta  # [°] -> Tube angle
+        self.theta = p.theta
         # Fluids
         p.liq = liquid
         p.gas = gas
@@ -35,6 +38,8 @@ class TwoPhase(object):
 
         # Utils for flow pattern
         self.ptt = PatternUtil
+        # Utils for the slug flow unit cell
+        self.slug = SlugUtil
         # Convert utils
         self.convert = Convert
 
@@ -44,13 +49,12 @@ class TwoPhase(object):
     def c0_c1(self, gvf, v_sg=None, v_sl=None, v_m=None):
 
         # Check for default variables
-        v_sg = self.v_sg if not v_sg else v_sg
-        v_sl = self.v_sl if not v_sl else v_sl
-        if not v_m:
+        v_sg = self.v_sg if v_sg is None else v_sg
+        v_sl = self.v_sl if v_sl is None else v_sl
+        # Inputs with the dtype policy
+        v_sg, v_sl, v_m, gvf = p.cast(v_sg, v_sl, v_m, gvf)
+        if v_m is None:
             v_m = v_sg + v_sl
-        v_sg = v_sg.astype(float)
-        v_m = v_m.astype(float)
-        gvf = gvf.astype(float)
         # Calculate and return the value
         return TwoPhase.c0_c1_s(v_sg, v_m, gvf)
 
@@ -66,12 +70,19 @@ class TwoPhase(object):
         # Get the predictions
         y_pred = np.polyval(coef, x_fit)
         # Calculate the R²
-        # TODO: add r2 score manually
-        # r2 = mtr.r2_score(y_fit, y_pred)
+        r2 = 1 - np.sum((y_fit - y_pred) ** 2) / np.sum((y_fit - np.mean(y_fit)) ** 2)
         return coef, r2
 
     # ======================== Callbacks ================================
 
+    @property  # dtype -> Floating point type of the models (float64 or float32)
+    def dtype(self):
+        return p.dtype
+
+    @dtype.setter  # dtype -> Floating point type of the models (float64 or float32)
+    def dtype(self, value):
+        p.set_dtype(value)
+
     @property  # T [C] -> Temperature
     def T(self):
         return p.T
@@ -99,7 +110,7 @@ class TwoPhase(object):
     @v_sg.setter  # v_sg [m/s] -> Gas superficial velocity
     def v_sg(self, value):
         p.v_sg = value
-        p.Q_g = p.v_sg * (np.pi * ((p.d / 4) ** 2))
+        p.Q_g = p.v_sg * (np.pi * ((p.d / 2) ** 2))
         # Legacy version that check for zero division
         # if (p.v_sg + p.v_sl) != 0:
         p.gvfh = Homogeneous.gvf(p.v_sg, p.v_sl)
@@ -111,7 +122,7 @@ class TwoPhase(object):
     @v_sl.setter  # v_sl [m/s] -> Liquid superficial velocity
     def v_sl(self, value):
         p.v_sl = value
-        p.Q_l = p.v_sl * (np.pi * ((p.d / 4) ** 2))
+        p.Q_l = p.v_sl * (np.pi * ((p.d / 2) ** 2))
         # Legacy version that check for zero division
         # if (p.v_sg + p.v_sl) != 0:
         p.gvfh = Homogeneous.gvf(p.v_sg, p.v_sl)
@@ -127,19 +138,19 @@ class TwoPhase(object):
     @Q_g.setter  # Q_g [m^3/s] -> Gas volume rate
     def Q_g(self, value):
         p.Q_g = value
-        p.v_sg = self.m3s2vs(value)
+        p.v_sg = Convert.m3s2vs(value)
         # Legacy version that check for zero division
         # if (p.v_sg + p.v_sl) != 0:
         p.gvfh = Homogeneous.gvf(p.v_sg, p.v_sl)
 
     @property  # Q_l [m^3/s] -> Liquid volume rate
     def Q_l(self):
-        return p.v_sg
+        return p.Q_l
 
     @Q_l.setter  # Q_l [m^3/s] -> Liquid volume rate
     def Q_l(self, value):
         p.Q_l = value
-        p.v_sl = self.m3s2vs(value)
+        p.v_sl = Convert.m3s2vs(value)
         # Legacy version that check for zero division
         # if (p.v_sg + p.v_sl) != 0:
         p.gvfh = Homogeneous.gvf(p.v_sg, p.v_sl)
@@ -151,8 +162,8 @@ class TwoPhase(object):
     @d.setter  # d [m] -> diameter
     def d(self, value):
         p.d = value
-        p.v_sl = Convert.m3s2vs(p.Q_g)
-        p.v_sg = Convert.m3s2vs(p.Q_l)
+        p.v_sg = Convert.m3s2vs(p.Q_g)
+        p.v_sl = Convert.m3s2vs(p.Q_l)
 
     # ======================== Class Options ================================
 
@@ -166,8 +177,21 @@ class TwoPhase(object):
 
     def set_mu_l_func(self, foo, default=True):
         p.mu_l_func = foo
-        p.mu_l_fdefault = default
+        p.mu_l_default = default
 
     def set_mu_g_func(self, foo, default=True):
         p.mu_g_func = foo
-        p.mu_g_fdefault = default
+        p.mu_g_default = default
+
+    def set_saturation(self, fluid=None, by="T", n=2000, enable=True):
+        # Both phases from the saturation curve of a single fluid (e.g.
+        # steam-water, refrigerants), or back to the CoolProp (T, P) states
+        if not enable:
+            p.saturation = None
+            return
+        p.saturation = Saturation(fluid=fluid, by=by, n=n)
+        p.liq = p.gas = p.saturation.fluid
+
+    def set_cache(self, path=None, max_bytes=2 ** 30, enable=True):
+        # Enable the on-disk cache of the model results, or disable it
+        p.cache = ResultCache(path=path, max_bytes=max_bytes) if enable else None